@@ -1,36 +1,44 @@
 """
 Inicializador do módulo app
 """
-from flask import Flask, request, jsonify
+import sys
+import time
+from flask import Flask
 from app.config import Config
 
 def create_app(config_class=Config):
     """
     Factory function para criar a aplicação Flask
     """
+    inicio = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(config_class)
     
-    # Configurar CORS manualmente
+    # ES256/EdDSA sem anel de chaves falha aqui, e não no primeiro login
+    from app.utils.chaves import verificar_configuracao_chaves
+    verificar_configuracao_chaves(app.config)
+    
+    from app.middleware.caminho_rapido import CABECALHOS_CORS, CABECALHOS_SEGURANCA, MiddlewareCaminhoRapido
+    cabecalhos_resposta = CABECALHOS_CORS + CABECALHOS_SEGURANCA
+    
+    # Configurar CORS manualmente e adicionar headers de segurança
+    # (preflight OPTIONS é respondido pelo caminho rápido WSGI)
     @app.after_request
     def after_request(response):
-        response.headers['Access-Control-Allow-Origin'] = '*'
-        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        response.headers['X-Frame-Options'] = 'DENY'
-        response.headers['X-XSS-Protection'] = '1; mode=block'
+        for nome, valor in cabecalhos_resposta:
+            response.headers[nome] = valor
         return response
     
-    # Handler para preflight OPTIONS
-    @app.before_request
-    def handle_preflight():
-        if request.method == "OPTIONS":
-            response = jsonify({'status': 'ok'})
-            response.headers['Access-Control-Allow-Origin'] = '*'
-            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-            return response
+    # Latência e status por rota, exportados em /metrics
+    from app.utils.metricas import instrumentar_app
+    instrumentar_app(app)
+    
+    from app.utils.security_logger import security_logger
+    security_logger.configurar(app.config)
+    
+    # Server-Timing e traces JSONL amostrados (desativados por padrão)
+    from app.utils.tracing import instrumentar_tracing
+    instrumentar_tracing(app)
     
     # Registrar blueprints
     from app.blueprints.main import main_bp
@@ -39,6 +47,26 @@ def create_app(config_class=Config):
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp, url_prefix='/auth')
     
+    # IP do cliente (request.remote_addr) a partir do X-Forwarded-For dos proxies confiáveis
+    if app.config.get('PROXY_CONFIAVEIS'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config['PROXY_CONFIAVEIS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+    
+    if app.config.get('COMPRESSAO_ATIVA'):
+        from app.middleware.compressao import MiddlewareCompressao
+        app.wsgi_app = MiddlewareCompressao(
+            app.wsgi_app,
+            tamanho_minimo=app.config['COMPRESSAO_TAMANHO_MINIMO'],
+            nivel_gzip=app.config['COMPRESSAO_NIVEL_GZIP'],
+            nivel_brotli=app.config['COMPRESSAO_NIVEL_BROTLI'],
+            tipos=app.config['COMPRESSAO_TIPOS'],
+            mapa_rotas=app.url_map
+        )
+    
+    # Mais externo: OPTIONS e /health não passam pelo Flask nem pela compressão
+    app.wsgi_app = MiddlewareCaminhoRapido(app.wsgi_app, app.config, max_age=app.config['CORS_MAX_AGE'])
+    
     # Handlers de erro globais
     @app.errorhandler(400)
     def bad_request(error):
@@ -88,12 +116,10 @@ def create_app(config_class=Config):
             'error_code': 500
         }, 500
 
-    # Adicionar headers de segurança
-    @app.after_request
-    def after_request(response):
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        response.headers['X-Frame-Options'] = 'DENY'
-        response.headers['X-XSS-Protection'] = '1; mode=block'
-        return response
+    # Relatório de cold start exposto em /stats
+    app.extensions['cold_start'] = {
+        'construcao_app_ms': round((time.perf_counter() - inicio) * 1000, 3),
+        'modulos_carregados': len(sys.modules)
+    }
     
     return app
@@ -1,12 +1,32 @@
 from flask import Blueprint, request, jsonify, current_app
 import hashlib
-from app.utils.auth import gerar_token_jwt, verificar_token_jwt, adicionar_token_blacklist, token_required, obter_token_do_header
+import math
+from app.utils.auth import TIPO_ACESSO, credencial_servico_valida, gerar_token_jwt, verificar_token_jwt, verificar_tokens_em_lote, adicionar_token_blacklist, token_required, obter_token_do_header, hidratar_perfil, perfil_do_payload, PerfilIndisponivelError
 from app.utils.validators import validar_dados_login_seguro, validar_email_telefone_seguro, sanitizar_entrada
 from app.services.api_externa import api_externa_service
+from app.services.circuit_breaker import CircuitoAbertoError
+from app.utils.rate_limit import adicionar_headers_rate_limit, verificar_limite_requisicao
+from app.utils.redis_resp import ErroRedis
+from app.utils.refresh_tokens import ErroRefreshToken, emitir_refresh_token, revogar_familia, rotacionar_refresh_token
+from app.utils.tracing import rastrear, span
 
 # Cria o blueprint de autenticação
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+# Rotas que chamam a API externa, e a introspecção, têm limite de taxa
+ENDPOINTS_LIMITADOS = frozenset({'auth.login', 'auth.reset_password', 'auth.introspect'})
+
+@auth_bp.before_request
+def limitar_taxa():
+    """Recusa com 429 quando a cota por IP ou por email/RA se esgotou"""
+    if request.endpoint in ENDPOINTS_LIMITADOS and current_app.config.get('RATE_LIMIT_ATIVO'):
+        return verificar_limite_requisicao()
+
+@auth_bp.after_request
+def headers_rate_limit(response):
+    return adicionar_headers_rate_limit(response)
+
+@rastrear('hash_senha')
 def criar_hash_senha(senha: str) -> str:
     """
     Cria um hash SHA256 da senha de forma segura
@@ -21,6 +41,66 @@ def criar_hash_senha(senha: str) -> str:
     except ValueError as e:
         raise ValueError(f"Senha contém caracteres não permitidos: {str(e)}")
 
+def _resposta_servico_indisponivel(erro: CircuitoAbertoError):
+    """Resposta 503 imediata enquanto o circuito da API externa está aberto"""
+    resposta = jsonify({
+        'success': False,
+        'message': 'Serviço de autenticação temporariamente indisponível',
+        'error_code': 503
+    })
+    resposta.headers['Retry-After'] = str(max(math.ceil(erro.retry_after), 1))
+    return resposta, 503
+
+def _ler_credenciais_login():
+    """
+    Lê o corpo do login e retorna (resposta_de_erro, email_telefone, senha_hash)
+    """
+    email_telefone = request.json.get('email_telefone')
+    senha = request.json.get('senha')
+    if not email_telefone or not senha:
+        return (jsonify({
+            'success': False,
+            'message': 'Email/RA e senha são obrigatórios'
+        }), 400), None, None
+    senha_hash = criar_hash_senha(senha)
+    return None, email_telefone, senha_hash
+
+def _resposta_login(sucesso, resposta):
+    """Monta a resposta do login a partir do retorno da API externa"""
+    if not sucesso:
+        mensagem = resposta.get('erro') or resposta.get('mensagem') or resposta.get('message') or 'Erro na autenticação'
+        return jsonify({
+            'success': False,
+            'message': mensagem
+        }), 401
+    if current_app.config.get('JWT_PAR_TOKENS'):
+        familia, token_refresh = emitir_refresh_token(resposta)
+        return jsonify({
+            'success': True,
+            'message': 'Login realizado com sucesso',
+            **_corpo_par_tokens(resposta, familia, token_refresh),
+            'usuario': resposta
+        }), 200
+    token = gerar_token_jwt(resposta)
+    return jsonify({
+        'success': True,
+        'message': 'Login realizado com sucesso',
+        'token': token,
+        'usuario': resposta,
+        'expires_in': int(current_app.config['JWT_EXPIRATION_DELTA'].total_seconds())
+    }), 200
+
+def _corpo_par_tokens(perfil, familia, token_refresh):
+    """Access token curto da família mais o refresh token opaco"""
+    access_token = gerar_token_jwt(perfil, familia)
+    return {
+        'token': access_token,
+        'access_token': access_token,
+        'refresh_token': token_refresh,
+        'token_type': 'Bearer',
+        'expires_in': int(current_app.config['JWT_ACESSO_EXPIRACAO'].total_seconds())
+    }
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """
@@ -28,30 +108,15 @@ def login():
     Com proteções contra SQL Injection
     """
     try:
-        email_telefone = request.json.get('email_telefone')
-        senha = request.json.get('senha')
-        if not email_telefone or not senha:
-            return jsonify({
-                'success': False,
-                'message': 'Email/RA e senha são obrigatórios'
-            }), 400
-        senha_hash = criar_hash_senha(senha)
-        print (senha_hash)
+        with span('validacao'):
+            erro, email_telefone, senha_hash = _ler_credenciais_login()
+        if erro:
+            return erro
         sucesso, resposta = api_externa_service.autenticar_usuario(email_telefone, senha_hash)
-        if not sucesso:
-            mensagem = resposta.get('erro') or resposta.get('mensagem') or resposta.get('message') or 'Erro na autenticação'
-            return jsonify({
-                'success': False,
-                'message': mensagem
-            }), 401
-        token = gerar_token_jwt(resposta)
-        return jsonify({
-            'success': True,
-            'message': 'Login realizado com sucesso',
-            'token': token,
-            'usuario': resposta,
-            'expires_in': int(current_app.config['JWT_EXPIRATION_DELTA'].total_seconds())
-        }), 200
+        return _resposta_login(sucesso, resposta)
+    
+    except CircuitoAbertoError as e:
+        return _resposta_servico_indisponivel(e)
     
     except Exception as e:
         current_app.logger.error(f"Erro no login: {str(e)}")
@@ -64,14 +129,22 @@ def login():
 @token_required
 def logout():
     """
-    Rota para logout (adiciona token à blacklist)
+    Rota para logout (adiciona token à blacklist; com access token, encerra a família de refresh)
     """
     try:
         token = obter_token_do_header()
         
-        if token:
+        if request.current_user.get('rt_tipo') == TIPO_ACESSO:
+            # O access token expira sozinho em instantes; basta invalidar o refresh token
+            revogar_familia(request.current_user['rt_fam'])
+            
+            return jsonify({
+                'success': True,
+                'message': 'Logout realizado com sucesso'
+            }), 200
+        elif token:
             # Adiciona o token à blacklist
-            adicionar_token_blacklist(token)
+            adicionar_token_blacklist(token, request.current_user)
             
             return jsonify({
                 'success': True,
@@ -98,7 +171,7 @@ def verify_token():
     """
     try:
         # Obtém informações do usuário atual do token (já validado pelo decorator)
-        usuario_atual = request.current_user
+        usuario_atual = hidratar_perfil(request.current_user)
         
         return jsonify({
             'success': True,
@@ -114,30 +187,120 @@ def verify_token():
             'message': 'Erro interno do servidor'
         }), 500
 
+@auth_bp.route('/introspect', methods=['POST'])
+def introspect():
+    """
+    Introspecção em lote para serviços internos: valida vários tokens em uma
+    única requisição, com a revogação consultada em uma só busca em lote.
+    Exige o segredo INTROSPECCAO_TOKEN no header Authorization (Bearer).
+    """
+    try:
+        if not credencial_servico_valida('INTROSPECCAO_TOKEN'):
+            return jsonify({
+                'success': False,
+                'message': 'Credencial de serviço inválida'
+            }), 401
+        
+        dados = request.get_json(silent=True) or {}
+        tokens = dados.get('tokens')
+        
+        if not isinstance(tokens, list) or not tokens:
+            return jsonify({
+                'success': False,
+                'message': 'Lista de tokens é obrigatória'
+            }), 400
+        
+        limite = current_app.config.get('INTROSPECCAO_MAX_TOKENS', 100)
+        if len(tokens) > limite:
+            return jsonify({
+                'success': False,
+                'message': f'Máximo de {limite} tokens por requisição'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'resultados': verificar_tokens_em_lote(tokens)
+        }), 200
+    
+    except Exception as e:
+        current_app.logger.error(f"Erro na introspecção de tokens: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno do servidor'
+        }), 500
+
 @auth_bp.route('/refresh', methods=['POST'])
-@token_required
 def refresh_token():
     """
-    Rota para renovar um token válido
+    Rota para renovar um token válido. Com JWT_PAR_TOKENS recebe o
+    refresh_token no corpo; senão, renova o token do header Authorization.
     """
+    if current_app.config.get('JWT_PAR_TOKENS'):
+        return _renovar_par_tokens()
+    return _renovar_token()
+
+def _renovar_par_tokens():
+    """Rotaciona o refresh token e emite um novo access token da mesma família"""
     try:
-        # Obtém informações do usuário atual do token
-        usuario_atual = request.current_user
+        dados = request.get_json(silent=True)
+        token_refresh = dados.get('refresh_token') if isinstance(dados, dict) else None
+        if not isinstance(token_refresh, str) or not token_refresh:
+            return jsonify({
+                'success': False,
+                'message': 'refresh_token é obrigatório'
+            }), 400
+        
+        try:
+            rotacao = rotacionar_refresh_token(token_refresh)
+        except ErroRefreshToken as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 401
+        
+        return jsonify({
+            'success': True,
+            'message': 'Token renovado com sucesso',
+            **_corpo_par_tokens(rotacao.perfil, rotacao.familia, rotacao.refresh_token)
+        }), 200
+    
+    except Exception as e:
+        current_app.logger.error(f"Erro na renovação de token: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro interno do servidor'
+        }), 500
+
+@token_required
+def _renovar_token():
+    """Renova o token do header Authorization, revogando o atual"""
+    try:
+        # Perfil plano do usuário, sem as claims do token atual: o novo token
+        # tem o mesmo tamanho do anterior, por mais renovações que haja
+        # (lido antes da revogação, que remove o perfil dos tokens enxutos)
+        try:
+            usuario_info = perfil_do_payload(request.current_user)
+        except PerfilIndisponivelError:
+            # Renovar só com sub e permissoes gravaria o perfil truncado para sempre
+            return jsonify({
+                'success': False,
+                'message': 'Sessão expirada, faça login novamente'
+            }), 401
+        except (ErroRedis, OSError) as e:
+            current_app.logger.warning("Falha ao obter perfil para renovação: %s", e)
+            return jsonify({
+                'success': False,
+                'message': 'Serviço temporariamente indisponível'
+            }), 503
         
         # Adiciona o token atual à blacklist
         token_atual = obter_token_do_header()
         if token_atual:
-            adicionar_token_blacklist(token_atual)
-        
-        # Gera novo token usando as informações do token atual
-        # Como os dados vêm da API externa, mantemos as informações do token
-        usuario_info = {
-           'usuario': usuario_atual
-        }
+            adicionar_token_blacklist(token_atual, request.current_user)
         
         novo_token = gerar_token_jwt(usuario_info)
         
-        current_app.logger.info(f"Token renovado para: {usuario_atual}")
+        current_app.logger.info("Token renovado para: %s", request.current_user.get('sub') or request.current_user.get('jti'))
         
         return jsonify({
             'success': True,
@@ -153,32 +316,46 @@ def refresh_token():
             'message': 'Erro interno do servidor'
         }), 500
 
+def _ler_dados_reset():
+    """
+    Lê o corpo do reset e retorna (resposta_de_erro, email_telefone, nova_senha_hash)
+    """
+    email_telefone = request.json.get('email_telefone')
+    nova_senha = request.json.get('senha')
+    
+    if not email_telefone or not nova_senha:
+        return (jsonify({
+            'success': False,
+            'message': 'Email e nova senha são obrigatórios'
+        }), 400), None, None
+    
+    # Cria hash da nova senha
+    nova_senha_hash = hashlib.sha256(nova_senha.encode()).hexdigest()
+    return None, email_telefone, nova_senha_hash
+
+def _resposta_reset(sucesso, mensagem):
+    status_code = 200 if sucesso else 400
+    return jsonify({
+        'success': sucesso,
+        'message': mensagem
+    }), status_code
+
 @auth_bp.route('/reset-password', methods=['POST'])
 def reset_password():
 
 
     try:
-        email_telefone = request.json.get('email_telefone')
-        nova_senha = request.json.get('senha')
-        print(email_telefone, nova_senha)
-        
-        if not email_telefone or not nova_senha:
-            return jsonify({
-                'success': False,
-                'message': 'Email e nova senha são obrigatórios'
-            }), 400
-        
-        # Cria hash da nova senha
-        nova_senha_hash = hashlib.sha256(nova_senha.encode()).hexdigest()
+        with span('validacao'):
+            erro, email_telefone, nova_senha_hash = _ler_dados_reset()
+        if erro:
+            return erro
         
         # Chama a API externa
         sucesso, mensagem = api_externa_service.resetar_senha(email_telefone, nova_senha_hash)
-        
-        status_code = 200 if sucesso else 400
-        return jsonify({
-            'success': sucesso,
-            'message': mensagem
-        }), status_code
+        return _resposta_reset(sucesso, mensagem)
+    
+    except CircuitoAbertoError as e:
+        return _resposta_servico_indisponivel(e)
     
     except Exception as e:
         current_app.logger.error(f"Erro no reset de senha: {str(e)}")
@@ -1,4 +1,21 @@
-from flask import Blueprint, jsonify, redirect, request
+from typing import Dict
+from flask import Blueprint, Response, current_app, jsonify, redirect
+from app.services.api_externa import api_externa_service
+from app.services.cache_negativo import cache_negativo
+from app.middleware.compressao import estatisticas_compressao
+from app.services.circuit_breaker import circuit_breakers
+import app.utils.auth as auth
+import app.utils.perfil_store as perfil_store
+import app.utils.rate_limit as rate_limit
+import app.utils.refresh_tokens as refresh_tokens
+from app.utils.auth import cache_tokens, credencial_servico_valida
+from app.utils.chaves import obter_anel_chaves
+from app.utils.documentacao import especificacao_openapi, pagina_swagger_ui
+from app.utils.metricas import metricas
+from app.utils.security_logger import security_logger
+
+# Endpoints da API externa protegidos por circuit breaker
+ENDPOINTS_API_EXTERNA = ('/api/login', '/api/reset-senha')
 
 # Cria o blueprint principal
 main_bp = Blueprint('main', __name__)
@@ -13,368 +30,95 @@ def login_redirect():
     """Redireciona para a rota de login correta"""
     return redirect('/auth/login')
 
+def corpo_health(estados: Dict[str, str]) -> Dict:
+    """Corpo do /health; também usado pelo caminho rápido WSGI"""
+    return {
+        'success': True,
+        'message': 'API está funcionando',
+        'service': 'API Flask Uninga - Gateway Oracle APEX',
+        'version': '1.0.0',
+        'circuit_breakers': estados
+    }
+
 @main_bp.route('/health', methods=['GET'])
 def health_check():
     """Endpoint de verificação de saúde da API"""
+    return jsonify(corpo_health({
+        endpoint: circuit_breakers.obter(endpoint, current_app.config).estado
+        for endpoint in ENDPOINTS_API_EXTERNA
+    })), 200
+
+def _acesso_interno_negado():
+    """401 sem o segredo METRICAS_TOKEN no header Authorization (Bearer)"""
+    if credencial_servico_valida('METRICAS_TOKEN'):
+        return None
+    return jsonify({
+        'success': False,
+        'message': 'Credencial de serviço inválida',
+        'error_code': 401
+    }), 401
+
+def _estatisticas_se_iniciado(backend):
+    """Estatísticas de um backend já criado: /stats não cria backends nem abre conexões"""
+    if backend is None:
+        return {'iniciado': False}
+    try:
+        return backend.estatisticas()
+    except Exception as e:
+        # Backend compartilhado indisponível: /stats continua respondendo
+        return {'erro': str(e)}
+
+@main_bp.route('/stats', methods=['GET'])
+def stats():
+    """Estatísticas internas para dimensionamento do gateway"""
+    negado = _acesso_interno_negado()
+    if negado:
+        return negado
     return jsonify({
         'success': True,
-        'message': 'API está funcionando',
-        'service': 'API Flask Uninga - Gateway Oracle APEX',
-        'version': '1.0.0'
+        'upstream': {
+            'pool': api_externa_service.estatisticas_pool(),
+            'single_flight': api_externa_service.estatisticas_single_flight(),
+            'circuit_breakers': circuit_breakers.snapshot(),
+            'cache_negativo': cache_negativo.estatisticas()
+        },
+        'jwt_cache': cache_tokens.estatisticas(),
+        'perfil_store': _estatisticas_se_iniciado(perfil_store._perfil_store),
+        'revogacao': _estatisticas_se_iniciado(auth._backend_revogacao),
+        'refresh_tokens': _estatisticas_se_iniciado(refresh_tokens._backend_refresh),
+        'compressao': estatisticas_compressao.snapshot(),
+        'cold_start': current_app.extensions.get('cold_start'),
+        'rate_limit': _estatisticas_se_iniciado(rate_limit._backend_rate_limit),
+        'security_log': security_logger.estatisticas()
     }), 200
 
+@main_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas no formato texto do Prometheus"""
+    negado = _acesso_interno_negado()
+    if negado:
+        return negado
+    return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
+
+
 
 @main_bp.route('/doc', methods=['GET'])
 @main_bp.route('/doc/', methods=['GET'])
 def swagger_ui():
     """Interface do Swagger UI"""
-    return """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>API Flask Uninga - Swagger UI</title>
-    <link rel="stylesheet" type="text/css" href="https://unpkg.com/swagger-ui-dist@3.25.0/swagger-ui.css" />
-</head>
-<body>
-    <div id="swagger-ui"></div>
-    <script src="https://unpkg.com/swagger-ui-dist@3.25.0/swagger-ui-bundle.js"></script>
-    <script>
-        window.onload = function() {
-            SwaggerUIBundle({
-                url: '/swagger.json',
-                dom_id: '#swagger-ui',
-                deepLinking: true
-            });
-        };
-    </script>
-</body>
-</html>
-    """
+    return pagina_swagger_ui().responder()
 
 @main_bp.route('/swagger.json', methods=['GET'])
 def swagger_json():
-    """Especificação OpenAPI em JSON"""
-    return jsonify({
-        "openapi": "3.0.0",
-        "info": {
-            "title": "API Flask Uninga - Gateway Oracle APEX",
-            "version": "1.0.0",
-            "description": "Gateway de Autenticação para Oracle APEX da Uninga",
-            "contact": {
-                "name": "Equipe Uninga",
-                "email": "dev@uninga.edu.br"
-            }
-        },
-        "servers": [
-            {
-                "url": "/",
-                "description": "Servidor atual (relativo)"
-            },
-            {
-                "url": "http://localhost:5000",
-                "description": "Servidor de desenvolvimento"
-            },
-            {
-                "url": "https://uninga-backend.vercel.app",
-                "description": "Servidor de produção"
-            }
-        ],
-        "components": {
-            "securitySchemes": {
-                "BearerAuth": {
-                    "type": "http",
-                    "scheme": "bearer",
-                    "bearerFormat": "JWT",
-                    "description": "JWT Token. Formato: Bearer <token>"
-                }
-            },
-            "schemas": {
-                "LoginRequest": {
-                    "type": "object",
-                    "required": ["email_telefone", "senha"],
-                    "properties": {
-                        "email_telefone": {
-                            "type": "string",
-                            "description": "Email ou RA do usuário. Para RA aceita vários formatos: 200378-25, 200378.25, 200378 25, etc. (caracteres não numéricos são removidos automaticamente)",
-                            "example": "44984023495"
-                        },
-                        "senha": {
-                            "type": "string",
-                            "description": "Senha do usuário",
-                            "example": "123456789"
-                        }
-                    }
-                },
-                "ResetPasswordRequest": {
-                    "type": "object",
-                    "required": ["email_telefone", "senha"],
-                    "properties": {
-                        "email_telefone": {
-                            "type": "string",
-                            "description": "Email ou Telefone do usuário.",
-                            "example": "44984023495"
-                        },
-                        "senha": {
-                            "type": "string",
-                            "description": "Nova senha do usuário (será automaticamente criptografada)",
-                            "example": "novaSenha123"
-                        }
-                    }
-                },
-                "LoginResponse": {
-                    "type": "object",
-                    "properties": {
-                        "success": {"type": "boolean", "example": True},
-                        "message": {"type": "string", "example": "Login realizado com sucesso"},
-                        "data": {
-                            "type": "object",
-                            "properties": {
-                                "access_token": {"type": "string", "example": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."},
-                                "refresh_token": {"type": "string", "example": "eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzI1NiJ9..."},
-                                "expires_in": {"type": "integer", "example": 3600},
-                                "token_type": {"type": "string", "example": "Bearer"},
-                                "user_info": {
-                                    "type": "object",
-                                    "properties": {
-                                        "identificador": {"type": "string", "example": "teste@uninga.edu.br"},
-                                        "nome": {"type": "string", "example": "TESTE USUÁRIO"},
-                                        "email": {"type": "string", "example": "teste@uninga.edu.br"},
-                                        "tipo": {"type": "string", "example": "email"},
-                                        "tipo_usuario": {"type": "string", "example": "PROFESSOR"},
-                                        "nivel_acesso": {"type": "string", "example": "1"},
-                                        "permissoes": {"type": "array", "items": {"type": "string"}, "example": ["user", "professor"]}
-                                    }
-                                }
-                            }
-                        }
-                    }
-                },
-                "ErrorResponse": {
-                    "type": "object",
-                    "properties": {
-                        "success": {"type": "boolean", "example": False},
-                        "message": {"type": "string", "example": "Erro na operação"},
-                        "error_code": {"type": "integer", "example": 400}
-                    }
-                }
-            }
-        },
-        "paths": {
-            "/health": {
-                "get": {
-                    "tags": ["Sistema"],
-                    "summary": "Verificação de saúde",
-                    "description": "Endpoint para verificar se a API está funcionando corretamente",
-                    "responses": {
-                        "200": {
-                            "description": "API funcionando normalmente",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "success": {"type": "boolean", "example": True},
-                                            "message": {"type": "string", "example": "API está funcionando"},
-                                            "service": {"type": "string", "example": "API Flask Uninga - Gateway Oracle APEX"},
-                                            "version": {"type": "string", "example": "1.0.0"}
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    }
-                }
-            },
-            "/auth/login": {
-                "post": {
-                    "tags": ["Autenticação"],
-                    "summary": "Login do usuário",
-                    "description": "Autentica um usuário usando email/RA e senha. Para RAs, aceita vários formatos (200378-25, 200378.25, 200378 25) e caracteres não numéricos são automaticamente removidos. A senha é automaticamente convertida para hash SHA256 antes de ser enviada para a API Oracle APEX",
-                    "requestBody": {
-                        "required": True,
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/LoginRequest"}
-                            }
-                        }
-                    },
-                    "responses": {
-                        "200": {
-                            "description": "Login realizado com sucesso",
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/LoginResponse"}
-                                }
-                            }
-                        },
-                        "401": {
-                            "description": "Credenciais inválidas",
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/ErrorResponse"}
-                                }
-                            }
-                        },
-                        "400": {
-                            "description": "Dados inválidos",
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/ErrorResponse"}
-                                }
-                            }
-                        }
-                    }
-                }
-            },
-            "/auth/logout": {
-                "post": {
-                    "tags": ["Autenticação"],
-                    "summary": "Logout do usuário",
-                    "description": "Invalida o token JWT atual adicionando-o à blacklist",
-                    "security": [{"BearerAuth": []}],
-                    "responses": {
-                        "200": {
-                            "description": "Logout realizado com sucesso",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "success": {"type": "boolean"},
-                                            "message": {"type": "string"}
-                                        }
-                                    }
-                                }
-                            }
-                        },
-                        "401": {
-                            "description": "Token inválido",
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/ErrorResponse"}
-                                }
-                            }
-                        }
-                    }
-                }
-            },
-            "/auth/verify-token": {
-                "post": {
-                    "tags": ["Autenticação"],
-                    "summary": "Verificar token",
-                    "description": "Verifica se um token JWT é válido através do header Authorization",
-                    "security": [{"BearerAuth": []}],
-                    "responses": {
-                        "200": {
-                            "description": "Token verificado",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "success": {"type": "boolean", "example": True},
-                                            "message": {"type": "string", "example": "Token válido"},
-                                            "valid": {"type": "boolean", "example": True},
-                                            "usuario": {
-                                                "type": "object",
-                                                "properties": {
-                                                    "identificador": {"type": "string"},
-                                                    "nome": {"type": "string"},
-                                                    "tipo": {"type": "string"},
-                                                    "permissoes": {"type": "array", "items": {"type": "string"}}
-                                                }
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        },
-                        "401": {
-                            "description": "Token inválido",
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/ErrorResponse"}
-                                }
-                            }
-                        }
-                    }
-                }
-            },
-            "/auth/refresh": {
-                "post": {
-                    "tags": ["Autenticação"],
-                    "summary": "Renovar token",
-                    "description": "Renova um token JWT usando o refresh token",
-                    "security": [{"BearerAuth": []}],
-                    "responses": {
-                        "200": {
-                            "description": "Token renovado com sucesso",
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/LoginResponse"}
-                                }
-                            }
-                        },
-                        "401": {
-                            "description": "Refresh token inválido",
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/ErrorResponse"}
-                                }
-                            }
-                        }
-                    }
-                }
-            },
-            "/auth/reset-password": {
-                "post": {
-                    "tags": ["Autenticação"],
-                    "summary": "Reset de senha",
-                    "description": "Altera a senha de um usuário usando email/RA. A nova senha é automaticamente criptografada com SHA256 antes de ser enviada para a API Oracle APEX",
-                    "requestBody": {
-                        "required": True,
-                        "content": {
-                            "application/json": {
-                                "schema": {"$ref": "#/components/schemas/ResetPasswordRequest"}
-                            }
-                        }
-                    },
-                    "responses": {
-                        "200": {
-                            "description": "Senha alterada com sucesso",
-                            "content": {
-                                "application/json": {
-                                    "schema": {
-                                        "type": "object",
-                                        "properties": {
-                                            "success": {"type": "boolean", "example": True},
-                                            "message": {"type": "string", "example": "Senha alterada com sucesso"}
-                                        }
-                                    }
-                                }
-                            }
-                        },
-                        "400": {
-                            "description": "Dados inválidos ou erro na alteração",
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/ErrorResponse"}
-                                }
-                            }
-                        },
-                        "500": {
-                            "description": "Erro interno do servidor",
-                            "content": {
-                                "application/json": {
-                                    "schema": {"$ref": "#/components/schemas/ErrorResponse"}
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-        }
-    }), 200
+    """Especificação OpenAPI em JSON (app/data/openapi.json)"""
+    return especificacao_openapi().responder()
+
+@main_bp.route('/.well-known/jwks.json', methods=['GET'])
+def jwks():
+    """Chaves públicas para verificação local dos JWT (vazio no modo HS256)"""
+    if current_app.config.get('JWT_ALGORITMO', 'HS256') == 'HS256':
+        return jsonify({'keys': []})
+    return obter_anel_chaves().jwks.responder()
 
 @main_bp.errorhandler(404)
 def not_found(error):
@@ -1,18 +1,126 @@
 import os
 from datetime import timedelta
 
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass
+# Na Vercel as variáveis já vêm do ambiente: evita procurar o .env no cold start
+if not os.getenv('VERCEL'):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
 
 class Config:
     """Configurações base da aplicação"""
     SECRET_KEY = os.getenv('SECRET_KEY', 'teste1234')
     API_EXTERNA_BASE_URL = os.getenv('API_EXTERNA_BASE_URL', 'https://oracleapex.com/ords/fazemcasa')
     API_EXTERNA_RETRIES = int(os.getenv('API_EXTERNA_RETRIES', 3))
+    API_EXTERNA_TIMEOUT = int(os.getenv('API_EXTERNA_TIMEOUT', 15))
+    API_EXTERNA_CONNECT_TIMEOUT = float(os.getenv('API_EXTERNA_CONNECT_TIMEOUT', 3))
+    # Prazo total por requisição, somando todas as tentativas e esperas
+    API_EXTERNA_DEADLINE = float(os.getenv('API_EXTERNA_DEADLINE', 20))
+    API_EXTERNA_BACKOFF_BASE = float(os.getenv('API_EXTERNA_BACKOFF_BASE', 0.2))
+    API_EXTERNA_BACKOFF_MAX = float(os.getenv('API_EXTERNA_BACKOFF_MAX', 2.0))
+    # Agrupa logins idênticos (email_telefone, senha_hash) em andamento
+    API_EXTERNA_SINGLE_FLIGHT = os.getenv('API_EXTERNA_SINGLE_FLIGHT', 'true').lower() == 'true'
+    # Cache negativo (chave HMAC) para falhas definitivas (400/401/403/404) de login e reset de senha
+    CACHE_NEGATIVO_ATIVO = os.getenv('CACHE_NEGATIVO_ATIVO', 'true').lower() == 'true'
+    CACHE_NEGATIVO_TTL = float(os.getenv('CACHE_NEGATIVO_TTL', 30))
+    CACHE_NEGATIVO_MAX_ENTRADAS = int(os.getenv('CACHE_NEGATIVO_MAX_ENTRADAS', 10000))
+    # Pool de conexões keep-alive com a API externa
+    API_EXTERNA_POOL_HOSTS = int(os.getenv('API_EXTERNA_POOL_HOSTS', 4))
+    API_EXTERNA_POOL_MAXSIZE = int(os.getenv('API_EXTERNA_POOL_MAXSIZE', 20))
+    API_EXTERNA_POOL_BLOCK = os.getenv('API_EXTERNA_POOL_BLOCK', 'false').lower() == 'true'
+    API_EXTERNA_KEEPALIVE_IDLE = int(os.getenv('API_EXTERNA_KEEPALIVE_IDLE', 60))
+    # Circuit breaker por endpoint da API externa
+    CIRCUIT_BREAKER_JANELA = float(os.getenv('CIRCUIT_BREAKER_JANELA', 30))
+    CIRCUIT_BREAKER_MIN_REQUISICOES = int(os.getenv('CIRCUIT_BREAKER_MIN_REQUISICOES', 10))
+    CIRCUIT_BREAKER_TAXA_FALHA = float(os.getenv('CIRCUIT_BREAKER_TAXA_FALHA', 0.5))
+    CIRCUIT_BREAKER_LATENCIA_LENTA = float(os.getenv('CIRCUIT_BREAKER_LATENCIA_LENTA', 5))
+    CIRCUIT_BREAKER_TEMPO_ABERTO = float(os.getenv('CIRCUIT_BREAKER_TEMPO_ABERTO', 15))
+    CIRCUIT_BREAKER_SONDAS = int(os.getenv('CIRCUIT_BREAKER_SONDAS', 3))
     JWT_EXPIRATION_DELTA = timedelta(hours=int(os.getenv('JWT_EXPIRATION_HOURS', 24)))
+    # Par access/refresh: access token curto sem consulta de revogação, refresh token opaco com rotação
+    JWT_PAR_TOKENS = os.getenv('JWT_PAR_TOKENS', 'false').lower() == 'true'
+    JWT_ACESSO_EXPIRACAO = timedelta(minutes=int(os.getenv('JWT_ACESSO_EXPIRACAO_MINUTOS', 15)))
+    JWT_REFRESH_EXPIRACAO = timedelta(days=int(os.getenv('JWT_REFRESH_EXPIRACAO_DIAS', 7)))
+    # Segundos em que o refresh token recém-substituído ainda devolve o mesmo sucessor (requisições repetidas do cliente)
+    JWT_REFRESH_JANELA_REUSO = float(os.getenv('JWT_REFRESH_JANELA_REUSO', 10))
+    JWT_REFRESH_BACKEND = os.getenv('JWT_REFRESH_BACKEND', 'memoria')  # memoria | redis
+    JWT_REFRESH_MAX_FAMILIAS = int(os.getenv('JWT_REFRESH_MAX_FAMILIAS', 100000))
+    JWT_REFRESH_REDIS_URL = os.getenv('JWT_REFRESH_REDIS_URL', 'redis://localhost:6379/0')
+    # Assinatura dos JWT: HS256 (SECRET_KEY) ou ES256/EdDSA com anel de chaves (app/utils/chaves.py)
+    JWT_ALGORITMO = os.getenv('JWT_ALGORITMO', 'HS256')  # HS256 | ES256 | EdDSA
+    JWT_CHAVES = os.getenv('JWT_CHAVES')  # JSON: [{"kid": ..., "pem": ...}]
+    JWT_CHAVES_ARQUIVO = os.getenv('JWT_CHAVES_ARQUIVO')
+    JWT_CHAVE_ATIVA = os.getenv('JWT_CHAVE_ATIVA')
+    # Só para desenvolvimento: ES256/EdDSA sem JWT_CHAVES usa uma chave gerada na inicialização
+    JWT_CHAVE_EFEMERA_DEV = os.getenv('JWT_CHAVE_EFEMERA_DEV', 'false').lower() == 'true'
+    JWT_ACEITAR_HS256 = os.getenv('JWT_ACEITAR_HS256', 'true').lower() == 'true'  # tokens antigos sem kid
+    JWKS_CACHE_CONTROL = os.getenv('JWKS_CACHE_CONTROL', 'public, max-age=300, stale-while-revalidate=3600')
+    # Revogação de tokens: memoria, sqlite ou redis
+    REVOGACAO_BACKEND = os.getenv('REVOGACAO_BACKEND', 'memoria')
+    REVOGACAO_SQLITE_PATH = os.getenv('REVOGACAO_SQLITE_PATH', '/tmp/revogacao.db')
+    REVOGACAO_REDIS_URL = os.getenv('REVOGACAO_REDIS_URL', 'redis://localhost:6379/0')
+    # Cache local de leitura na frente dos backends compartilhados
+    REVOGACAO_CACHE_TTL = float(os.getenv('REVOGACAO_CACHE_TTL', 2))
+    REVOGACAO_CACHE_TAMANHO = int(os.getenv('REVOGACAO_CACHE_TAMANHO', 10000))
+    # Filtro de Bloom na frente dos backends compartilhados (sqlite/redis), sincronizado com o log de revogações a cada intervalo
+    REVOGACAO_BLOOM = os.getenv('REVOGACAO_BLOOM', 'true').lower() == 'true'
+    REVOGACAO_BLOOM_CAPACIDADE = int(os.getenv('REVOGACAO_BLOOM_CAPACIDADE', 100000))
+    REVOGACAO_BLOOM_TAXA_FP = float(os.getenv('REVOGACAO_BLOOM_TAXA_FP', 0.001))
+    REVOGACAO_BLOOM_INTERVALO = float(os.getenv('REVOGACAO_BLOOM_INTERVALO', 2))
+    # /auth/introspect: segredo dos serviços internos (Bearer; sem ele a rota recusa tudo) e máximo de tokens por chamada
+    INTROSPECCAO_TOKEN = os.getenv('INTROSPECCAO_TOKEN')
+    INTROSPECCAO_MAX_TOKENS = int(os.getenv('INTROSPECCAO_MAX_TOKENS', 100))
+    # Segredo (Bearer) exigido por /stats e /metrics; sem ele as duas rotas recusam tudo
+    METRICAS_TOKEN = os.getenv('METRICAS_TOKEN')
+    # Tamanho do cache LRU de tokens verificados (0 desativa)
+    JWT_CACHE_TAMANHO = int(os.getenv('JWT_CACHE_TAMANHO', 4096))
+    # Tokens enxutos: o JWT leva só sub, jti, exp e permissoes; o perfil fica no servidor
+    JWT_SLIM = os.getenv('JWT_SLIM', 'false').lower() == 'true'
+    PERFIL_STORE_BACKEND = os.getenv('PERFIL_STORE_BACKEND', 'memoria')  # memoria | redis
+    PERFIL_STORE_MAX_ENTRADAS = int(os.getenv('PERFIL_STORE_MAX_ENTRADAS', 100000))
+    PERFIL_STORE_REDIS_URL = os.getenv('PERFIL_STORE_REDIS_URL', 'redis://localhost:6379/0')
+    # Cache-Control de /doc e /swagger.json (permite cache no edge da Vercel)
+    DOCUMENTACAO_CACHE_CONTROL = os.getenv('DOCUMENTACAO_CACHE_CONTROL', 'public, max-age=300, s-maxage=3600, stale-while-revalidate=86400')
+    # Compressão das respostas (brotli/gzip negociado por Accept-Encoding)
+    COMPRESSAO_ATIVA = os.getenv('COMPRESSAO_ATIVA', 'true').lower() == 'true'
+    COMPRESSAO_TAMANHO_MINIMO = int(os.getenv('COMPRESSAO_TAMANHO_MINIMO', 500))
+    COMPRESSAO_NIVEL_GZIP = int(os.getenv('COMPRESSAO_NIVEL_GZIP', 6))
+    COMPRESSAO_NIVEL_BROTLI = int(os.getenv('COMPRESSAO_NIVEL_BROTLI', 4))
+    COMPRESSAO_TIPOS = os.getenv('COMPRESSAO_TIPOS', 'application/json,text/html,text/plain,text/css,application/javascript').split(',')
+    # Tempo (s) que o navegador pode reutilizar a resposta do preflight CORS
+    CORS_MAX_AGE = int(os.getenv('CORS_MAX_AGE', 7200))
+    # Tracing por requisição: header Server-Timing e traces JSONL amostrados
+    TRACING_SERVER_TIMING = os.getenv('TRACING_SERVER_TIMING', 'false').lower() == 'true'
+    TRACING_TAXA_AMOSTRAGEM = float(os.getenv('TRACING_TAXA_AMOSTRAGEM', 0.0))
+    TRACING_MAX_SPANS = int(os.getenv('TRACING_MAX_SPANS', 64))
+    TRACING_ARQUIVO = os.getenv('TRACING_ARQUIVO', '/tmp/traces.jsonl')
+    TRACING_ARQUIVO_MAX_BYTES = int(os.getenv('TRACING_ARQUIVO_MAX_BYTES', 10 * 1024 * 1024))
+    TRACING_ARQUIVO_BACKUPS = int(os.getenv('TRACING_ARQUIVO_BACKUPS', 3))
+    # Proxies confiáveis na frente da aplicação (X-Forwarded-For/Proto tratados pelo ProxyFix); na Vercel, o edge
+    PROXY_CONFIAVEIS = int(os.getenv('PROXY_CONFIAVEIS', 1 if os.getenv('VERCEL') else 0))
+    # Limite de taxa em /auth/login e /auth/reset-password (por IP e por email/RA)
+    RATE_LIMIT_ATIVO = os.getenv('RATE_LIMIT_ATIVO', 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memoria')  # memoria | redis
+    RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+    RATE_LIMIT_MAX_CHAVES = int(os.getenv('RATE_LIMIT_MAX_CHAVES', 100000))
+    RATE_LIMIT_IP_LIMITE = int(os.getenv('RATE_LIMIT_IP_LIMITE', 30))
+    RATE_LIMIT_IP_JANELA = float(os.getenv('RATE_LIMIT_IP_JANELA', 60))
+    RATE_LIMIT_IDENTIFICADOR_LIMITE = int(os.getenv('RATE_LIMIT_IDENTIFICADOR_LIMITE', 10))
+    RATE_LIMIT_IDENTIFICADOR_JANELA = float(os.getenv('RATE_LIMIT_IDENTIFICADOR_JANELA', 300))
+    # Cota por IP de /auth/introspect, separada da do login
+    RATE_LIMIT_INTROSPECCAO_LIMITE = int(os.getenv('RATE_LIMIT_INTROSPECCAO_LIMITE', 600))
+    RATE_LIMIT_INTROSPECCAO_JANELA = float(os.getenv('RATE_LIMIT_INTROSPECCAO_JANELA', 60))
+    # Log de segurança assíncrono: fila limitada gravada em lotes (JSON por linha)
+    SECURITY_LOG_CAPACIDADE = int(os.getenv('SECURITY_LOG_CAPACIDADE', 10000))
+    SECURITY_LOG_LOTE = int(os.getenv('SECURITY_LOG_LOTE', 500))
+    SECURITY_LOG_INTERVALO = float(os.getenv('SECURITY_LOG_INTERVALO', 0.5))
+    SECURITY_LOG_POLITICA = os.getenv('SECURITY_LOG_POLITICA', 'descartar_novos')  # descartar_novos | descartar_antigos
+    # Agregação de eventos repetidos (evento, IP, identificador); janela 0 desativa
+    SECURITY_LOG_AGREGACAO_JANELA = float(os.getenv('SECURITY_LOG_AGREGACAO_JANELA', 60))
+    SECURITY_LOG_AGREGACAO_MAX_CHAVES = int(os.getenv('SECURITY_LOG_AGREGACAO_MAX_CHAVES', 10000))
+    SECURITY_LOG_AGREGACAO_AMOSTRAS = int(os.getenv('SECURITY_LOG_AGREGACAO_AMOSTRAS', 3))
 
 
 class ProductionConfig(Config):
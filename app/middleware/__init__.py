@@ -0,0 +1 @@
+# Inicializador do módulo middleware
@@ -0,0 +1,78 @@
+"""
+Caminho rápido WSGI para preflight CORS (OPTIONS) e /health
+
+Essas requisições são respondidas antes do roteamento do Flask, com listas de
+cabeçalhos e corpos pré-calculados.
+"""
+import json
+from typing import Dict, List, Optional, Tuple
+
+from app.blueprints.main import ENDPOINTS_API_EXTERNA, corpo_health
+from app.services.circuit_breaker import circuit_breakers
+
+CABECALHOS_CORS = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type, Authorization'),
+)
+
+CABECALHOS_SEGURANCA = (
+    ('X-Content-Type-Options', 'nosniff'),
+    ('X-Frame-Options', 'DENY'),
+    ('X-XSS-Protection', '1; mode=block'),
+)
+
+
+def _serializar(dados: Dict) -> bytes:
+    # Mesmo formato do jsonify do Flask fora do modo debug
+    return (json.dumps(dados, separators=(',', ':'), sort_keys=True) + '\n').encode('utf-8')
+
+
+def _resposta_json(corpo: bytes, *extras: Tuple[str, str]) -> Tuple[List[Tuple[str, str]], bytes]:
+    cabecalhos = [
+        ('Content-Type', 'application/json'),
+        ('Content-Length', str(len(corpo))),
+        *CABECALHOS_CORS,
+        *extras,
+        *CABECALHOS_SEGURANCA,
+    ]
+    return cabecalhos, corpo
+
+
+class MiddlewareCaminhoRapido:
+    """Responde OPTIONS em qualquer rota e GET/HEAD /health sem passar pelo Flask"""
+
+    def __init__(self, app, config, max_age: int = 7200):
+        self.app = app
+        self.config = config
+        self._preflight = _resposta_json(
+            _serializar({'status': 'ok'}),
+            ('Access-Control-Max-Age', str(max_age))
+        )
+        # (estados dos circuit breakers, resposta pré-calculada para eles)
+        self._health: Tuple[Optional[tuple], Optional[tuple]] = (None, None)
+
+    def _resposta_health(self) -> Tuple[List[Tuple[str, str]], bytes]:
+        estados = tuple(
+            circuit_breakers.obter(endpoint, self.config).estado
+            for endpoint in ENDPOINTS_API_EXTERNA
+        )
+        chave, resposta = self._health
+        if chave != estados:
+            # Só reconstrói o corpo quando algum circuito muda de estado
+            resposta = _resposta_json(_serializar(corpo_health(dict(zip(ENDPOINTS_API_EXTERNA, estados)))))
+            self._health = (estados, resposta)
+        return resposta
+
+    def __call__(self, environ, start_response):
+        metodo = environ.get('REQUEST_METHOD')
+        if metodo == 'OPTIONS':
+            cabecalhos, corpo = self._preflight
+        elif metodo in ('GET', 'HEAD') and environ.get('PATH_INFO') == '/health':
+            cabecalhos, corpo = self._resposta_health()
+        else:
+            return self.app(environ, start_response)
+
+        # start_response recebe uma cópia: servidores podem acrescentar cabeçalhos
+        start_response('200 OK', list(cabecalhos))
+        return [b''] if metodo == 'HEAD' else [corpo]
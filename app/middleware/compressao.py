@@ -0,0 +1,183 @@
+"""
+Middleware WSGI de compressão de respostas (brotli ou gzip, negociado por Accept-Encoding)
+"""
+import gzip
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele só gzip é oferecido
+    brotli = None
+
+# Status que nunca têm corpo a comprimir
+_STATUS_SEM_CORPO = ('204', '304')
+
+
+def _escrita_nao_suportada(dados):
+    raise RuntimeError("write() do WSGI não é suportado pelo middleware de compressão")
+
+
+class EstatisticasCompressao:
+    """Bytes economizados e tempo de CPU gasto comprimindo, por rota"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rotas: Dict[str, Dict] = {}
+
+    def registrar(self, rota: str, codificacao: str, original: int, comprimido: int, tempo_cpu: float):
+        with self._lock:
+            stats = self._rotas.get(rota)
+            if stats is None:
+                stats = self._rotas[rota] = {
+                    'respostas': 0,
+                    'bytes_originais': 0,
+                    'bytes_enviados': 0,
+                    'tempo_cpu': 0.0,
+                    'codificacoes': {}
+                }
+            stats['respostas'] += 1
+            stats['bytes_originais'] += original
+            stats['bytes_enviados'] += comprimido
+            stats['tempo_cpu'] += tempo_cpu
+            stats['codificacoes'][codificacao] = stats['codificacoes'].get(codificacao, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                rota: {
+                    'respostas': stats['respostas'],
+                    'bytes_originais': stats['bytes_originais'],
+                    'bytes_economizados': stats['bytes_originais'] - stats['bytes_enviados'],
+                    'tempo_cpu_ms': round(stats['tempo_cpu'] * 1000, 3),
+                    'codificacoes': dict(stats['codificacoes'])
+                }
+                for rota, stats in self._rotas.items()
+            }
+
+
+# Estatísticas globais, expostas em /stats
+estatisticas_compressao = EstatisticasCompressao()
+
+
+class MiddlewareCompressao:
+    """
+    Comprime o corpo de respostas elegíveis: tipo de conteúdo permitido,
+    tamanho conhecido acima do mínimo e ainda sem Content-Encoding.
+    Respostas em streaming (sem Content-Length) passam intactas.
+    """
+
+    def __init__(self, app, tamanho_minimo: int = 500, nivel_gzip: int = 6,
+                 nivel_brotli: int = 4, tipos: Iterable[str] = ('application/json', 'text/html'),
+                 mapa_rotas=None):
+        self.app = app
+        self.mapa_rotas = mapa_rotas
+        self.tamanho_minimo = tamanho_minimo
+        self.nivel_gzip = nivel_gzip
+        self.nivel_brotli = nivel_brotli
+        self.tipos = frozenset(tipo.strip().lower() for tipo in tipos if tipo.strip())
+        self.codificacoes = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def _escolher_codificacao(self, environ) -> Optional[str]:
+        aceitas = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        for codificacao in self.codificacoes:
+            if aceitas[codificacao] > 0:
+                return codificacao
+        return None
+
+    def _comprimir(self, corpo: bytes, codificacao: str) -> bytes:
+        if codificacao == 'br':
+            return brotli.compress(corpo, quality=self.nivel_brotli)
+        return gzip.compress(corpo, compresslevel=self.nivel_gzip, mtime=0)
+
+    def _elegivel(self, status: str, cabecalhos: Dict[str, str]) -> bool:
+        if status[:3] in _STATUS_SEM_CORPO or 'content-encoding' in cabecalhos:
+            return False
+        if 'no-transform' in cabecalhos.get('cache-control', ''):
+            return False
+        tipo = cabecalhos.get('content-type', '').split(';', 1)[0].strip().lower()
+        if tipo not in self.tipos:
+            return False
+        tamanho = cabecalhos.get('content-length')
+        return tamanho is not None and tamanho.isdigit() and int(tamanho) >= self.tamanho_minimo
+
+    def _rota(self, environ) -> str:
+        # Agrupa pela regra casada, e não pelo path, para limitar a cardinalidade
+        if self.mapa_rotas is not None:
+            try:
+                regra, _ = self.mapa_rotas.bind_to_environ(environ).match(return_rule=True)
+                return regra.rule
+            except HTTPException:
+                pass
+        return '<sem rota>'
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return self.app(environ, start_response)
+
+        capturado = {}
+
+        def start_response_capturado(status, headers, exc_info=None):
+            if exc_info or capturado.get('repassar'):
+                capturado['repassar'] = True
+                return start_response(status, headers, exc_info)
+            capturado['status'] = status
+            capturado['headers'] = headers
+            return _escrita_nao_suportada
+
+        resposta = self.app(environ, start_response_capturado)
+        if 'status' not in capturado or capturado.get('repassar'):
+            # Aplicação que só inicia a resposta ao ser iterada: repassa sem comprimir
+            capturado['repassar'] = True
+            return resposta
+
+        status, headers = capturado['status'], capturado['headers']
+        cabecalhos = {nome.lower(): valor for nome, valor in headers}
+        if not self._elegivel(status, cabecalhos):
+            start_response(status, headers)
+            return resposta
+
+        vary = cabecalhos.get('vary')
+        if vary is None:
+            headers.append(('Vary', 'Accept-Encoding'))
+        elif 'accept-encoding' not in vary.lower():
+            headers = [(n, f"{v}, Accept-Encoding" if n.lower() == 'vary' else v) for n, v in headers]
+
+        codificacao = self._escolher_codificacao(environ)
+        if codificacao is None:
+            start_response(status, headers)
+            return resposta
+
+        try:
+            corpo = b''.join(resposta)
+        finally:
+            if hasattr(resposta, 'close'):
+                resposta.close()
+
+        inicio = time.thread_time()
+        comprimido = self._comprimir(corpo, codificacao)
+        tempo_cpu = time.thread_time() - inicio
+
+        rota = self._rota(environ)
+        if len(comprimido) >= len(corpo):
+            estatisticas_compressao.registrar(rota, 'identity', len(corpo), len(corpo), tempo_cpu)
+            start_response(status, headers)
+            return [corpo]
+
+        estatisticas_compressao.registrar(rota, codificacao, len(corpo), len(comprimido), tempo_cpu)
+        novos_headers = []
+        for nome, valor in headers:
+            chave = nome.lower()
+            if chave == 'content-length':
+                valor = str(len(comprimido))
+            elif chave == 'etag' and not valor.startswith('W/'):
+                # O corpo mudou: a ETag forte passa a identificar a variante comprimida
+                valor = f'{valor[:-1]}-{codificacao}"' if valor.endswith('"') else valor
+            novos_headers.append((nome, valor))
+        novos_headers.append(('Content-Encoding', codificacao))
+        start_response(status, novos_headers)
+        return [comprimido]
@@ -1,96 +1,280 @@
-import requests
 import logging
+import random
+import threading
 import time
 import os
-from typing import Tuple, Dict, Any, Optional
+from typing import Tuple, Dict, Any, Optional, NamedTuple
 from flask import current_app
+from app.services.estatisticas_pool import EstatisticasPool
+from app.utils.importacao import modulo_tardio
+from app.utils.tracing import rastrear
+from app.utils.metricas import upstream_duracao, upstream_timeouts
+from app.services.single_flight import SingleFlight
+from app.services.circuit_breaker import circuit_breakers
+from app.services.cache_negativo import cache_negativo, resposta_cacheavel
+
+# requests (e o pool sobre ele) só é carregado na primeira chamada à API externa
+requests = modulo_tardio('requests')
+
+HEADERS_PADRAO = {
+    'Content-Type': 'application/json',
+    'User-Agent': 'Flask-Uninga-Gateway/1.0'
+}
+
+# Status HTTP da API externa que justificam uma nova tentativa
+STATUS_TRANSITORIOS = frozenset({502, 503, 504})
+
+ERRO_TIMEOUT = "Timeout na comunicação com a API externa"
+
+
+def falha_da_api(sucesso: bool, resposta: Dict) -> bool:
+    """
+    Indica se o resultado conta como falha da API externa para o circuit breaker.
+    Erros 4xx (ex.: credenciais inválidas) são respostas válidas da API.
+    """
+    if sucesso:
+        return False
+    status_code = resposta.get('status_code')
+    return status_code is None or status_code >= 500
+
+
+def registrar_metricas_upstream(endpoint: str, sucesso: bool, resposta: Dict, duracao: float):
+    """Registra latência e status (ou timeout) de uma chamada à API externa"""
+    if sucesso:
+        status = '2xx'
+    elif resposta.get('status_code') is not None:
+        status = str(resposta['status_code'])
+    elif resposta.get('erro') == ERRO_TIMEOUT:
+        status = 'timeout'
+        upstream_timeouts.rotulos(endpoint).inc()
+    else:
+        status = 'erro'
+    upstream_duracao.rotulos(endpoint, status).observar(duracao)
+
+
+class PoliticaRequisicao(NamedTuple):
+    """Parâmetros de tentativas e prazos de uma chamada à API externa"""
+    tentativas: int
+    timeout_conexao: float
+    timeout_leitura: float
+    prazo_total: float
+    backoff_base: float
+    backoff_max: float
+
 
 class ApiExternaService:
     """Serviço para integração com API externa do Oracle APEX"""
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        self._sessao = None
+        self._sessao_lock = threading.Lock()
+        self._estatisticas_pool = EstatisticasPool()
+        self._single_flight = SingleFlight()
+    
+    @property
+    def sessao(self) -> 'requests.Session':
+        """Sessão HTTP compartilhada (pool keep-alive), criada na primeira requisição"""
+        if self._sessao is None:
+            with self._sessao_lock:
+                if self._sessao is None:
+                    from app.services.pool_http import criar_sessao
+                    config = current_app.config
+                    self._sessao = criar_sessao(
+                        self._estatisticas_pool,
+                        pool_hosts=config.get('API_EXTERNA_POOL_HOSTS', 4),
+                        pool_maxsize=config.get('API_EXTERNA_POOL_MAXSIZE', 20),
+                        pool_block=config.get('API_EXTERNA_POOL_BLOCK', False),
+                        keepalive_idle=config.get('API_EXTERNA_KEEPALIVE_IDLE', 60)
+                    )
+        return self._sessao
+    
+    def estatisticas_pool(self) -> Dict[str, int]:
+        """Conexões abertas, reutilizadas e em uso no pool da API externa"""
+        return self._estatisticas_pool.snapshot()
+    
+    def estatisticas_single_flight(self) -> Dict[str, int]:
+        """Chamadas de login feitas à API externa e quantas foram agrupadas"""
+        return self._single_flight.estatisticas()
     
     @property
     def base_url(self):
         """URL base da API externa configurada no Flask"""
-        return getattr(current_app.config, 'API_EXTERNA_BASE_URL', 
-                      'https://oracleapex.com/ords/fazemcasa')
+        return current_app.config.get('API_EXTERNA_BASE_URL',
+                                      'https://oracleapex.com/ords/fazemcasa')
     
     @property
     def timeout(self):
-        """Timeout configurado no Flask"""
-        return getattr(current_app.config, 'API_EXTERNA_TIMEOUT', 60)
+        """Timeout de leitura por tentativa configurado no Flask"""
+        return current_app.config.get('API_EXTERNA_TIMEOUT', 15)
     
     @property
     def retries(self):
         """Número de tentativas configurado no Flask"""
-        return getattr(current_app.config, 'API_EXTERNA_RETRIES', 3)
+        return current_app.config.get('API_EXTERNA_RETRIES', 3)
+    
+    @property
+    def politica(self) -> PoliticaRequisicao:
+        """Política de tentativas, backoff e prazo total lida do Flask"""
+        config = current_app.config
+        return PoliticaRequisicao(
+            tentativas=max(int(self.retries), 1),
+            timeout_conexao=float(config.get('API_EXTERNA_CONNECT_TIMEOUT', 3)),
+            timeout_leitura=float(self.timeout),
+            prazo_total=float(config.get('API_EXTERNA_DEADLINE', 20)),
+            backoff_base=float(config.get('API_EXTERNA_BACKOFF_BASE', 0.2)),
+            backoff_max=float(config.get('API_EXTERNA_BACKOFF_MAX', 2.0))
+        )
+    
+    def _calcular_espera(self, tentativa: int, politica: PoliticaRequisicao) -> float:
+        """Backoff exponencial com jitter completo"""
+        teto = min(politica.backoff_max, politica.backoff_base * (2 ** (tentativa - 1)))
+        return random.uniform(0, teto)
+    
+    def _espera_nova_tentativa(self, tentativa: int, politica: PoliticaRequisicao, limite: float) -> Optional[float]:
+        """
+        Calcula o backoff antes de uma nova tentativa.
+        Retorna None se as tentativas acabaram ou o prazo total não comporta outra.
+        """
+        if tentativa >= politica.tentativas:
+            return None
+        
+        espera = self._calcular_espera(tentativa, politica)
+        if time.monotonic() + espera >= limite:
+            return None
+        
+        self.logger.warning("Nova tentativa (%s/%s) em %.3fs", tentativa + 1, politica.tentativas, espera)
+        return espera
+    
+    def _aguardar_nova_tentativa(self, tentativa: int, politica: PoliticaRequisicao, limite: float) -> bool:
+        """Aguarda o backoff; retorna False se não houver nova tentativa"""
+        espera = self._espera_nova_tentativa(tentativa, politica, limite)
+        if espera is None:
+            return False
+        time.sleep(espera)
+        return True
+    
+    def _interpretar_resposta(self, status_code: int, texto: str, ler_json) -> Tuple[bool, Dict]:
+        """Converte a resposta HTTP da API externa no formato (sucesso, dados)"""
+        # Verifica se a resposta foi bem-sucedida
+        if status_code == 200 or status_code == 201:
+            try:
+                resultado = ler_json()
+                return True, resultado
+            except ValueError:
+                # Se não conseguir fazer parse do JSON, retorna o texto
+                return True, {"data": texto}
+        else:
+            return False, {
+                "erro": f"Erro na API externa",
+                "status_code": status_code,
+                "resposta": texto[:500]  # Limita o tamanho da resposta
+            }
+    
+    def _consultar_cache_negativo(self, operacao: str, email_telefone: str,
+                                  segredo: str = '') -> Tuple[Optional[bytes], Optional[Dict]]:
+        """Retorna (chave, resposta em cache); a chave é None com o cache desativado"""
+        if not cache_negativo.ativo():
+            return None, None
+        chave = cache_negativo.chave(operacao, email_telefone, segredo)
+        resposta = cache_negativo.obter(operacao, chave)
+        if resposta is not None:
+            self.logger.info("Resposta de %s obtida do cache negativo", operacao)
+        return chave, resposta
+    
+    def _atualizar_cache_negativo(self, chave: Optional[bytes], email_telefone: str, sucesso: bool, resposta: Dict,
+                                  por_status: bool = True):
+        """Guarda erros definitivos da API externa no cache negativo (ver resposta_cacheavel)"""
+        if chave is not None and resposta_cacheavel(sucesso, resposta, por_status):
+            cache_negativo.guardar(chave, email_telefone, resposta)
     
     def _fazer_requisicao(self, endpoint: str, method: str = 'POST', dados: Dict = None) -> Tuple[bool, Dict]:
         """
         Método genérico para fazer requisições à API externa
+        
+        Falhas transitórias (erro de conexão, 502/503/504) são repetidas com
+        backoff exponencial com jitter, sempre dentro do prazo total da política.
         """
         url = f"{self.base_url}{endpoint}"
+        metodo = method.upper()
+        
+        if metodo not in ('POST', 'GET'):
+            return False, {"erro": f"Método {method} não suportado"}
         
+        # Falha imediatamente (CircuitoAbertoError) se o circuito estiver aberto
+        breaker = circuit_breakers.obter(endpoint, current_app.config)
+        breaker.permitir()
+        
+        inicio = time.monotonic()
+        sucesso, resposta = False, {}
         try:
-            self.logger.info(f"Fazendo requisição {method} para {url}")
+            sucesso, resposta = self._requisitar_com_tentativas(url, metodo, dados, self.politica)
+            return sucesso, resposta
+        finally:
+            duracao = time.monotonic() - inicio
+            breaker.registrar(not falha_da_api(sucesso, resposta), duracao)
+            registrar_metricas_upstream(endpoint, sucesso, resposta, duracao)
+    
+    def _requisitar_com_tentativas(self, url: str, metodo: str, dados: Dict,
+                                   politica: PoliticaRequisicao) -> Tuple[bool, Dict]:
+        """
+        Executa a requisição repetindo falhas transitórias dentro do prazo total
+        """
+        limite = time.monotonic() + politica.prazo_total
+        tentativa = 0
+        
+        while True:
+            tentativa += 1
+            restante = limite - time.monotonic()
+            timeout = (min(politica.timeout_conexao, restante), min(politica.timeout_leitura, restante))
             
-            headers = {
-                'Content-Type': 'application/json',
-                'User-Agent': 'Flask-Uninga-Gateway/1.0'
-            }
+            try:
+                self.logger.info("Fazendo requisição %s para %s (tentativa %s)", metodo, url, tentativa)
+                
+                if metodo == 'POST':
+                    response = self.sessao.post(
+                        url, 
+                        json=dados, 
+                        timeout=timeout,
+                        headers=HEADERS_PADRAO
+                    )
+                else:
+                    response = self.sessao.get(
+                        url, 
+                        params=dados, 
+                        timeout=timeout,
+                        headers=HEADERS_PADRAO
+                    )
+                
+                self.logger.info("Response status: %s", response.status_code)
+                
+                if (response.status_code in STATUS_TRANSITORIOS
+                        and self._aguardar_nova_tentativa(tentativa, politica, limite)):
+                    continue
+                
+                return self._interpretar_resposta(response.status_code, response.text, response.json)
             
-            if method.upper() == 'POST':
-                response = requests.post(
-                    url, 
-                    json=dados, 
-                    timeout=self.timeout,
-                    headers=headers
-                )
-            elif method.upper() == 'GET':
-                response = requests.get(
-                    url, 
-                    params=dados, 
-                    timeout=self.timeout,
-                    headers=headers
-                )
-            else:
-                return False, {"erro": f"Método {method} não suportado"}
+            except requests.exceptions.ConnectionError:
+                # Inclui ConnectTimeout: a requisição não chegou à API externa
+                self.logger.error("Erro de conexão com %s", url)
+                if self._aguardar_nova_tentativa(tentativa, politica, limite):
+                    continue
+                return False, {"erro": "Erro de conexão com a API externa"}
             
-            self.logger.info(f"Response status: {response.status_code}")
+            except requests.exceptions.Timeout:
+                self.logger.error("Timeout na requisição para %s", url)
+                return False, {"erro": ERRO_TIMEOUT}
             
-            # Verifica se a resposta foi bem-sucedida
-            if response.status_code == 200 or response.status_code == 201:
-                try:
-                    resultado = response.json()
-                    return True, resultado
-                except ValueError:
-                    # Se não conseguir fazer parse do JSON, retorna o texto
-                    return True, {"data": response.text}
-            else:
-                return False, {
-                    "erro": f"Erro na API externa",
-                    "status_code": response.status_code,
-                    "resposta": response.text[:500]  # Limita o tamanho da resposta
-                }
-                
-        except requests.exceptions.Timeout:
-            self.logger.error(f"Timeout na requisição para {url}")
-            return False, {"erro": "Timeout na comunicação com a API externa"}
-        except requests.exceptions.ConnectionError:
-            self.logger.error(f"Erro de conexão com {url}")
-            return False, {"erro": "Erro de conexão com a API externa"}
-        
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Erro na requisição: {str(e)}")
-            return False, {"erro": f"Erro na requisição: {str(e)}"}
-        
-        except Exception as e:
-            self.logger.error(f"Erro inesperado: {str(e)}")
-            return False, {"erro": f"Erro inesperado: {str(e)}"}
+            except requests.exceptions.RequestException as e:
+                self.logger.error("Erro na requisição: %s", e)
+                return False, {"erro": f"Erro na requisição: {str(e)}"}
+            
+            except Exception as e:
+                self.logger.error("Erro inesperado: %s", e)
+                return False, {"erro": f"Erro inesperado: {str(e)}"}
     
     
+    @rastrear('api_externa')
     def autenticar_usuario(self, email_telefone: str, senha: str):
         """
         Autentica um usuário na API externa e retorna o JSON da resposta diretamente.
@@ -99,25 +283,48 @@ class ApiExternaService:
             "email_telefone": email_telefone,
             "senha": senha
         }
-        self.logger.info(f"Enviando dados para API externa: login='{email_telefone}', senha=[HASH:{senha[:10]}...]")
-        sucesso, resposta = self._fazer_requisicao("/api/login", "POST", dados)
-        print (resposta)
-        self.logger.info(f"Resposta da API externa - Sucesso: {sucesso}, Dados: {resposta}")
+        chave, resposta = self._consultar_cache_negativo('login', email_telefone, senha)
+        if resposta is not None:
+            return False, resposta
+        self.logger.info("Enviando dados para API externa: login='%s', senha=[HASH:%s...]", email_telefone, senha[:10])
+        if current_app.config.get('API_EXTERNA_SINGLE_FLIGHT', True):
+            # Requisições idênticas simultâneas compartilham uma única chamada
+            sucesso, resposta = self._single_flight.executar(
+                (email_telefone, senha), self._fazer_requisicao, "/api/login", "POST", dados
+            )
+        else:
+            sucesso, resposta = self._fazer_requisicao("/api/login", "POST", dados)
+        self._atualizar_cache_negativo(chave, email_telefone, sucesso, resposta)
+        self.logger.info("Resposta da API externa - Sucesso: %s, Dados: %s", sucesso, resposta)
         return sucesso, resposta
     
+    @rastrear('api_externa')
     def resetar_senha(self, email_telefone: str, nova_senha_hash: str) -> Tuple[bool, str]:
         dados = {
             "email_telefone": email_telefone,
             "nova_senha": nova_senha_hash
         }
         
-        self.logger.info(f"Enviando reset de senha para API externa: email_telefone='{email_telefone}'")
+        # Usuário inexistente não depende da nova senha: a chave é só o email/RA,
+        # então só essa resposta é guardada (uma senha recusada não bloqueia a próxima)
+        chave, resposta = self._consultar_cache_negativo('reset', email_telefone)
+        if resposta is not None:
+            return self._resultado_reset(email_telefone, False, resposta)
         
-        sucesso, resposta = self._fazer_requisicao("/api/reset-senha", "POST", dados)
+        self.logger.info("Enviando reset de senha para API externa: email_telefone='%s'", email_telefone)
         
-        if not sucesso:
+        sucesso, resposta = self._fazer_requisicao("/api/reset-senha", "POST", dados)
+        self._atualizar_cache_negativo(chave, email_telefone, sucesso, resposta, por_status=False)
+        return self._resultado_reset(email_telefone, sucesso, resposta)
+    
+    def _resultado_reset(self, email_telefone: str, sucesso: bool, resposta: Dict) -> Tuple[bool, str]:
+        """Extrai a mensagem de status da resposta do reset de senha"""
+        if sucesso:
+            # Senha trocada: falhas guardadas para o email/RA deixam de valer
+            cache_negativo.invalidar_identificador(email_telefone)
+        else:
             erro_msg = resposta.get("status", "NENHUM USUÁRIO ENCONTRADO")
-            self.logger.error(f"Falha no reset de senha: {erro_msg}")
+            self.logger.error("Falha no reset de senha: %s", erro_msg)
             return False, erro_msg
         
         return True, resposta.get("status", "Senha alterada com sucesso")
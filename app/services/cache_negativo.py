@@ -0,0 +1,143 @@
+"""
+Cache negativo de curta duração para falhas definitivas da API externa
+
+Login com credenciais erradas e reset de senha para usuário inexistente
+("NENHUM USUÁRIO ENCONTRADO") são respondidos localmente enquanto a entrada
+não expira. As chaves são HMAC-SHA256 com a SECRET_KEY: nem o email/RA nem o
+hash da senha ficam guardados em memória.
+"""
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from flask import current_app
+
+from app.utils.metricas import metricas
+
+cache_negativo_consultas = metricas.contador(
+    'cache_negativo_consultas_total',
+    'Consultas ao cache negativo da API externa (acerto = chamada evitada)',
+    ('operacao', 'resultado')
+)
+
+
+# Erros definitivos da API externa; 408, 409, 429 e afins podem mudar na tentativa seguinte
+STATUS_CACHEAVEIS = frozenset({400, 401, 403, 404})
+
+# Resposta explícita da API externa para email/RA inexistente
+USUARIO_INEXISTENTE = 'NENHUM USUÁRIO ENCONTRADO'
+
+
+def resposta_cacheavel(sucesso: bool, resposta: Dict, por_status: bool = True) -> bool:
+    """
+    Só erros definitivos: status em STATUS_CACHEAVEIS ou a resposta de usuário
+    inexistente. Com por_status=False (chave sem todas as entradas da
+    requisição, como no reset), apenas a resposta de usuário inexistente.
+    """
+    if sucesso:
+        return False
+    if por_status and resposta.get('status_code') in STATUS_CACHEAVEIS:
+        return True
+    texto = f"{resposta.get('status') or ''} {resposta.get('resposta') or ''}"
+    return USUARIO_INEXISTENTE in texto.upper()
+
+
+class CacheNegativo:
+    """
+    LRU limitado de (expiração, identificador, resposta) por chave HMAC.
+
+    Cada identificador (email/RA normalizado, também como HMAC) aponta para as
+    suas entradas, para que um reset de senha bem-sucedido invalide todas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[bytes, Tuple[float, bytes, Dict]]" = OrderedDict()
+        self._por_identificador: Dict[bytes, Set[bytes]] = {}
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidadas = 0
+
+    @staticmethod
+    def _hmac(*partes: str) -> bytes:
+        segredo = str(current_app.config['SECRET_KEY']).encode('utf-8')
+        mensagem = '\0'.join(partes).encode('utf-8')
+        return hmac.new(segredo, mensagem, hashlib.sha256).digest()
+
+    def chave(self, operacao: str, email_telefone: str, segredo: str = '') -> bytes:
+        return self._hmac(operacao, email_telefone, segredo)
+
+    def _identificador(self, email_telefone: str) -> bytes:
+        return self._hmac('identificador', email_telefone.strip().lower())
+
+    @staticmethod
+    def ativo() -> bool:
+        return current_app.config.get('CACHE_NEGATIVO_ATIVO', True)
+
+    def obter(self, operacao: str, chave: bytes) -> Optional[Dict]:
+        """Resposta de erro guardada para a chave, ou None se ausente ou expirada"""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] <= time.monotonic():
+                self._remover(chave)
+                entrada = None
+            if entrada is None:
+                self.falhas += 1
+            else:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+        cache_negativo_consultas.rotulos(operacao, 'falha' if entrada is None else 'acerto').inc()
+        return None if entrada is None else entrada[2]
+
+    def guardar(self, chave: bytes, email_telefone: str, resposta: Dict):
+        config = current_app.config
+        ttl = config.get('CACHE_NEGATIVO_TTL', 30)
+        tamanho_max = config.get('CACHE_NEGATIVO_MAX_ENTRADAS', 10000)
+        if ttl <= 0 or tamanho_max <= 0:
+            return
+
+        identificador = self._identificador(email_telefone)
+        with self._lock:
+            self._remover(chave)
+            self._entradas[chave] = (time.monotonic() + ttl, identificador, resposta)
+            self._por_identificador.setdefault(identificador, set()).add(chave)
+            while len(self._entradas) > tamanho_max:
+                self._remover(next(iter(self._entradas)))
+
+    def invalidar_identificador(self, email_telefone: str):
+        """Remove todas as entradas do email/RA (ex.: após trocar a senha)"""
+        identificador = self._identificador(email_telefone)
+        with self._lock:
+            for chave in list(self._por_identificador.get(identificador, ())):
+                self._remover(chave)
+                self.invalidadas += 1
+
+    def _remover(self, chave: bytes):
+        """Remove a entrada e o seu vínculo com o identificador (com o lock adquirido)"""
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return
+        chaves = self._por_identificador.get(entrada[1])
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del self._por_identificador[entrada[1]]
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'entradas': len(self._entradas),
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else 0.0,
+                'chamadas_evitadas': self.acertos,
+                'invalidadas': self.invalidadas
+            }
+
+
+# Instância global
+cache_negativo = CacheNegativo()
@@ -0,0 +1,179 @@
+"""
+Circuit breaker por endpoint para a API externa do Oracle APEX
+
+fechado     -> chamadas passam; falhas e latência são medidas em janela deslizante
+aberto      -> chamadas falham imediatamente (503) até o fim do tempo de espera
+meio_aberto -> um número limitado de sondas passa; se todas tiverem sucesso o
+               circuito fecha, se alguma falhar ele volta a abrir
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+FECHADO = 'fechado'
+ABERTO = 'aberto'
+MEIO_ABERTO = 'meio_aberto'
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitoAbertoError(Exception):
+    """Chamada recusada porque o circuito do endpoint está aberto"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Circuito aberto para {endpoint}")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Circuit breaker thread-safe baseado em taxa de falhas e chamadas lentas"""
+
+    def __init__(self, nome: str, janela: float = 30.0, min_requisicoes: int = 10,
+                 taxa_falha: float = 0.5, latencia_lenta: float = 5.0,
+                 tempo_aberto: float = 15.0, sondas: int = 3):
+        self.nome = nome
+        self.janela = janela
+        self.min_requisicoes = min_requisicoes
+        self.taxa_falha = taxa_falha
+        self.latencia_lenta = latencia_lenta
+        self.tempo_aberto = tempo_aberto
+        self.sondas = sondas
+
+        self._lock = threading.Lock()
+        self._estado = FECHADO
+        self._aberto_em = 0.0
+        self._sondas_em_andamento = 0
+        self._sondas_ok = 0
+        self._amostras = deque()  # (timestamp, falhou, latência)
+        self._falhas = 0
+        self._soma_latencia = 0.0
+        self.transicoes = 0
+        self.rejeitadas = 0
+
+    def _descartar_antigas(self, agora: float):
+        limite = agora - self.janela
+        while self._amostras and self._amostras[0][0] < limite:
+            _, falhou, latencia = self._amostras.popleft()
+            self._falhas -= falhou
+            self._soma_latencia -= latencia
+
+    def _mudar_estado(self, novo: str, agora: float):
+        anterior, self._estado = self._estado, novo
+        self.transicoes += 1
+        if novo == ABERTO:
+            self._aberto_em = agora
+        if novo != MEIO_ABERTO:
+            self._sondas_em_andamento = 0
+            self._sondas_ok = 0
+        if novo == FECHADO:
+            self._amostras.clear()
+            self._falhas = 0
+            self._soma_latencia = 0.0
+        logger.warning("CIRCUIT_BREAKER %s: %s -> %s", self.nome, anterior, novo)
+
+    def permitir(self):
+        """Reserva a passagem de uma chamada ou levanta CircuitoAbertoError"""
+        with self._lock:
+            agora = time.monotonic()
+
+            if self._estado == ABERTO:
+                restante = self._aberto_em + self.tempo_aberto - agora
+                if restante > 0:
+                    self.rejeitadas += 1
+                    raise CircuitoAbertoError(self.nome, restante)
+                self._mudar_estado(MEIO_ABERTO, agora)
+
+            if self._estado == MEIO_ABERTO:
+                if self._sondas_em_andamento + self._sondas_ok >= self.sondas:
+                    self.rejeitadas += 1
+                    raise CircuitoAbertoError(self.nome, 1.0)
+                self._sondas_em_andamento += 1
+
+    def registrar(self, sucesso: bool, latencia: float):
+        """Registra o resultado de uma chamada liberada por permitir()"""
+        falhou = (not sucesso) or latencia >= self.latencia_lenta
+
+        with self._lock:
+            agora = time.monotonic()
+
+            if self._estado == MEIO_ABERTO:
+                self._sondas_em_andamento = max(self._sondas_em_andamento - 1, 0)
+                if falhou:
+                    self._mudar_estado(ABERTO, agora)
+                else:
+                    self._sondas_ok += 1
+                    if self._sondas_ok >= self.sondas:
+                        self._mudar_estado(FECHADO, agora)
+                return
+
+            if self._estado == ABERTO:
+                # Chamada liberada antes da abertura terminou depois dela
+                return
+
+            self._amostras.append((agora, falhou, latencia))
+            self._falhas += falhou
+            self._soma_latencia += latencia
+            self._descartar_antigas(agora)
+
+            total = len(self._amostras)
+            if total >= self.min_requisicoes and self._falhas / total >= self.taxa_falha:
+                self._mudar_estado(ABERTO, agora)
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._estado == ABERTO and time.monotonic() >= self._aberto_em + self.tempo_aberto:
+                # Ainda não recebeu chamadas, mas a próxima será uma sonda
+                return MEIO_ABERTO
+            return self._estado
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            self._descartar_antigas(time.monotonic())
+            total = len(self._amostras)
+            return {
+                'estado': self._estado,
+                'requisicoes_janela': total,
+                'taxa_falha': round(self._falhas / total, 4) if total else 0.0,
+                'latencia_media': round(self._soma_latencia / total, 4) if total else 0.0,
+                'transicoes': self.transicoes,
+                'rejeitadas': self.rejeitadas
+            }
+
+
+class RegistroCircuitBreakers:
+    """Um circuit breaker por endpoint, criado sob demanda a partir da configuração"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def obter(self, endpoint: str, config) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(endpoint)
+                if breaker is None:
+                    breaker = self._breakers[endpoint] = CircuitBreaker(
+                        endpoint,
+                        janela=config.get('CIRCUIT_BREAKER_JANELA', 30.0),
+                        min_requisicoes=config.get('CIRCUIT_BREAKER_MIN_REQUISICOES', 10),
+                        taxa_falha=config.get('CIRCUIT_BREAKER_TAXA_FALHA', 0.5),
+                        latencia_lenta=config.get('CIRCUIT_BREAKER_LATENCIA_LENTA', 5.0),
+                        tempo_aberto=config.get('CIRCUIT_BREAKER_TEMPO_ABERTO', 15.0),
+                        sondas=config.get('CIRCUIT_BREAKER_SONDAS', 3)
+                    )
+        return breaker
+
+    def estados(self) -> Dict[str, str]:
+        return {nome: breaker.estado for nome, breaker in list(self._breakers.items())}
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {nome: breaker.snapshot() for nome, breaker in list(self._breakers.items())}
+
+
+# Registro global
+circuit_breakers = RegistroCircuitBreakers()
@@ -0,0 +1,40 @@
+"""
+Estatísticas de uso do pool de conexões da API externa
+
+Módulo sem dependências pesadas: é importado na carga da aplicação, enquanto o
+pool baseado em requests (pool_http) só é carregado na primeira requisição.
+"""
+import threading
+from typing import Dict
+
+
+class EstatisticasPool:
+    """Contadores thread-safe de uso do pool de conexões"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.abertas = 0
+        self.retiradas = 0
+        self.devolvidas = 0
+
+    def registrar_abertura(self):
+        with self._lock:
+            self.abertas += 1
+
+    def registrar_retirada(self):
+        with self._lock:
+            self.retiradas += 1
+
+    def registrar_devolucao(self):
+        with self._lock:
+            self.devolvidas += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """Retorna uma cópia consistente dos contadores"""
+        with self._lock:
+            return {
+                'conexoes_abertas': self.abertas,
+                'conexoes_reutilizadas': max(self.retiradas - self.abertas, 0),
+                'conexoes_em_uso': max(self.retiradas - self.devolvidas, 0),
+                'requisicoes': self.retiradas
+            }
@@ -0,0 +1,86 @@
+"""
+Pool de conexões HTTP keep-alive para a API externa
+"""
+import socket
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from app.services.estatisticas_pool import EstatisticasPool
+
+
+def _pool_instrumentado(base, estatisticas: EstatisticasPool):
+    """Cria uma subclasse do pool do urllib3 que alimenta as estatísticas"""
+
+    class PoolInstrumentado(base):
+        def _new_conn(self):
+            estatisticas.registrar_abertura()
+            return super()._new_conn()
+
+        def _get_conn(self, timeout=None):
+            conn = super()._get_conn(timeout=timeout)
+            estatisticas.registrar_retirada()
+            return conn
+
+        def _put_conn(self, conn):
+            estatisticas.registrar_devolucao()
+            return super()._put_conn(conn)
+
+    return PoolInstrumentado
+
+
+def _opcoes_keepalive(keepalive_idle: int):
+    """Opções de socket para manter conexões ociosas vivas no nível TCP"""
+    opcoes = list(HTTPConnection.default_socket_options)
+    if keepalive_idle <= 0:
+        return opcoes
+
+    opcoes.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # TCP_KEEPIDLE/TCP_KEEPINTVL não existem em todas as plataformas
+    if hasattr(socket, 'TCP_KEEPIDLE'):
+        opcoes.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, keepalive_idle))
+    if hasattr(socket, 'TCP_KEEPINTVL'):
+        opcoes.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(keepalive_idle // 4, 1)))
+    return opcoes
+
+
+class AdapterPoolHTTP(HTTPAdapter):
+    """HTTPAdapter com keep-alive TCP e pools instrumentados"""
+
+    def __init__(self, estatisticas: EstatisticasPool, keepalive_idle: int = 60, **kwargs):
+        self.estatisticas = estatisticas
+        self.keepalive_idle = keepalive_idle
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs['socket_options'] = _opcoes_keepalive(self.keepalive_idle)
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _pool_instrumentado(HTTPConnectionPool, self.estatisticas),
+            'https': _pool_instrumentado(HTTPSConnectionPool, self.estatisticas)
+        }
+
+
+def criar_sessao(estatisticas: EstatisticasPool, pool_hosts: int, pool_maxsize: int,
+                 pool_block: bool, keepalive_idle: int) -> requests.Session:
+    """
+    Cria uma sessão requests de longa duração com pool de conexões
+
+    pool_hosts: quantidade de hosts distintos mantidos em cache
+    pool_maxsize: conexões simultâneas por host
+    pool_block: se True, o limite por host é rígido (aguarda conexão livre)
+    """
+    sessao = requests.Session()
+    adapter = AdapterPoolHTTP(
+        estatisticas,
+        keepalive_idle=keepalive_idle,
+        pool_connections=pool_hosts,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+        max_retries=0
+    )
+    sessao.mount('http://', adapter)
+    sessao.mount('https://', adapter)
+    return sessao
@@ -0,0 +1,61 @@
+"""
+Agrupamento (single-flight) de chamadas idênticas em andamento
+
+Enquanto uma chamada para uma chave está em andamento, chamadas concorrentes
+com a mesma chave aguardam e recebem o mesmo resultado. Nada é guardado após
+o término da chamada: a próxima chamada com a mesma chave vai à origem.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Single-flight thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_andamento: Dict[Hashable, Future] = {}
+        self.chamadas = 0
+        self.agrupadas = 0
+
+    def _entrar(self, chave: Hashable):
+        """Retorna (future, é_líder) para a chave"""
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            if futuro is not None:
+                self.agrupadas += 1
+                return futuro, False
+
+            futuro = self._em_andamento[chave] = Future()
+            self.chamadas += 1
+            return futuro, True
+
+    def _sair(self, chave: Hashable):
+        with self._lock:
+            self._em_andamento.pop(chave, None)
+
+    def executar(self, chave: Hashable, funcao: Callable, *args, **kwargs) -> Any:
+        """Executa funcao(*args, **kwargs), agrupando chamadas concorrentes com a mesma chave"""
+        futuro, lider = self._entrar(chave)
+        if not lider:
+            return futuro.result()
+
+        try:
+            resultado = funcao(*args, **kwargs)
+        except BaseException as e:
+            self._sair(chave)
+            futuro.set_exception(e)
+            raise
+
+        self._sair(chave)
+        futuro.set_result(resultado)
+        return resultado
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'chamadas': self.chamadas,
+                'agrupadas': self.agrupadas,
+                'em_andamento': len(self._em_andamento)
+            }
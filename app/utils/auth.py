@@ -2,41 +2,266 @@
 Módulo de autenticação JWT - Versão sem bcrypt
 Atualizado: 2025-07-14 para remover dependência do bcrypt
 """
-import jwt
-from datetime import datetime
+import hmac
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
 from flask import current_app, request, jsonify
 from functools import wraps
+from app.utils.cache_tokens import CacheTokensVerificados
+from app.utils.chaves import obter_anel_chaves
+from app.utils.importacao import modulo_tardio
+from app.utils.metricas import jwt_duracao
+from app.utils.perfil_store import obter_perfil_store
+from app.utils.redis_resp import ErroRedis
+from app.utils.revogacao import BackendRevogacao, criar_backend_revogacao, identificador_token
+from app.utils.tracing import rastrear, span
 
-# Blacklist para tokens revogados (em produção, use Redis ou banco de dados)
-token_blacklist = set()
+# PyJWT só é carregado na primeira emissão ou verificação de token
+jwt = modulo_tardio('jwt')
 
-def gerar_token_jwt(usuario_info):
-    """Gera um token JWT para o usuário"""
-    payload = {
-        'usuario_info': usuario_info,
-        'iat': datetime.utcnow(),
-        'exp': datetime.utcnow() + current_app.config['JWT_EXPIRATION_DELTA']
+# Séries de métricas resolvidas uma vez, fora do caminho quente
+_metrica_encode = jwt_duracao.rotulos('encode')
+_metrica_decode = jwt_duracao.rotulos('decode')
+
+# Backend de revogação (jti -> exp), criado a partir da configuração no primeiro uso
+_backend_revogacao = None
+_backend_revogacao_lock = threading.Lock()
+
+# Payloads de tokens já verificados, válidos até o exp de cada token
+cache_tokens = CacheTokensVerificados()
+
+def obter_backend_revogacao() -> BackendRevogacao:
+    """Retorna o backend de revogação configurado em REVOGACAO_BACKEND"""
+    global _backend_revogacao
+    if _backend_revogacao is None:
+        with _backend_revogacao_lock:
+            if _backend_revogacao is None:
+                _backend_revogacao = criar_backend_revogacao(current_app.config)
+    return _backend_revogacao
+
+# Claims do próprio token, que não fazem parte do perfil do usuário
+CLAIMS_DO_TOKEN = frozenset({'iat', 'exp', 'nbf', 'jti', 'rt_tipo', 'rt_fam'})
+
+# Claim 'rt_tipo' dos access tokens curtos (JWT_PAR_TOKENS), que dispensam a consulta de revogação
+TIPO_ACESSO = 'acesso'
+
+def _claims_enxutos(usuario_info, jti, exp):
+    """Claims do token enxuto: o perfil completo fica no perfil_store"""
+    perfil = usuario_info if isinstance(usuario_info, dict) else {}
+    permissoes = perfil.get('permissoes')
+    return {
+        'sub': str(perfil.get('identificador') or perfil.get('email') or perfil.get('id') or perfil.get('sub') or jti),
+        'jti': jti,
+        'exp': exp,
+        'permissoes': permissoes if isinstance(permissoes, list) else []
     }
-    return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
 
-def verificar_token_jwt(token):
-    """Verifica se o token JWT é válido"""
+@rastrear('jwt_encode')
+def gerar_token_jwt(usuario_info, familia=None):
+    """
+    Gera um token JWT para o usuário. Com JWT_SLIM o token leva só sub, jti,
+    exp e permissoes, e o perfil é guardado no servidor pelo jti.
+    familia: família de refresh token da sessão; gera um access token curto
+    (JWT_ACESSO_EXPIRACAO) ligado a ela, em vez do token de JWT_EXPIRATION_DELTA
+    """
+    jti = uuid.uuid4().hex
+    duracao = current_app.config['JWT_ACESSO_EXPIRACAO'] if familia else current_app.config['JWT_EXPIRATION_DELTA']
+    exp = datetime.utcnow() + duracao
+    if current_app.config.get('JWT_SLIM'):
+        payload = _claims_enxutos(usuario_info, jti, exp)
+        try:
+            obter_perfil_store().guardar(jti, usuario_info, exp.replace(tzinfo=timezone.utc).timestamp())
+        except (ErroRedis, OSError) as e:
+            # Sem o perfil o token continua válido; verify-token devolve só as claims
+            current_app.logger.warning("Falha ao guardar perfil do token: %s", e)
+    else:
+        payload = {
+            'usuario_info': usuario_info,
+            'jti': jti,
+            'iat': datetime.utcnow(),
+            'exp': exp
+        }
+    if familia:
+        payload['rt_tipo'] = TIPO_ACESSO
+        payload['rt_fam'] = familia
+    inicio = time.perf_counter()
+    token = _assinar(payload)
+    _metrica_encode.observar(time.perf_counter() - inicio)
+    return token
+
+def _assinar(payload):
+    """HS256 com a SECRET_KEY, ou a chave ativa do anel (com kid) em ES256/EdDSA"""
+    config = current_app.config
+    if config.get('JWT_ALGORITMO', 'HS256') == 'HS256':
+        return jwt.encode(payload, config['SECRET_KEY'], algorithm='HS256')
+    chave = obter_anel_chaves().ativa
+    return jwt.encode(payload, chave.privada, algorithm=chave.alg, headers={'kid': chave.kid})
+
+def _verificar_assinatura(token):
+    """
+    Escolhe a chave pelo kid do cabeçalho; cada chave aceita só o seu algoritmo.
+    Tokens sem kid são HS256 (modo padrão, ou emitidos antes da troca de algoritmo).
+    """
+    config = current_app.config
+    kid = jwt.get_unverified_header(token).get('kid')
+    if kid is None:
+        if config.get('JWT_ALGORITMO', 'HS256') != 'HS256' and not config.get('JWT_ACEITAR_HS256', True):
+            raise jwt.InvalidTokenError("Token sem kid")
+        return jwt.decode(token, config['SECRET_KEY'], algorithms=['HS256'])
+    if config.get('JWT_ALGORITMO', 'HS256') == 'HS256':
+        raise jwt.InvalidTokenError("Token com kid sem chaves assimétricas configuradas")
+    chave = obter_anel_chaves().chave_verificacao(kid)
+    if chave is None:
+        raise jwt.InvalidTokenError("kid desconhecido")
+    return jwt.decode(token, chave.publica, algorithms=[chave.alg])
+
+def hidratar_perfil(payload):
+    """
+    Claims do token com o perfil em usuario_info. Tokens enxutos trazem o
+    perfil do perfil_store; tokens completos já o carregam.
+    """
+    if 'usuario_info' in payload or not payload.get('jti'):
+        return payload
     try:
-        # Verifica se o token está na blacklist
-        if token in token_blacklist:
-            return None, "Token foi revogado"
-        
-        # Decodifica o token
-        payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        perfil = obter_perfil_store().obter(payload['jti'])
+    except (ErroRedis, OSError) as e:
+        current_app.logger.warning("Falha ao obter perfil do token: %s", e)
+        perfil = None
+    if perfil is None:
+        return payload
+    return {**payload, 'usuario_info': perfil}
+
+@rastrear('jwt_decode')
+def decodificar_token_jwt(token):
+    """
+    Verifica assinatura e expiração do token, sem consultar a revogação.
+    Retorna (payload, erro).
+    """
+    try:
+        # Token verificado recentemente: dispensa a verificação criptográfica
+        payload = cache_tokens.obter(token)
+        if payload is None:
+            # Decodifica o token
+            inicio = time.perf_counter()
+            try:
+                payload = _verificar_assinatura(token)
+            finally:
+                _metrica_decode.observar(time.perf_counter() - inicio)
+            cache_tokens.guardar(token, payload, current_app.config.get('JWT_CACHE_TAMANHO', 4096))
         return payload, None
     except jwt.ExpiredSignatureError:
         return None, "Token expirado"
     except jwt.InvalidTokenError:
         return None, "Token inválido"
 
-def adicionar_token_blacklist(token):
-    """Adiciona um token à blacklist"""
-    token_blacklist.add(token)
+def _e_payload_de_token(dados):
+    return isinstance(dados, dict) and ('usuario_info' in dados or 'exp' in dados)
+
+class PerfilIndisponivelError(Exception):
+    """Perfil de um token enxuto ausente do perfil_store (expirado, descartado pelo LRU ou em outra instância)"""
+
+def perfil_do_payload(payload):
+    """
+    Projeção plana do perfil do usuário a partir das claims de um token.
+    Desfaz o aninhamento {'usuario': payload_anterior} dos tokens renovados
+    em versões anteriores. As claims do próprio token (iat, exp, jti) só são
+    descartadas quando o perfil é o próprio payload; um usuario_info é
+    devolvido intacto.
+
+    Tokens enxutos levam só sub e permissoes: sem o perfil no store, levanta
+    PerfilIndisponivelError (ou o ErroRedis/OSError do store) em vez de
+    devolver as claims como se fossem o perfil.
+    """
+    if 'usuario_info' not in payload and payload.get('jti'):
+        perfil = obter_perfil_store().obter(payload['jti'])
+        if perfil is None:
+            raise PerfilIndisponivelError("Perfil do token não encontrado")
+        payload = {'usuario_info': perfil}
+    perfil = payload
+    e_payload = True
+    while isinstance(perfil, dict):
+        if 'usuario_info' in perfil:
+            perfil, e_payload = perfil['usuario_info'], False
+        elif len(perfil) == 1 and _e_payload_de_token(perfil.get('usuario')):
+            perfil, e_payload = perfil['usuario'], True
+        else:
+            break
+    if not isinstance(perfil, dict) or not e_payload:
+        return perfil
+    return {chave: valor for chave, valor in perfil.items() if chave not in CLAIMS_DO_TOKEN}
+
+def verificar_token_jwt(token):
+    """Verifica se o token JWT é válido"""
+    payload, erro = decodificar_token_jwt(token)
+    if erro:
+        return None, erro
+    
+    # Access tokens curtos não são revogados: expiram sozinhos
+    if payload.get('rt_tipo') == TIPO_ACESSO:
+        return payload, None
+    
+    # Verifica se o token está na blacklist
+    with span('revogacao'):
+        revogado = obter_backend_revogacao().esta_revogado(identificador_token(token, payload))
+    if revogado:
+        return None, "Token foi revogado"
+    
+    return payload, None
+
+def verificar_tokens_em_lote(tokens):
+    """
+    Verifica vários tokens de uma vez; a revogação é consultada em uma única
+    busca em lote no backend. Retorna um resultado por token, na mesma ordem.
+    """
+    resultados = []
+    identificadores = {}
+    
+    for indice, token in enumerate(tokens):
+        if not isinstance(token, str) or not token:
+            resultados.append({'valid': False, 'revoked': False, 'message': 'Token inválido', 'claims': None})
+            continue
+        
+        payload, erro = decodificar_token_jwt(token)
+        if erro:
+            resultados.append({'valid': False, 'revoked': False, 'message': erro, 'claims': None})
+            continue
+        
+        if payload.get('rt_tipo') != TIPO_ACESSO:
+            identificadores[indice] = identificador_token(token, payload)
+        resultados.append({'valid': True, 'revoked': False, 'message': 'Token válido', 'claims': payload})
+    
+    revogados = obter_backend_revogacao().revogados(set(identificadores.values())) if identificadores else set()
+    for indice, identificador in identificadores.items():
+        if identificador in revogados:
+            resultados[indice].update({'valid': False, 'revoked': True, 'message': 'Token foi revogado', 'claims': None})
+    
+    return resultados
+
+def adicionar_token_blacklist(token, payload=None):
+    """
+    Adiciona um token à blacklist até o seu exp.
+    payload: claims já verificados do token; se omitido, são lidos do próprio token
+    """
+    if payload is None:
+        try:
+            payload = jwt.decode(token, options={'verify_signature': False, 'verify_exp': False})
+        except jwt.InvalidTokenError:
+            payload = {}
+    
+    exp = payload.get('exp')
+    if not isinstance(exp, (int, float)):
+        exp = time.time() + current_app.config['JWT_EXPIRATION_DELTA'].total_seconds()
+    
+    obter_backend_revogacao().revogar(identificador_token(token, payload), exp)
+    cache_tokens.invalidar(token)
+    if payload.get('jti') and 'usuario_info' not in payload and current_app.config.get('JWT_SLIM'):
+        try:
+            obter_perfil_store().remover(payload['jti'])
+        except (ErroRedis, OSError) as e:
+            # O perfil expira sozinho junto com o token
+            current_app.logger.warning("Falha ao remover perfil do token: %s", e)
 
 def obter_token_do_header():
     """Extrai o token do header Authorization"""
@@ -45,6 +270,17 @@ def obter_token_do_header():
         return auth_header.split(" ")[1]
     return None
 
+def credencial_servico_valida(chave_config):
+    """
+    Compara o Bearer do header com o segredo compartilhado em chave_config.
+    Sem o segredo configurado, nenhuma credencial é aceita.
+    """
+    esperado = current_app.config.get(chave_config)
+    recebido = obter_token_do_header()
+    if not esperado or not recebido:
+        return False
+    return hmac.compare_digest(recebido.encode('utf-8'), str(esperado).encode('utf-8'))
+
 def token_required(f):
     """Decorator para rotas que requerem autenticação"""
     @wraps(f)
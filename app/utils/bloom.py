@@ -0,0 +1,53 @@
+"""
+Filtro de Bloom para testes rápidos de pertinência
+"""
+import math
+import threading
+
+import xxhash
+
+_MASCARA_64 = (1 << 64) - 1
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom dimensionado pela capacidade e taxa de falso positivo desejadas.
+
+    Um resultado negativo é definitivo; um positivo só indica que o item
+    provavelmente está no conjunto. Os k índices vêm de um único xxh3-128
+    (double hashing de Kirsch-Mitzenmacher).
+    """
+
+    def __init__(self, capacidade: int, taxa_falso_positivo: float = 0.001):
+        capacidade = max(int(capacidade), 1)
+        self.capacidade = capacidade
+        self.taxa_falso_positivo = taxa_falso_positivo
+        self.num_bits = max(int(math.ceil(-capacidade * math.log(taxa_falso_positivo) / (math.log(2) ** 2))), 8)
+        self.num_hashes = max(int(round(self.num_bits / capacidade * math.log(2))), 1)
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+        self.itens = 0
+
+    def _posicoes(self, item: str):
+        h = xxhash.xxh3_128_intdigest(item.encode('utf-8'))
+        h1, h2 = h & _MASCARA_64, (h >> 64) | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def adicionar(self, item: str):
+        posicoes = self._posicoes(item)
+        with self._lock:
+            for posicao in posicoes:
+                self._bits[posicao >> 3] |= 1 << (posicao & 7)
+            self.itens += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        for posicao in self._posicoes(item):
+            if not bits[posicao >> 3] & (1 << (posicao & 7)):
+                return False
+        return True
+
+    def taxa_estimada(self) -> float:
+        """Taxa de falso positivo esperada para a ocupação atual"""
+        return (1 - math.exp(-self.num_hashes * self.itens / self.num_bits)) ** self.num_hashes
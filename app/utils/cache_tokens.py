@@ -0,0 +1,74 @@
+"""
+Cache LRU de payloads de tokens JWT já verificados
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import xxhash
+
+
+class CacheTokensVerificados:
+    """
+    LRU limitado de tokens cuja assinatura já foi verificada.
+
+    A chave é um digest xxh3 do token; o token completo também é guardado e
+    comparado no acerto, para que uma colisão de digest nunca aceite um token
+    diferente sem verificação criptográfica.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+
+    @staticmethod
+    def _chave(token: str) -> bytes:
+        return xxhash.xxh3_128_digest(token.encode('utf-8'))
+
+    def obter(self, token: str) -> Optional[Dict]:
+        """Retorna o payload verificado, ou None se ausente ou expirado"""
+        chave = self._chave(token)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None or entrada[0] != token:
+                self.falhas += 1
+                return None
+
+            _, payload, exp = entrada
+            if exp <= time.time():
+                # Expirou: remove e deixa o jwt.decode produzir o erro
+                del self._entradas[chave]
+                self.falhas += 1
+                return None
+
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return payload
+
+    def guardar(self, token: str, payload: Dict, tamanho_max: int):
+        """Guarda um payload recém-verificado; expira junto com o claim exp"""
+        exp = payload.get('exp')
+        if not isinstance(exp, (int, float)) or tamanho_max <= 0:
+            return
+
+        chave = self._chave(token)
+        with self._lock:
+            self._entradas[chave] = (token, payload, exp)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > tamanho_max:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, token: str):
+        with self._lock:
+            self._entradas.pop(self._chave(token), None)
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entradas': len(self._entradas),
+                'acertos': self.acertos,
+                'falhas': self.falhas
+            }
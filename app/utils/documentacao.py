@@ -0,0 +1,119 @@
+"""
+Documentação da API (Swagger UI e especificação OpenAPI) servida pré-serializada
+
+A especificação fica em app/data/openapi.json e só é lida no primeiro acesso.
+Corpo, ETag e variantes gzip/brotli são gerados uma única vez e reaproveitados
+em todas as respostas seguintes.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+from flask import Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele só a variante gzip é servida
+    brotli = None
+
+CAMINHO_OPENAPI = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'openapi.json')
+
+HTML_SWAGGER_UI = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>API Flask Uninga - Swagger UI</title>
+    <link rel="stylesheet" type="text/css" href="https://unpkg.com/swagger-ui-dist@3.25.0/swagger-ui.css" />
+</head>
+<body>
+    <div id="swagger-ui"></div>
+    <script src="https://unpkg.com/swagger-ui-dist@3.25.0/swagger-ui-bundle.js"></script>
+    <script>
+        window.onload = function() {
+            SwaggerUIBundle({
+                url: '/swagger.json',
+                dom_id: '#swagger-ui',
+                deepLinking: true
+            });
+        };
+    </script>
+</body>
+</html>
+    """
+
+
+class RecursoPreCompactado:
+    """Corpo imutável com ETag forte e variantes comprimidas calculadas uma vez"""
+
+    def __init__(self, corpo: bytes, mimetype: str, config_cache_control: str = 'DOCUMENTACAO_CACHE_CONTROL'):
+        self.corpo = corpo
+        self.mimetype = mimetype
+        self.config_cache_control = config_cache_control
+        self.etag = hashlib.sha256(corpo).hexdigest()[:32]
+
+        # codificação -> (corpo comprimido, etag da variante)
+        self.variantes: Dict[str, tuple] = {}
+        comprimidos = {'gzip': gzip.compress(corpo, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            comprimidos['br'] = brotli.compress(corpo, quality=11)
+        for codificacao, dados in comprimidos.items():
+            if len(dados) < len(corpo):
+                # ETag forte distinta por representação, como exige o HTTP
+                self.variantes[codificacao] = (dados, f"{self.etag}-{codificacao}")
+
+    def _escolher_variante(self) -> Optional[str]:
+        aceitas = request.accept_encodings
+        for codificacao in ('br', 'gzip'):
+            if codificacao in self.variantes and aceitas[codificacao] > 0:
+                return codificacao
+        return None
+
+    def responder(self) -> Response:
+        codificacao = self._escolher_variante()
+        corpo, etag = self.variantes[codificacao] if codificacao else (self.corpo, self.etag)
+
+        if request.if_none_match.contains_weak(etag) or request.if_none_match.star_tag:
+            resposta = Response(status=304)
+        else:
+            resposta = Response(corpo, mimetype=self.mimetype)
+            if codificacao:
+                resposta.headers['Content-Encoding'] = codificacao
+
+        resposta.set_etag(etag)
+        resposta.headers['Cache-Control'] = current_app.config.get(self.config_cache_control, 'public, max-age=300')
+        resposta.headers['Vary'] = 'Accept-Encoding'
+        return resposta
+
+
+_lock = threading.Lock()
+_recursos: Dict[str, RecursoPreCompactado] = {}
+
+
+def _obter_recurso(nome: str, construir: Callable[[], RecursoPreCompactado]) -> RecursoPreCompactado:
+    recurso = _recursos.get(nome)
+    if recurso is None:
+        with _lock:
+            recurso = _recursos.get(nome)
+            if recurso is None:
+                recurso = _recursos[nome] = construir()
+    return recurso
+
+
+def _construir_especificacao() -> RecursoPreCompactado:
+    with open(CAMINHO_OPENAPI, encoding='utf-8') as arquivo:
+        especificacao = json.load(arquivo)
+    corpo = json.dumps(especificacao, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return RecursoPreCompactado(corpo, 'application/json')
+
+
+def especificacao_openapi() -> RecursoPreCompactado:
+    """Especificação OpenAPI, carregada do arquivo de dados no primeiro acesso"""
+    return _obter_recurso('openapi', _construir_especificacao)
+
+
+def pagina_swagger_ui() -> RecursoPreCompactado:
+    """Página HTML do Swagger UI"""
+    return _obter_recurso('swagger_ui', lambda: RecursoPreCompactado(HTML_SWAGGER_UI.encode('utf-8'), 'text/html'))
@@ -0,0 +1,39 @@
+"""
+Importação tardia de módulos pesados, para reduzir o cold start na Vercel
+"""
+import importlib
+import sys
+from types import ModuleType
+from typing import Optional
+
+
+class ModuloTardio:
+    """
+    Referência a um módulo que só é importado no primeiro acesso a um atributo.
+
+    Usado no lugar de `import modulo` quando o módulo só é necessário dentro de
+    funções (nunca em bases de classes ou anotações avaliadas na definição).
+    """
+
+    def __init__(self, nome: str):
+        self._nome = nome
+        self._modulo: Optional[ModuleType] = None
+
+    def __getattr__(self, atributo: str):
+        modulo = self._modulo
+        if modulo is None:
+            # import_module usa o lock de importação: seguro entre threads
+            modulo = self._modulo = importlib.import_module(self._nome)
+        return getattr(modulo, atributo)
+
+    @property
+    def carregado(self) -> bool:
+        return self._modulo is not None or self._nome in sys.modules
+
+    def __repr__(self) -> str:
+        return f"<ModuloTardio {self._nome} ({'carregado' if self.carregado else 'pendente'})>"
+
+
+def modulo_tardio(nome: str):
+    """Retorna o módulo se já estiver importado, ou uma referência tardia a ele"""
+    return sys.modules.get(nome) or ModuloTardio(nome)
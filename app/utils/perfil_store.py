@@ -0,0 +1,150 @@
+"""
+Perfis de usuário dos tokens enxutos (JWT_SLIM), guardados no servidor por jti
+
+Backends disponíveis (PERFIL_STORE_BACKEND):
+    memoria -> LRU limitado, apenas no processo atual
+    redis   -> qualquer servidor do protocolo Redis, compartilhado entre
+               instâncias, com o LRU local na frente
+
+Um perfil nunca muda depois de emitido o token, então a cópia local não
+precisa de invalidação entre instâncias: cada entrada expira com o token.
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from flask import current_app
+
+from app.utils.redis_resp import ClienteRESP
+
+
+class PerfilStore:
+    """Interface dos backends de perfil"""
+
+    nome = ''
+
+    def guardar(self, jti: str, perfil: Dict, exp: float):
+        raise NotImplementedError
+
+    def obter(self, jti: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def remover(self, jti: str):
+        raise NotImplementedError
+
+    def estatisticas(self) -> Dict:
+        return {'backend': self.nome}
+
+
+class PerfilStoreMemoria(PerfilStore):
+    """LRU de jti -> (exp, perfil); o perfil mais antigo sai quando o limite é atingido"""
+
+    nome = 'memoria'
+
+    def __init__(self, max_entradas: int = 100000):
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+
+    def guardar(self, jti: str, perfil: Dict, exp: float):
+        with self._lock:
+            self._entradas[jti] = (exp, perfil)
+            self._entradas.move_to_end(jti)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def obter(self, jti: str) -> Optional[Dict]:
+        with self._lock:
+            entrada = self._entradas.get(jti)
+            if entrada is not None and entrada[0] <= time.time():
+                del self._entradas[jti]
+                entrada = None
+            if entrada is None:
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(jti)
+            self.acertos += 1
+            return entrada[1]
+
+    def remover(self, jti: str):
+        with self._lock:
+            self._entradas.pop(jti, None)
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            return {
+                'backend': self.nome,
+                'entradas': len(self._entradas),
+                'acertos': self.acertos,
+                'falhas': self.falhas
+            }
+
+
+class PerfilStoreRedis(PerfilStore):
+    """Perfis em JSON no Redis, cada chave expira com o token"""
+
+    nome = 'redis'
+
+    def __init__(self, url: str, local: PerfilStoreMemoria, prefixo: str = 'perfil:'):
+        self.cliente = ClienteRESP(url)
+        self.local = local
+        self.prefixo = prefixo
+
+    def guardar(self, jti: str, perfil: Dict, exp: float):
+        ttl = math.ceil(exp - time.time())
+        if ttl <= 0:
+            return
+        dados = json.dumps(perfil, ensure_ascii=False, separators=(',', ':'))
+        self.cliente.executar('SET', self.prefixo + jti, dados, 'EX', ttl)
+        self.local.guardar(jti, perfil, exp)
+
+    def obter(self, jti: str) -> Optional[Dict]:
+        perfil = self.local.obter(jti)
+        if perfil is not None:
+            return perfil
+        # O TTL da chave acompanha o exp do token: a cópia local vale até lá
+        dados, ttl = self.cliente.pipeline([('GET', self.prefixo + jti), ('TTL', self.prefixo + jti)])
+        if not isinstance(dados, bytes):
+            return None
+        perfil = json.loads(dados)
+        if isinstance(ttl, int) and ttl > 0:
+            self.local.guardar(jti, perfil, time.time() + ttl)
+        return perfil
+
+    def remover(self, jti: str):
+        self.local.remover(jti)
+        self.cliente.executar('DEL', self.prefixo + jti)
+
+    def estatisticas(self) -> Dict:
+        estatisticas = self.local.estatisticas()
+        estatisticas['backend'] = self.nome
+        return estatisticas
+
+
+def criar_perfil_store(config) -> PerfilStore:
+    """Cria o backend configurado em PERFIL_STORE_BACKEND"""
+    tipo = config.get('PERFIL_STORE_BACKEND', 'memoria')
+    local = PerfilStoreMemoria(config.get('PERFIL_STORE_MAX_ENTRADAS', 100000))
+    if tipo == 'memoria':
+        return local
+    if tipo == 'redis':
+        return PerfilStoreRedis(config.get('PERFIL_STORE_REDIS_URL', 'redis://localhost:6379/0'), local)
+    raise ValueError(f"PERFIL_STORE_BACKEND desconhecido: {tipo}")
+
+
+_perfil_store: Optional[PerfilStore] = None
+_perfil_store_lock = threading.Lock()
+
+
+def obter_perfil_store() -> PerfilStore:
+    global _perfil_store
+    if _perfil_store is None:
+        with _perfil_store_lock:
+            if _perfil_store is None:
+                _perfil_store = criar_perfil_store(current_app.config)
+    return _perfil_store
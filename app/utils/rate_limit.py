@@ -0,0 +1,281 @@
+"""
+Limite de taxa para as rotas que chamam a API externa (login e reset de senha)
+e para a introspecção de tokens, que tem cota própria por IP
+
+Backends disponíveis (RATE_LIMIT_BACKEND):
+    memoria -> token bucket por chave, apenas no processo atual
+    redis   -> janela deslizante aproximada (dois contadores com EXPIRE),
+               compartilhada entre workers e instâncias
+
+Os dois guardam estado O(1) por chave e descartam sozinhos as chaves ociosas.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+import xxhash
+from flask import current_app, g, jsonify, request
+
+from app.utils.redis_resp import ClienteRESP, ErroRedis
+from app.utils.security_logger import security_logger
+
+logger = logging.getLogger(__name__)
+
+
+class PoliticaLimite(NamedTuple):
+    """Até `limite` requisições por `janela` segundos"""
+    nome: str
+    limite: int
+    janela: float
+
+
+class ResultadoLimite(NamedTuple):
+    permitido: bool
+    politica: PoliticaLimite
+    restantes: int
+    reset: float        # segundos até a cota ser totalmente restabelecida
+    retry_after: float  # segundos até a próxima requisição ser aceita (0 se permitida)
+
+
+class BackendRateLimit:
+    """Interface dos backends de limite de taxa"""
+
+    def consumir(self, politica: PoliticaLimite, chave: str) -> ResultadoLimite:
+        raise NotImplementedError
+
+    def estatisticas(self) -> Dict:
+        raise NotImplementedError
+
+
+class RateLimitMemoria(BackendRateLimit):
+    """
+    Token bucket por chave: [tokens, último acesso]. Um balde ocioso por uma
+    janela inteira está cheio, o mesmo que não existir, e é descartado.
+    """
+
+    def __init__(self, max_chaves: int = 100000):
+        # Limite de chaves somando todas as políticas
+        self.max_chaves = max_chaves
+        self._lock = threading.Lock()
+        # Um LRU por política: todas as chaves de uma política ficam ociosas no mesmo prazo
+        self._baldes: Dict[str, "OrderedDict[str, list]"] = {}
+        self._total = 0
+
+    def _descartar_ociosos(self, baldes: "OrderedDict[str, list]", janela: float, agora: float):
+        while baldes:
+            _, balde = next(iter(baldes.items()))
+            if agora - balde[1] < janela:
+                break
+            baldes.popitem(last=False)
+            self._total -= 1
+        # Acima do limite global: sai a chave menos recente da política com mais chaves
+        while self._total > self.max_chaves:
+            max(self._baldes.values(), key=len).popitem(last=False)
+            self._total -= 1
+
+    def consumir(self, politica: PoliticaLimite, chave: str) -> ResultadoLimite:
+        taxa = politica.limite / politica.janela
+        with self._lock:
+            agora = time.monotonic()
+            baldes = self._baldes.setdefault(politica.nome, OrderedDict())
+            balde = baldes.get(chave)
+            if balde is None:
+                balde = baldes[chave] = [float(politica.limite), agora]
+                self._total += 1
+            else:
+                balde[0] = min(politica.limite, balde[0] + (agora - balde[1]) * taxa)
+                balde[1] = agora
+                baldes.move_to_end(chave)
+
+            permitido = balde[0] >= 1
+            if permitido:
+                balde[0] -= 1
+            tokens = balde[0]
+            self._descartar_ociosos(baldes, politica.janela, agora)
+
+        return ResultadoLimite(
+            permitido=permitido,
+            politica=politica,
+            restantes=int(tokens),
+            reset=(politica.limite - tokens) / taxa,
+            retry_after=0.0 if permitido else (1 - tokens) / taxa
+        )
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            return {
+                'backend': 'memoria',
+                'chaves': {nome: len(baldes) for nome, baldes in self._baldes.items()},
+                'total_chaves': self._total,
+                'max_chaves': self.max_chaves
+            }
+
+
+class RateLimitRedis(BackendRateLimit):
+    """
+    Janela deslizante aproximada: contador da janela atual mais o da anterior,
+    ponderado pelo quanto ela ainda cobre. Usa só INCR/EXPIRE/GET, disponíveis
+    em qualquer servidor do protocolo Redis.
+    """
+
+    def __init__(self, url: str, prefixo: str = 'ratelimit:'):
+        self.cliente = ClienteRESP(url)
+        self.prefixo = prefixo
+
+    def consumir(self, politica: PoliticaLimite, chave: str) -> ResultadoLimite:
+        agora = time.time()
+        janela = politica.janela
+        indice = int(agora // janela)
+        decorrido = agora - indice * janela
+        chave_atual = f"{self.prefixo}{politica.nome}:{chave}:{indice}"
+        chave_anterior = f"{self.prefixo}{politica.nome}:{chave}:{indice - 1}"
+
+        atual, _, anterior = self.cliente.pipeline([
+            ('INCR', chave_atual),
+            ('EXPIRE', chave_atual, int(math.ceil(janela * 2))),
+            ('GET', chave_anterior),
+        ])
+        if isinstance(atual, ErroRedis):
+            raise atual
+        anterior = int(anterior) if isinstance(anterior, bytes) else 0
+
+        peso_anterior = 1 - decorrido / janela
+        estimado = anterior * peso_anterior + atual
+        permitido = estimado <= politica.limite
+
+        if permitido:
+            retry_after = 0.0
+        elif atual > politica.limite or anterior == 0:
+            # A janela atual sozinha já estourou: só a próxima janela libera
+            retry_after = janela - decorrido
+        else:
+            # Espera até o peso da janela anterior cair o suficiente
+            retry_after = (estimado - politica.limite) / anterior * janela
+
+        return ResultadoLimite(
+            permitido=permitido,
+            politica=politica,
+            restantes=max(int(politica.limite - estimado), 0),
+            reset=janela - decorrido,
+            retry_after=retry_after
+        )
+
+    def estatisticas(self) -> Dict:
+        return {'backend': 'redis'}
+
+
+def criar_backend_rate_limit(config) -> BackendRateLimit:
+    """Cria o backend configurado em RATE_LIMIT_BACKEND"""
+    tipo = config.get('RATE_LIMIT_BACKEND', 'memoria')
+    if tipo == 'memoria':
+        return RateLimitMemoria(config.get('RATE_LIMIT_MAX_CHAVES', 100000))
+    if tipo == 'redis':
+        return RateLimitRedis(config.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0'))
+    raise ValueError(f"RATE_LIMIT_BACKEND desconhecido: {tipo}")
+
+
+_backend_rate_limit: Optional[BackendRateLimit] = None
+_backend_lock = threading.Lock()
+
+
+def obter_backend_rate_limit() -> BackendRateLimit:
+    global _backend_rate_limit
+    if _backend_rate_limit is None:
+        with _backend_lock:
+            if _backend_rate_limit is None:
+                _backend_rate_limit = criar_backend_rate_limit(current_app.config)
+    return _backend_rate_limit
+
+
+def _politicas(config, endpoint=None):
+    if endpoint == 'auth.introspect':
+        politica_ip = PoliticaLimite(
+            'introspeccao',
+            config.get('RATE_LIMIT_INTROSPECCAO_LIMITE', 600),
+            config.get('RATE_LIMIT_INTROSPECCAO_JANELA', 60)
+        )
+    else:
+        politica_ip = PoliticaLimite('ip', config.get('RATE_LIMIT_IP_LIMITE', 30), config.get('RATE_LIMIT_IP_JANELA', 60))
+    return (
+        politica_ip,
+        PoliticaLimite(
+            'identificador',
+            config.get('RATE_LIMIT_IDENTIFICADOR_LIMITE', 10),
+            config.get('RATE_LIMIT_IDENTIFICADOR_JANELA', 300)
+        ),
+    )
+
+
+def _chaves_da_requisicao() -> List[Optional[str]]:
+    """
+    Chave por IP e por email_telefone; o identificador é guardado como digest.
+    O IP é o remote_addr, já corrigido pelo ProxyFix só para os PROXY_CONFIAVEIS
+    proxies da frente: um X-Forwarded-For enviado pelo cliente não muda a chave.
+    """
+    ip = request.remote_addr or 'unknown'
+    dados = request.get_json(silent=True)
+    identificador = dados.get('email_telefone') if isinstance(dados, dict) else None
+    if isinstance(identificador, str) and identificador.strip():
+        digest = xxhash.xxh3_64_hexdigest(identificador.strip().lower().encode('utf-8'))
+        identificador = f"{request.endpoint}:{digest}"
+    else:
+        identificador = None
+    return [f"{request.endpoint}:{ip}", identificador]
+
+
+def verificar_limite_requisicao():
+    """
+    Consome uma unidade de cada política aplicável. Retorna a resposta 429
+    quando alguma cota se esgotou, ou None para seguir com a requisição.
+    """
+    backend = obter_backend_rate_limit()
+    resultados = []
+    for politica, chave in zip(_politicas(current_app.config, request.endpoint), _chaves_da_requisicao()):
+        if chave is None:
+            continue
+        try:
+            resultado = backend.consumir(politica, chave)
+        except (ErroRedis, OSError) as e:
+            # Backend compartilhado indisponível: não bloqueia o login
+            logger.warning("Rate limit indisponível, requisição liberada: %s", e)
+            return None
+        resultados.append(resultado)
+        if not resultado.permitido:
+            break
+
+    if not resultados:
+        return None
+
+    negado = next((r for r in resultados if not r.permitido), None)
+    # Headers refletem a política mais restritiva
+    g.rate_limit = negado or min(resultados, key=lambda r: r.restantes)
+    if negado is None:
+        return None
+
+    dados = request.get_json(silent=True)
+    security_logger.log_suspicious_login(
+        str(dados.get('email_telefone', '-'))[:100] if isinstance(dados, dict) else '-',
+        f"Limite de requisições excedido ({negado.politica.nome}) em {request.path}"
+    )
+    resposta = jsonify({
+        'success': False,
+        'message': 'Muitas tentativas. Tente novamente mais tarde.',
+        'error_code': 429
+    })
+    resposta.headers['Retry-After'] = str(max(math.ceil(negado.retry_after), 1))
+    return resposta, 429
+
+
+def adicionar_headers_rate_limit(response):
+    """Headers RateLimit-* (draft IETF) da política mais restritiva"""
+    resultado: Optional[ResultadoLimite] = g.pop('rate_limit', None)
+    if resultado is not None:
+        politica = resultado.politica
+        response.headers['RateLimit-Limit'] = str(politica.limite)
+        response.headers['RateLimit-Remaining'] = str(resultado.restantes)
+        response.headers['RateLimit-Reset'] = str(max(math.ceil(resultado.reset), 0))
+        response.headers['RateLimit-Policy'] = f"{politica.limite};w={int(politica.janela)}"
+    return response
@@ -0,0 +1,151 @@
+"""
+Cliente mínimo do protocolo Redis (RESP2), sem dependências externas
+
+Compatível com qualquer servidor que fale o protocolo Redis (Redis, KeyDB,
+Valkey, Dragonfly ou um servidor local de testes).
+"""
+import socket
+import threading
+from typing import Any, List, Optional
+from urllib.parse import unquote, urlsplit
+
+
+class ErroRedis(Exception):
+    """Erro retornado pelo servidor ou falha de comunicação"""
+
+
+# Comandos que podem ser repetidos sem efeito extra caso a resposta se perca
+COMANDOS_IDEMPOTENTES = frozenset({
+    'PING', 'GET', 'MGET', 'EXISTS', 'TTL', 'SCAN', 'SET', 'DEL', 'EXPIRE', 'SELECT', 'AUTH',
+    'ZADD', 'ZRANGEBYSCORE', 'ZREMRANGEBYSCORE', 'UNWATCH'
+})
+
+
+class ClienteRESP:
+    """Cliente RESP2 com uma conexão por thread"""
+
+    def __init__(self, url: str, timeout: float = 0.5):
+        partes = urlsplit(url)
+        if partes.scheme not in ('redis', ''):
+            raise ValueError(f"Esquema não suportado: {partes.scheme}")
+
+        self.host = partes.hostname or 'localhost'
+        self.porta = partes.port or 6379
+        self.senha = unquote(partes.password) if partes.password else None
+        self.usuario = unquote(partes.username) if partes.username else None
+        self.db = int(partes.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conectar(self):
+        """Abre a conexão da thread; ela só é guardada depois de AUTH e SELECT"""
+        sock = socket.create_connection((self.host, self.porta), timeout=self.timeout)
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            arquivo = sock.makefile('rb')
+            if self.senha:
+                if self.usuario:
+                    self._comando_inicial(sock, arquivo, 'AUTH', self.usuario, self.senha)
+                else:
+                    self._comando_inicial(sock, arquivo, 'AUTH', self.senha)
+            if self.db:
+                self._comando_inicial(sock, arquivo, 'SELECT', self.db)
+        except BaseException:
+            sock.close()
+            raise
+        self._local.sock = sock
+        self._local.arquivo = arquivo
+
+    def _comando_inicial(self, sock, arquivo, *args):
+        sock.sendall(self._codificar(args))
+        return self._ler(arquivo)
+
+    def _fechar(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+        self._local.arquivo = None
+
+    @staticmethod
+    def _codificar(args) -> bytes:
+        partes = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            partes.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(partes)
+
+    def _ler(self, arquivo) -> Any:
+        linha = arquivo.readline()
+        if not linha:
+            raise ConnectionError("Conexão encerrada pelo servidor Redis")
+
+        tipo, conteudo = linha[:1], linha[1:-2]
+        if tipo == b'+':
+            return conteudo.decode('utf-8')
+        if tipo == b'-':
+            raise ErroRedis(conteudo.decode('utf-8'))
+        if tipo == b':':
+            return int(conteudo)
+        if tipo == b'$':
+            tamanho = int(conteudo)
+            if tamanho < 0:
+                return None
+            dados = arquivo.read(tamanho + 2)
+            return dados[:-2]
+        if tipo == b'*':
+            tamanho = int(conteudo)
+            if tamanho < 0:
+                return None
+            return [self._ler(arquivo) for _ in range(tamanho)]
+        raise ErroRedis(f"Resposta inválida do servidor: {linha!r}")
+
+    def executar(self, *args) -> Any:
+        """
+        Envia um comando e retorna a resposta já decodificada. Se a conexão
+        cair, repete uma vez em conexão nova quando o comando não chegou a ser
+        enviado ou quando repeti-lo é seguro (COMANDOS_IDEMPOTENTES): um INCR
+        cuja resposta se perdeu pode já ter sido aplicado.
+        """
+        nome = args[0].decode('utf-8') if isinstance(args[0], bytes) else str(args[0])
+        idempotente = nome.upper() in COMANDOS_IDEMPOTENTES
+        for tentativa in range(2):
+            enviado = False
+            try:
+                if getattr(self._local, 'sock', None) is None:
+                    self._conectar()
+                self._local.sock.sendall(self._codificar(args))
+                enviado = True
+                return self._ler(self._local.arquivo)
+            except OSError as e:
+                self._fechar()
+                # Conexão ociosa derrubada pelo servidor: tenta uma vez em conexão nova
+                if tentativa or (enviado and not idempotente):
+                    raise ErroRedis(f"Falha de comunicação com o Redis: {e}")
+
+    def pipeline(self, comandos: List[tuple]) -> List[Any]:
+        """Envia vários comandos de uma vez e lê todas as respostas"""
+        if not comandos:
+            return []
+        try:
+            if getattr(self._local, 'sock', None) is None:
+                self._conectar()
+            self._local.sock.sendall(b''.join(self._codificar(args) for args in comandos))
+            respostas = []
+            for _ in comandos:
+                # Erros de um comando não interrompem a leitura dos demais
+                try:
+                    respostas.append(self._ler(self._local.arquivo))
+                except ErroRedis as e:
+                    respostas.append(e)
+            return respostas
+        except OSError as e:
+            self._fechar()
+            raise ErroRedis(f"Falha de comunicação com o Redis: {e}")
+
+    def ping(self) -> Optional[str]:
+        return self.executar('PING')
@@ -0,0 +1,275 @@
+"""
+Refresh tokens opacos com famílias de rotação e detecção de reuso (JWT_PAR_TOKENS)
+
+Cada login abre uma família; o refresh token é "familia.geracao.assinatura",
+com a assinatura HMAC-SHA256 (SECRET_KEY) de família e geração. O servidor
+guarda por família só o perfil, a expiração e a geração atual, então o estado
+é O(1) por sessão e um vazamento do store não permite forjar tokens.
+
+Usar um refresh token avança a geração e devolve o token da geração seguinte.
+Apresentar de novo a geração que acabou de ser usada, dentro de
+JWT_REFRESH_JANELA_REUSO segundos, devolve o mesmo sucessor (requisições
+paralelas do cliente ou resposta perdida na rede). Fora disso, uma geração já
+usada indica cópia do token: a família inteira é revogada e o dono legítimo
+precisa fazer login novamente.
+
+Backends disponíveis (JWT_REFRESH_BACKEND):
+    memoria -> apenas no processo atual, limitado a JWT_REFRESH_MAX_FAMILIAS
+    redis   -> qualquer servidor do protocolo Redis, compartilhado entre instâncias
+"""
+import base64
+import hashlib
+import hmac
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from flask import current_app
+
+from app.utils.redis_resp import ClienteRESP, ErroRedis
+from app.utils.security_logger import security_logger
+
+
+class ErroRefreshToken(Exception):
+    """Refresh token inválido, expirado ou reutilizado"""
+
+
+class Rotacao(NamedTuple):
+    familia: str
+    perfil: Dict
+    refresh_token: str
+
+
+class BackendRefresh:
+    """Interface dos backends de famílias de refresh token"""
+
+    nome = ''
+
+    def criar_familia(self, familia: str, perfil: Dict, exp: float):
+        raise NotImplementedError
+
+    def avancar(self, familia: str, geracao: int, janela: float) -> Optional[Tuple[Dict, Optional[int]]]:
+        """
+        Consome a geração apresentada e retorna (perfil, geração do sucessor),
+        ou None se a família não existe (expirada ou revogada). Se a geração
+        é a atual, avança atomicamente; se é a anterior e foi substituída há
+        no máximo `janela` segundos, retorna o sucessor já emitido. Qualquer
+        outra geração é reuso: o sucessor retornado é None.
+        """
+        raise NotImplementedError
+
+    def revogar_familia(self, familia: str):
+        raise NotImplementedError
+
+    def estatisticas(self) -> Dict:
+        return {'backend': self.nome}
+
+
+class RefreshMemoria(BackendRefresh):
+    """
+    Famílias em um dicionário ordenado por criação. Como todas têm o mesmo
+    prazo, a ordem de criação é a de expiração: a poda olha só o início.
+    """
+
+    nome = 'memoria'
+
+    def __init__(self, max_familias: int = 100000):
+        self.max_familias = max_familias
+        self._lock = threading.Lock()
+        self._familias: "OrderedDict[str, list]" = OrderedDict()
+        self.descartadas = 0
+
+    def _podar(self, agora: float):
+        familias = self._familias
+        while familias:
+            _, dados = next(iter(familias.items()))
+            if dados[1] > agora and len(familias) <= self.max_familias:
+                break
+            familias.popitem(last=False)
+            if dados[1] > agora:
+                self.descartadas += 1
+
+    def criar_familia(self, familia: str, perfil: Dict, exp: float):
+        with self._lock:
+            # [perfil, exp, geração atual, instante em que ela foi emitida]
+            self._familias[familia] = [perfil, exp, 0, time.time()]
+            self._podar(time.time())
+
+    def avancar(self, familia: str, geracao: int, janela: float) -> Optional[Tuple[Dict, Optional[int]]]:
+        with self._lock:
+            agora = time.time()
+            dados = self._familias.get(familia)
+            if dados is None or dados[1] <= agora:
+                return None
+            return dados[0], _proxima_geracao(dados, geracao, janela, agora)
+
+    def revogar_familia(self, familia: str):
+        with self._lock:
+            self._familias.pop(familia, None)
+
+    def estatisticas(self) -> Dict:
+        with self._lock:
+            return {
+                'backend': self.nome,
+                'familias': len(self._familias),
+                'descartadas_por_limite': self.descartadas
+            }
+
+
+class RefreshRedis(BackendRefresh):
+    """
+    Perfil, expiração, geração e instante da última rotação em uma chave JSON.
+    O avanço é um compare-and-set com WATCH/MULTI/EXEC: rotações concorrentes
+    da mesma família são repetidas sobre o estado novo.
+    """
+
+    nome = 'redis'
+
+    # Tentativas do compare-and-set antes de desistir
+    TENTATIVAS = 5
+
+    def __init__(self, url: str, prefixo: str = 'refresh:'):
+        self.cliente = ClienteRESP(url)
+        self.prefixo = prefixo
+
+    @staticmethod
+    def _verificar(respostas):
+        for resposta in respostas:
+            if isinstance(resposta, ErroRedis):
+                raise resposta
+        return respostas
+
+    @staticmethod
+    def _serializar(dados: list) -> str:
+        perfil, exp, geracao, emitida_em = dados
+        estado = {'perfil': perfil, 'exp': exp, 'geracao': geracao, 'emitida_em': emitida_em}
+        return json.dumps(estado, ensure_ascii=False, separators=(',', ':'))
+
+    def criar_familia(self, familia: str, perfil: Dict, exp: float):
+        ttl = math.ceil(exp - time.time())
+        self.cliente.executar('SET', self.prefixo + familia, self._serializar([perfil, exp, 0, time.time()]), 'EX', ttl)
+
+    def avancar(self, familia: str, geracao: int, janela: float) -> Optional[Tuple[Dict, Optional[int]]]:
+        chave = self.prefixo + familia
+        for _ in range(self.TENTATIVAS):
+            _, bruto = self._verificar(self.cliente.pipeline([('WATCH', chave), ('GET', chave)]))
+            agora = time.time()
+            estado = json.loads(bruto) if isinstance(bruto, bytes) else None
+            if estado is None or estado['exp'] <= agora:
+                self.cliente.executar('UNWATCH')
+                return None
+
+            dados = [estado['perfil'], estado['exp'], estado['geracao'], estado['emitida_em']]
+            sucessor = _proxima_geracao(dados, geracao, janela, agora)
+            if geracao != estado['geracao']:
+                # Reuso, ou sucessor já emitido dentro da janela: nada a gravar
+                self.cliente.executar('UNWATCH')
+                return estado['perfil'], sucessor
+
+            ttl = max(math.ceil(dados[1] - agora), 1)
+            respostas = self._verificar(self.cliente.pipeline([
+                ('MULTI',),
+                ('SET', chave, self._serializar(dados), 'EX', ttl),
+                ('EXEC',),
+            ]))
+            if respostas[-1] is not None:
+                return estado['perfil'], sucessor
+            # EXEC abortado: outra rotação gravou antes; relê o estado
+        raise ErroRedis("Conflito persistente ao rotacionar a família de refresh token")
+
+    def revogar_familia(self, familia: str):
+        self.cliente.executar('DEL', self.prefixo + familia)
+
+
+def _proxima_geracao(dados: list, geracao: int, janela: float, agora: float) -> Optional[int]:
+    """
+    Regra de rotação sobre [perfil, exp, geração atual, emitida em], alterando
+    `dados` quando a geração avança. Retorna o sucessor, ou None em caso de reuso.
+    """
+    if geracao == dados[2]:
+        dados[2] += 1
+        dados[3] = agora
+        return dados[2]
+    if geracao == dados[2] - 1 and agora - dados[3] <= janela:
+        # Sucessor emitido há instantes: o cliente repetiu a requisição
+        return dados[2]
+    return None
+
+
+def criar_backend_refresh(config) -> BackendRefresh:
+    """Cria o backend configurado em JWT_REFRESH_BACKEND"""
+    tipo = config.get('JWT_REFRESH_BACKEND', 'memoria')
+    if tipo == 'memoria':
+        return RefreshMemoria(config.get('JWT_REFRESH_MAX_FAMILIAS', 100000))
+    if tipo == 'redis':
+        return RefreshRedis(config.get('JWT_REFRESH_REDIS_URL', 'redis://localhost:6379/0'))
+    raise ValueError(f"JWT_REFRESH_BACKEND desconhecido: {tipo}")
+
+
+_backend_refresh: Optional[BackendRefresh] = None
+_backend_lock = threading.Lock()
+
+
+def obter_backend_refresh() -> BackendRefresh:
+    global _backend_refresh
+    if _backend_refresh is None:
+        with _backend_lock:
+            if _backend_refresh is None:
+                _backend_refresh = criar_backend_refresh(current_app.config)
+    return _backend_refresh
+
+
+def _assinatura(familia: str, geracao: int) -> str:
+    segredo = str(current_app.config['SECRET_KEY']).encode('utf-8')
+    digest = hmac.new(segredo, f"refresh:{familia}:{geracao}".encode('utf-8'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:24]).decode('ascii')
+
+
+def _formatar(familia: str, geracao: int) -> str:
+    return f"{familia}.{geracao}.{_assinatura(familia, geracao)}"
+
+
+def emitir_refresh_token(perfil: Dict) -> Tuple[str, str]:
+    """Abre uma família para o login e retorna (familia, refresh token)"""
+    familia = os.urandom(16).hex()
+    exp = time.time() + current_app.config['JWT_REFRESH_EXPIRACAO'].total_seconds()
+    obter_backend_refresh().criar_familia(familia, perfil, exp)
+    return familia, _formatar(familia, 0)
+
+
+def rotacionar_refresh_token(refresh_token: str) -> Rotacao:
+    """
+    Consome o refresh token e retorna o da geração seguinte, com o perfil da
+    família. Levanta ErroRefreshToken se for inválido, expirado ou reutilizado.
+    """
+    try:
+        familia, geracao, assinatura = refresh_token.split('.')
+        geracao = int(geracao)
+    except (AttributeError, ValueError):
+        raise ErroRefreshToken("Refresh token inválido")
+    if not hmac.compare_digest(assinatura, _assinatura(familia, geracao)):
+        raise ErroRefreshToken("Refresh token inválido")
+
+    backend = obter_backend_refresh()
+    resultado = backend.avancar(familia, geracao, current_app.config.get('JWT_REFRESH_JANELA_REUSO', 10))
+    if resultado is None:
+        raise ErroRefreshToken("Refresh token expirado ou revogado")
+
+    perfil, nova_geracao = resultado
+    if nova_geracao is None:
+        # Geração já consumida fora da janela de reuso: o token foi copiado. Encerra a sessão inteira.
+        backend.revogar_familia(familia)
+        identificador = perfil.get('identificador') if isinstance(perfil, dict) else None
+        security_logger.log_suspicious_login(str(identificador or familia)[:100], "Reuso de refresh token")
+        raise ErroRefreshToken("Refresh token reutilizado; sessão encerrada")
+
+    return Rotacao(familia, perfil, _formatar(familia, nova_geracao))
+
+
+def revogar_familia(familia: str):
+    """Encerra a sessão: nenhum refresh token da família volta a ser aceito"""
+    obter_backend_refresh().revogar_familia(familia)
@@ -0,0 +1,583 @@
+"""
+Registro de tokens revogados, limitado pela expiração dos próprios tokens
+
+Backends disponíveis (REVOGACAO_BACKEND):
+    memoria -> apenas no processo atual
+    sqlite  -> arquivo SQLite em modo WAL, compartilhado entre workers da máquina
+    redis   -> qualquer servidor do protocolo Redis, compartilhado entre instâncias
+
+Backends compartilhados ficam atrás de um cache local de leitura com TTL curto
+e, opcionalmente, de um filtro de Bloom, para que a verificação no caminho
+quente continue abaixo de um milissegundo. Eles também mantêm um log das
+revogações em ordem de escrita, lido incrementalmente pelo filtro.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import xxhash
+
+from app.utils.bloom import FiltroBloom
+from app.utils.importacao import modulo_tardio
+from app.utils.metricas import metricas
+from app.utils.redis_resp import ClienteRESP, ErroRedis
+
+# Dependências de backends específicos: carregadas só pelo backend escolhido
+sqlite3 = modulo_tardio('sqlite3')
+sortedcontainers = modulo_tardio('sortedcontainers')
+
+logger = logging.getLogger(__name__)
+
+bloom_taxa_falso_positivo = metricas.medidor(
+    'revogacao_bloom_taxa_falso_positivo',
+    'Taxa de falso positivo do filtro de Bloom de revogação (observada nas consultas e estimada pela ocupação)',
+    ('tipo',)
+)
+
+
+def identificador_token(token: str, payload: Optional[Dict] = None) -> str:
+    """
+    Identificador compacto de um token: o claim jti quando existe,
+    senão um digest xxh3-128 do token (tokens emitidos antes do jti)
+    """
+    if payload and payload.get('jti'):
+        return str(payload['jti'])
+    return xxhash.xxh3_128_hexdigest(token.encode('utf-8'))
+
+
+class BackendRevogacao:
+    """Interface dos backends de revogação"""
+
+    nome = 'base'
+
+    def revogar(self, identificador: str, exp: float):
+        """Revoga o identificador até o instante exp (timestamp unix)"""
+        raise NotImplementedError
+
+    def esta_revogado(self, identificador: str) -> bool:
+        raise NotImplementedError
+
+    def revogados(self, identificadores: Iterable[str]) -> Set[str]:
+        """Consulta em lote: retorna o subconjunto de identificadores revogados"""
+        return {i for i in identificadores if self.esta_revogado(i)}
+
+    def revogados_desde(self, cursor=None) -> Tuple[List[str], object]:
+        """
+        Revogações escritas depois do cursor (todas as ainda válidas se None),
+        com o cursor para a próxima leitura. Pode repetir identificadores.
+        """
+        raise NotImplementedError
+
+    def __contains__(self, identificador: str) -> bool:
+        return self.esta_revogado(identificador)
+
+    def estatisticas(self) -> Dict:
+        return {'backend': self.nome}
+
+
+class RevogacaoTokens(BackendRevogacao):
+    """
+    Tokens revogados em memória, indexados por expiração.
+
+    Guarda apenas o identificador e o exp de cada token. Entradas expiradas
+    são removidas pelo início da lista ordenada a cada escrita, então cada
+    entrada é podada uma única vez (custo amortizado constante por revogação).
+    """
+
+    nome = 'memoria'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expiracoes: Dict[str, float] = {}
+        self._por_expiracao = sortedcontainers.SortedList()
+
+    def _podar(self, agora: float):
+        while self._por_expiracao and self._por_expiracao[0][0] <= agora:
+            _, identificador = self._por_expiracao.pop(0)
+            self._expiracoes.pop(identificador, None)
+
+    def revogar(self, identificador: str, exp: float):
+        with self._lock:
+            agora = time.time()
+            self._podar(agora)
+            if exp <= agora:
+                # Token já expirado não precisa de revogação
+                return
+
+            anterior = self._expiracoes.get(identificador)
+            if anterior is not None:
+                if anterior >= exp:
+                    return
+                self._por_expiracao.remove((anterior, identificador))
+
+            self._expiracoes[identificador] = exp
+            self._por_expiracao.add((exp, identificador))
+
+    def esta_revogado(self, identificador: str) -> bool:
+        exp = self._expiracoes.get(identificador)
+        return exp is not None and exp > time.time()
+
+    def __len__(self) -> int:
+        return len(self._expiracoes)
+
+    def podar(self):
+        """Remove explicitamente as entradas expiradas"""
+        with self._lock:
+            self._podar(time.time())
+
+    def estatisticas(self) -> Dict:
+        return {'backend': self.nome, 'entradas': len(self)}
+
+
+class RevogacaoSQLite(BackendRevogacao):
+    """Revogações em um arquivo SQLite (WAL), com uma conexão por thread"""
+
+    nome = 'sqlite'
+
+    # Poda as entradas expiradas a cada N revogações
+    PODA_A_CADA = 256
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._escritas = 0
+        self._conexao().executescript(
+            "CREATE TABLE IF NOT EXISTS revogados ("
+            " id TEXT PRIMARY KEY, exp REAL NOT NULL) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS revogados_exp ON revogados (exp);"
+            "CREATE TABLE IF NOT EXISTS revogados_log ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL, exp REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS revogados_log_exp ON revogados_log (exp);"
+        )
+
+    def _conexao(self) -> 'sqlite3.Connection':
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def revogar(self, identificador: str, exp: float):
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            conexao.execute(
+                "INSERT INTO revogados (id, exp) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET exp = MAX(exp, excluded.exp)",
+                (identificador, exp)
+            )
+            conexao.execute("INSERT INTO revogados_log (id, exp) VALUES (?, ?)", (identificador, exp))
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        self._escritas += 1
+        if self._escritas % self.PODA_A_CADA == 0:
+            agora = time.time()
+            conexao.execute("DELETE FROM revogados WHERE exp <= ?", (agora,))
+            conexao.execute("DELETE FROM revogados_log WHERE exp <= ?", (agora,))
+
+    def esta_revogado(self, identificador: str) -> bool:
+        linha = self._conexao().execute(
+            "SELECT 1 FROM revogados WHERE id = ? AND exp > ?", (identificador, time.time())
+        ).fetchone()
+        return linha is not None
+
+    def revogados(self, identificadores: Iterable[str]) -> Set[str]:
+        identificadores = list(identificadores)
+        encontrados = set()
+        agora = time.time()
+        # Respeita o limite de parâmetros por consulta do SQLite
+        for inicio in range(0, len(identificadores), 500):
+            lote = identificadores[inicio:inicio + 500]
+            marcadores = ','.join('?' * len(lote))
+            linhas = self._conexao().execute(
+                f"SELECT id FROM revogados WHERE exp > ? AND id IN ({marcadores})",
+                (agora, *lote)
+            )
+            encontrados.update(linha[0] for linha in linhas)
+        return encontrados
+
+    def revogados_desde(self, cursor=None) -> Tuple[List[str], object]:
+        # cursor: último seq lido do log
+        linhas = self._conexao().execute(
+            "SELECT seq, id FROM revogados_log WHERE seq > ? AND exp > ? ORDER BY seq",
+            (cursor or 0, time.time())
+        ).fetchall()
+        if not linhas:
+            return [], cursor
+        return [linha[1] for linha in linhas], linhas[-1][0]
+
+    def estatisticas(self) -> Dict:
+        total = self._conexao().execute("SELECT COUNT(*) FROM revogados").fetchone()[0]
+        return {'backend': self.nome, 'entradas': total}
+
+
+class RevogacaoRedis(BackendRevogacao):
+    """
+    Revogações em um servidor do protocolo Redis; cada chave expira com o
+    token. O log é um sorted set com o instante da revogação como score,
+    aparado depois de `retencao` segundos (a validade máxima de um token).
+    """
+
+    nome = 'redis'
+
+    # Poda o log a cada N revogações
+    PODA_A_CADA = 256
+    # Itens por página na leitura do log
+    PAGINA_LOG = 1000
+    # A leitura incremental relê esse trecho antes do cursor: cobre relógios
+    # desencontrados entre instâncias e escritas ainda em andamento
+    MARGEM_LOG = 5.0
+
+    def __init__(self, url: str, prefixo: str = 'revogado:', chave_log: str = 'revogacoes:log',
+                 retencao: float = 86400):
+        self.cliente = ClienteRESP(url)
+        self.prefixo = prefixo
+        self.chave_log = chave_log
+        self.retencao = retencao
+        self._escritas = 0
+
+    def revogar(self, identificador: str, exp: float):
+        agora = time.time()
+        ttl = math.ceil(exp - agora)
+        if ttl <= 0:
+            return
+        comandos = [
+            ('MULTI',),
+            ('SET', self.prefixo + identificador, 1, 'EX', ttl),
+            ('ZADD', self.chave_log, repr(agora), identificador),
+        ]
+        self._escritas += 1
+        if self._escritas % self.PODA_A_CADA == 0:
+            comandos.append(('ZREMRANGEBYSCORE', self.chave_log, '-inf', repr(agora - self.retencao)))
+        comandos.append(('EXEC',))
+        respostas = self.cliente.pipeline(comandos)
+        for resposta in respostas:
+            if isinstance(resposta, ErroRedis):
+                raise resposta
+        if respostas[-1] is None:
+            raise ErroRedis("Transação de revogação abortada")
+
+    def esta_revogado(self, identificador: str) -> bool:
+        return bool(self.cliente.executar('EXISTS', self.prefixo + identificador))
+
+    def revogados(self, identificadores: Iterable[str]) -> Set[str]:
+        identificadores = list(identificadores)
+        if not identificadores:
+            return set()
+        valores = self.cliente.executar('MGET', *[self.prefixo + i for i in identificadores])
+        return {i for i, valor in zip(identificadores, valores) if valor is not None}
+
+    def revogados_desde(self, cursor=None) -> Tuple[List[str], object]:
+        # cursor: maior score (instante de revogação) já lido
+        minimo = '-inf' if cursor is None else repr(cursor - self.MARGEM_LOG)
+        novos = []
+        while True:
+            itens = self.cliente.executar(
+                'ZRANGEBYSCORE', self.chave_log, minimo, '+inf', 'WITHSCORES', 'LIMIT', 0, self.PAGINA_LOG
+            )
+            for membro, score in zip(itens[::2], itens[1::2]):
+                novos.append(membro.decode('utf-8'))
+                cursor = max(cursor or 0.0, float(score))
+            if len(itens) < 2 * self.PAGINA_LOG or repr(cursor) == minimo:
+                return novos, cursor
+            # Próxima página a partir do último score (inclusive: empates se repetem)
+            minimo = repr(cursor)
+
+
+class CacheLeituraRevogacao(BackendRevogacao):
+    """
+    Cache local de leitura na frente de um backend compartilhado.
+
+    Respostas negativas valem por `ttl` segundos, então uma revogação feita em
+    outra instância leva no máximo esse tempo para valer aqui. Revogações
+    feitas por esta instância valem imediatamente.
+    """
+
+    def __init__(self, backend: BackendRevogacao, ttl: float = 2.0, tamanho_max: int = 10000):
+        self.backend = backend
+        self.nome = backend.nome
+        self.ttl = ttl
+        self.tamanho_max = tamanho_max
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, tuple]" = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+
+    def _guardar(self, identificador: str, revogado: bool, valido_ate: float):
+        with self._lock:
+            self._entradas[identificador] = (revogado, valido_ate)
+            self._entradas.move_to_end(identificador)
+            while len(self._entradas) > self.tamanho_max:
+                self._entradas.popitem(last=False)
+
+    def _consultar_local(self, identificador: str, agora: float) -> Optional[bool]:
+        entrada = self._entradas.get(identificador)
+        if entrada is None or entrada[1] <= agora:
+            return None
+        return entrada[0]
+
+    def revogar(self, identificador: str, exp: float):
+        self.backend.revogar(identificador, exp)
+        self._guardar(identificador, True, math.inf)
+
+    def esta_revogado(self, identificador: str) -> bool:
+        agora = time.monotonic()
+        revogado = self._consultar_local(identificador, agora)
+        if revogado is not None:
+            self.acertos += 1
+            return revogado
+
+        self.falhas += 1
+        revogado = self.backend.esta_revogado(identificador)
+        # Revogação é definitiva; só a resposta negativa precisa ser revalidada
+        self._guardar(identificador, revogado, math.inf if revogado else agora + self.ttl)
+        return revogado
+
+    def revogados(self, identificadores: Iterable[str]) -> Set[str]:
+        identificadores = list(identificadores)
+        agora = time.monotonic()
+        encontrados, pendentes = set(), []
+        for identificador in identificadores:
+            revogado = self._consultar_local(identificador, agora)
+            if revogado is None:
+                pendentes.append(identificador)
+            elif revogado:
+                encontrados.add(identificador)
+
+        self.acertos += len(identificadores) - len(pendentes)
+        if pendentes:
+            self.falhas += len(pendentes)
+            remotos = self.backend.revogados(pendentes)
+            for identificador in pendentes:
+                revogado = identificador in remotos
+                self._guardar(identificador, revogado, math.inf if revogado else agora + self.ttl)
+            encontrados |= remotos
+        return encontrados
+
+    def revogados_desde(self, cursor=None) -> Tuple[List[str], object]:
+        return self.backend.revogados_desde(cursor)
+
+    def estatisticas(self) -> Dict:
+        estatisticas = self.backend.estatisticas()
+        estatisticas['cache_local'] = {
+            'entradas': len(self._entradas),
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'ttl': self.ttl
+        }
+        return estatisticas
+
+
+class FiltroRevogacao(BackendRevogacao):
+    """
+    Filtro de Bloom na frente do backend autoritativo.
+
+    Quase nenhum token verificado está revogado: com o filtro em dia, a
+    resposta negativa encerra a verificação sem consultar o backend, e só os
+    possíveis positivos vão ao conjunto autoritativo.
+
+    O filtro é montado em segundo plano depois da primeira consulta e segue o
+    log de revogações do backend incrementalmente a cada `intervalo` segundos;
+    revogações desta instância entram nele na hora, as de outras instâncias
+    levam até um intervalo. Enquanto o filtro não existe ou está desatualizado
+    (sincronização falhando), toda consulta vai ao backend. Quando as entradas
+    expiradas enchem o filtro além da capacidade, ele é montado de novo.
+    """
+
+    def __init__(self, backend: BackendRevogacao, capacidade: int = 100000,
+                 taxa_falso_positivo: float = 0.001, intervalo: float = 2.0):
+        self.backend = backend
+        self.nome = backend.nome
+        self.capacidade = capacidade
+        self.taxa_falso_positivo = taxa_falso_positivo
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._filtro: Optional[FiltroBloom] = None
+        self._cursor = None
+        self._sincronizado_em = -math.inf
+        self._tentativa_em = -math.inf
+        self._sincronizando = False
+        self._reconstruindo = False
+        self._novos_durante_reconstrucao = []
+        self.reconstrucoes = 0
+        self.sincronizacoes = 0
+        self.falhas_sincronizacao = 0
+        self.consultas = 0
+        self.consultas_sem_filtro = 0
+        self.negativos = 0
+        self.falsos_positivos = 0
+        bloom_taxa_falso_positivo.rotulos('observada').calcular_com(self.taxa_observada)
+        bloom_taxa_falso_positivo.rotulos('estimada').calcular_com(self.taxa_estimada)
+
+    @staticmethod
+    def _incorporar(filtro: FiltroBloom, identificadores: Iterable[str]):
+        # Itens já presentes não entram de novo: a contagem de itens segue a ocupação real
+        for identificador in identificadores:
+            if identificador not in filtro:
+                filtro.adicionar(identificador)
+
+    def _reconstruir(self):
+        with self._lock:
+            self._reconstruindo = True
+        try:
+            ativos, cursor = self.backend.revogados_desde(None)
+            filtro = FiltroBloom(max(self.capacidade, 2 * len(ativos)), self.taxa_falso_positivo)
+            self._incorporar(filtro, ativos)
+            with self._lock:
+                # Revogações locais feitas enquanto o log era lido
+                self._incorporar(filtro, self._novos_durante_reconstrucao)
+                self._filtro, self._cursor = filtro, cursor
+                self.reconstrucoes += 1
+        finally:
+            with self._lock:
+                self._novos_durante_reconstrucao = []
+                self._reconstruindo = False
+
+    def _sincronizar(self, inicio: float):
+        try:
+            filtro = self._filtro
+            if filtro is None or filtro.itens > filtro.capacidade:
+                self._reconstruir()
+            else:
+                novos, self._cursor = self.backend.revogados_desde(self._cursor)
+                self._incorporar(filtro, novos)
+            # O filtro reflete o backend como ele estava no início da leitura
+            self._sincronizado_em = inicio
+            self.sincronizacoes += 1
+        except Exception as e:
+            self.falhas_sincronizacao += 1
+            logger.warning("Falha ao sincronizar o filtro de revogação: %s", e)
+        finally:
+            self._sincronizando = False
+
+    def _agendar_sincronizacao(self, agora: float):
+        if agora - self._tentativa_em < self.intervalo or self._sincronizando:
+            return
+        with self._lock:
+            if self._sincronizando:
+                return
+            self._sincronizando = True
+            self._tentativa_em = agora
+        threading.Thread(target=self._sincronizar, args=(agora,), name='revogacao-bloom', daemon=True).start()
+
+    def _filtro_em_dia(self, agora: float) -> Optional[FiltroBloom]:
+        """O filtro, se existe e foi sincronizado há no máximo dois intervalos"""
+        if agora - self._sincronizado_em > 2 * self.intervalo:
+            return None
+        return self._filtro
+
+    def revogar(self, identificador: str, exp: float):
+        self.backend.revogar(identificador, exp)
+        with self._lock:
+            if self._filtro is not None:
+                self._incorporar(self._filtro, (identificador,))
+            if self._reconstruindo:
+                self._novos_durante_reconstrucao.append(identificador)
+
+    def esta_revogado(self, identificador: str) -> bool:
+        agora = time.monotonic()
+        self._agendar_sincronizacao(agora)
+        filtro = self._filtro_em_dia(agora)
+        self.consultas += 1
+        if filtro is None:
+            self.consultas_sem_filtro += 1
+            return self.backend.esta_revogado(identificador)
+        if identificador not in filtro:
+            self.negativos += 1
+            return False
+
+        revogado = self.backend.esta_revogado(identificador)
+        if not revogado:
+            self.falsos_positivos += 1
+        return revogado
+
+    def revogados(self, identificadores: Iterable[str]) -> Set[str]:
+        agora = time.monotonic()
+        self._agendar_sincronizacao(agora)
+        filtro = self._filtro_em_dia(agora)
+        identificadores = list(identificadores)
+        self.consultas += len(identificadores)
+        if filtro is None:
+            self.consultas_sem_filtro += len(identificadores)
+            return self.backend.revogados(identificadores)
+
+        candidatos = [i for i in identificadores if i in filtro]
+        self.negativos += len(identificadores) - len(candidatos)
+        if not candidatos:
+            return set()
+
+        encontrados = self.backend.revogados(candidatos)
+        self.falsos_positivos += len(candidatos) - len(encontrados)
+        return encontrados
+
+    def revogados_desde(self, cursor=None) -> Tuple[List[str], object]:
+        return self.backend.revogados_desde(cursor)
+
+    def taxa_observada(self) -> float:
+        """Falsos positivos entre as consultas de identificadores não revogados"""
+        nao_revogados = self.negativos + self.falsos_positivos
+        return self.falsos_positivos / nao_revogados if nao_revogados else 0.0
+
+    def taxa_estimada(self) -> float:
+        filtro = self._filtro
+        return filtro.taxa_estimada() if filtro else 0.0
+
+    def estatisticas(self) -> Dict:
+        estatisticas = self.backend.estatisticas()
+        filtro = self._filtro
+        estatisticas['bloom'] = {
+            'em_dia': self._filtro_em_dia(time.monotonic()) is not None,
+            'itens': filtro.itens if filtro else 0,
+            'bits': filtro.num_bits if filtro else 0,
+            'hashes': filtro.num_hashes if filtro else 0,
+            'taxa_falso_positivo_configurada': self.taxa_falso_positivo,
+            'taxa_falso_positivo_estimada': round(self.taxa_estimada(), 6),
+            'taxa_falso_positivo_observada': round(self.taxa_observada(), 6),
+            'consultas': self.consultas,
+            'consultas_sem_filtro': self.consultas_sem_filtro,
+            'negativos': self.negativos,
+            'falsos_positivos': self.falsos_positivos,
+            'reconstrucoes': self.reconstrucoes,
+            'sincronizacoes': self.sincronizacoes,
+            'falhas_sincronizacao': self.falhas_sincronizacao
+        }
+        return estatisticas
+
+
+def criar_backend_revogacao(config) -> BackendRevogacao:
+    """Cria o backend de revogação configurado em REVOGACAO_BACKEND"""
+    tipo = config.get('REVOGACAO_BACKEND', 'memoria')
+
+    if tipo == 'memoria':
+        return RevogacaoTokens()
+    if tipo == 'sqlite':
+        backend = RevogacaoSQLite(config.get('REVOGACAO_SQLITE_PATH', '/tmp/revogacao.db'))
+    elif tipo == 'redis':
+        backend = RevogacaoRedis(
+            config.get('REVOGACAO_REDIS_URL', 'redis://localhost:6379/0'),
+            retencao=config.get('JWT_EXPIRATION_DELTA', timedelta(hours=24)).total_seconds()
+        )
+    else:
+        raise ValueError(f"REVOGACAO_BACKEND desconhecido: {tipo}")
+
+    backend = CacheLeituraRevogacao(
+        backend,
+        ttl=config.get('REVOGACAO_CACHE_TTL', 2.0),
+        tamanho_max=config.get('REVOGACAO_CACHE_TAMANHO', 10000)
+    )
+    if config.get('REVOGACAO_BLOOM', True):
+        backend = FiltroRevogacao(
+            backend,
+            capacidade=config.get('REVOGACAO_BLOOM_CAPACIDADE', 100000),
+            taxa_falso_positivo=config.get('REVOGACAO_BLOOM_TAXA_FP', 0.001),
+            intervalo=config.get('REVOGACAO_BLOOM_INTERVALO', 2.0)
+        )
+    return backend
@@ -1,56 +1,291 @@
+import atexit
+import json
 import logging
-from datetime import datetime
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
 from flask import request, current_app
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, TextIO
+
+# Políticas quando a fila está cheia
+DESCARTAR_NOVOS = 'descartar_novos'
+DESCARTAR_ANTIGOS = 'descartar_antigos'
+
+# Por evento: (campo que identifica o alvo, campo guardado como amostra na agregação)
+CAMPOS_AGREGACAO = {
+    'SQL_INJECTION_ATTEMPT': ('campo', 'valor'),
+    'SUSPICIOUS_LOGIN': ('email_telefone', 'motivo'),
+    'INVALID_DATA': ('endpoint', 'dados'),
+}
+
+
+class _Agregado:
+    """Ocorrências de um (evento, IP, identificador) dentro da janela atual"""
+
+    __slots__ = ('nivel', 'primeira', 'ultima', 'ocorrencias', 'amostras')
+
+    def __init__(self, nivel: int, agora: float):
+        self.nivel = nivel
+        self.primeira = agora
+        self.ultima = agora
+        self.ocorrencias = 1
+        self.amostras: List[Any] = []
+
 
 class SecurityLogger:
-    """Logger especializado para eventos de segurança"""
-    
-    def __init__(self):
+    """
+    Logger especializado para eventos de segurança.
+
+    A thread da requisição só monta um dicionário e o coloca em uma fila
+    limitada (deque; o limite e os contadores ficam sob um lock curto); a cada
+    intervalo uma thread de escrita serializa os registros em JSON (uma linha
+    por evento) e grava em lotes. Com a fila cheia o evento é descartado segundo a política
+    configurada, e o descarte é contado.
+
+    Com a agregação ativa, só a primeira ocorrência de cada (evento, IP,
+    identificador) na janela é gravada individualmente; as repetições viram um
+    registro de resumo (contagem, primeira/última ocorrência e amostras) quando
+    a janela fecha. O número de chaves é limitado: a mais antiga fecha antes do
+    prazo para abrir espaço.
+    """
+
+    def __init__(self, destino: Optional[TextIO] = None, capacidade: int = 10000,
+                 lote_max: int = 500, intervalo: float = 0.5, politica: str = DESCARTAR_NOVOS,
+                 janela_agregacao: float = 60.0, max_chaves_agregacao: int = 10000, max_amostras: int = 3):
         self.logger = logging.getLogger('security')
         self.logger.setLevel(logging.WARNING)
-        
-        if not self.logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter(
-                '[%(asctime)s] SECURITY %(levelname)s: %(message)s'
-            )
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
-    
+        self.destino = destino
+        self.lote_max = lote_max
+        self.intervalo = intervalo
+        self.politica = politica
+        self.capacidade = capacidade
+        self._fila: "deque[Dict]" = deque()
+        self._lock = threading.Lock()
+        self._escritor: Optional[threading.Thread] = None
+        self.enfileirados = 0
+        self.escritos = 0
+        self.descartados: Dict[str, int] = {}
+        self.janela_agregacao = janela_agregacao
+        self.max_chaves_agregacao = max_chaves_agregacao
+        self.max_amostras = max_amostras
+        self._agregados: "OrderedDict[tuple, _Agregado]" = OrderedDict()
+        self._lock_agregacao = threading.Lock()
+        self.suprimidos = 0
+        self.resumos = 0
+
+    def configurar(self, config):
+        """Aplica a configuração da aplicação (antes do primeiro evento)"""
+        with self._lock:
+            self.capacidade = config.get('SECURITY_LOG_CAPACIDADE', 10000)
+            self.lote_max = config.get('SECURITY_LOG_LOTE', 500)
+            self.intervalo = config.get('SECURITY_LOG_INTERVALO', 0.5)
+            self.politica = config.get('SECURITY_LOG_POLITICA', DESCARTAR_NOVOS)
+            self.janela_agregacao = config.get('SECURITY_LOG_AGREGACAO_JANELA', 60.0)
+            self.max_chaves_agregacao = config.get('SECURITY_LOG_AGREGACAO_MAX_CHAVES', 10000)
+            self.max_amostras = config.get('SECURITY_LOG_AGREGACAO_AMOSTRAS', 3)
+
     def log_sql_injection_attempt(self, campo: str, valor: str, ip: str = None):
         """Log tentativa de SQL Injection"""
-        ip = ip or self._get_client_ip()
-        self.logger.critical(
-            f"SQL_INJECTION_ATTEMPT - Campo: {campo}, Valor: {valor[:100]}, IP: {ip}"
-        )
-    
+        self._emitir(logging.CRITICAL, 'SQL_INJECTION_ATTEMPT', {
+            'campo': campo,
+            'valor': valor[:100],
+            'ip': ip or self._get_client_ip()
+        })
+
     def log_suspicious_login(self, email_telefone: str, reason: str, ip: str = None):
         """Log tentativa de login suspeita"""
-        ip = ip or self._get_client_ip()
-        self.logger.warning(
-            f"SUSPICIOUS_LOGIN - Email/RA: {email_telefone}, Motivo: {reason}, IP: {ip}"
-        )
-    
+        self._emitir(logging.WARNING, 'SUSPICIOUS_LOGIN', {
+            'email_telefone': email_telefone,
+            'motivo': reason,
+            'ip': ip or self._get_client_ip()
+        })
+
     def log_invalid_data(self, endpoint: str, data: Dict[str, Any], ip: str = None):
         """Log dados inválidos recebidos"""
-        ip = ip or self._get_client_ip()
-        self.logger.warning(
-            f"INVALID_DATA - Endpoint: {endpoint}, Data: {str(data)[:200]}, IP: {ip}"
-        )
-    
+        # A conversão do corpo para texto fica para a thread de escrita
+        self._emitir(logging.WARNING, 'INVALID_DATA', {
+            'endpoint': endpoint,
+            'dados': dict(data) if isinstance(data, dict) else data,
+            'ip': ip or self._get_client_ip()
+        })
+
+    def _emitir(self, nivel: int, evento: str, campos: Dict[str, Any]):
+        if not self.logger.isEnabledFor(nivel):
+            return
+        campos['ts'] = agora = time.time()
+        campos['nivel'] = nivel
+        campos['evento'] = evento
+        self._iniciar_escritor()
+
+        if self.janela_agregacao > 0 and not self._agregar(evento, campos, agora):
+            return
+        self._enfileirar(campos)
+
+    def _enfileirar(self, campos: Dict[str, Any]):
+        fila = self._fila
+        # Limite e contadores sob o lock; a thread de escrita só faz popleft, que é atômico
+        with self._lock:
+            if len(fila) >= self.capacidade:
+                if self.politica != DESCARTAR_ANTIGOS:
+                    self._registrar_descarte(campos['evento'])
+                    return
+                try:
+                    self._registrar_descarte(fila.popleft()['evento'])
+                except IndexError:
+                    pass
+            fila.append(campos)
+            self.enfileirados += 1
+
+    def _agregar(self, evento: str, campos: Dict[str, Any], agora: float) -> bool:
+        """Conta o evento na janela; True se ele deve ser gravado individualmente"""
+        campo_id, campo_amostra = CAMPOS_AGREGACAO.get(evento, (None, None))
+        chave = (evento, campos.get('ip'), campos.get(campo_id))
+        with self._lock_agregacao:
+            agregado = self._agregados.get(chave)
+            if agregado is not None:
+                agregado.ocorrencias += 1
+                agregado.ultima = agora
+                if len(agregado.amostras) < self.max_amostras:
+                    agregado.amostras.append(campos.get(campo_amostra))
+                self.suprimidos += 1
+                return False
+
+            self._agregados[chave] = _Agregado(campos['nivel'], agora)
+            # Limite de memória: fecha antecipadamente as janelas mais antigas
+            excedentes = []
+            while len(self._agregados) > self.max_chaves_agregacao:
+                excedentes.append(self._agregados.popitem(last=False))
+        self._enfileirar_resumos(excedentes)
+        return True
+
+    def _fechar_janelas(self, agora: float, todas: bool = False):
+        """Emite o resumo das janelas vencidas (ou de todas, no encerramento)"""
+        fechados = []
+        with self._lock_agregacao:
+            agregados = self._agregados
+            # Ordem de inserção é a ordem de abertura das janelas
+            while agregados:
+                chave, agregado = next(iter(agregados.items()))
+                if not todas and agora - agregado.primeira < self.janela_agregacao:
+                    break
+                agregados.popitem(last=False)
+                fechados.append((chave, agregado))
+        self._enfileirar_resumos(fechados, agora)
+
+    def _enfileirar_resumos(self, fechados: List[tuple], agora: Optional[float] = None):
+        for (evento, ip, identificador), agregado in fechados:
+            if agregado.ocorrencias < 2:
+                # Ocorrência única: o registro individual já basta
+                continue
+            campo_id = CAMPOS_AGREGACAO.get(evento, ('identificador',))[0]
+            self._enfileirar({
+                'ts': agora or time.time(),
+                'nivel': agregado.nivel,
+                'evento': evento,
+                'agregado': True,
+                'ip': ip,
+                campo_id: identificador,
+                'ocorrencias': agregado.ocorrencias,
+                'suprimidos': agregado.ocorrencias - 1,
+                'primeira_ocorrencia': agregado.primeira,
+                'ultima_ocorrencia': agregado.ultima,
+                'amostras': agregado.amostras
+            })
+            with self._lock:
+                self.resumos += 1
+
+    def _contar_descarte(self, evento: str):
+        with self._lock:
+            self._registrar_descarte(evento)
+
+    def _registrar_descarte(self, evento: str):
+        """Conta o descarte; chamado com self._lock já adquirido"""
+        self.descartados[evento] = self.descartados.get(evento, 0) + 1
+
+    def _iniciar_escritor(self):
+        if self._escritor is None:
+            with self._lock:
+                if self._escritor is None:
+                    self._escritor = threading.Thread(target=self._escrever, name='security-log', daemon=True)
+                    self._escritor.start()
+                    atexit.register(self.descarregar, True)
+
+    @staticmethod
+    def _serializar(registro: Dict[str, Any]) -> str:
+        registro['ts'] = datetime.fromtimestamp(registro['ts'], timezone.utc).isoformat()
+        registro['nivel'] = logging.getLevelName(registro['nivel'])
+        if 'dados' in registro:
+            registro['dados'] = str(registro['dados'])[:200]
+        if registro.get('agregado'):
+            for campo in ('primeira_ocorrencia', 'ultima_ocorrencia'):
+                registro[campo] = datetime.fromtimestamp(registro[campo], timezone.utc).isoformat()
+            registro['amostras'] = [
+                amostra if isinstance(amostra, str) else str(amostra)[:200]
+                for amostra in registro['amostras']
+            ]
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+    def _gravar_lote(self, lote: List[Dict[str, Any]]):
+        destino = self.destino or sys.stderr
+        try:
+            destino.write(''.join(self._serializar(registro) + '\n' for registro in lote))
+            destino.flush()
+            self.escritos += len(lote)
+        except (OSError, ValueError):
+            # Destino fechado ou indisponível: o lote é contado como descartado
+            for registro in lote:
+                self._contar_descarte(registro['evento'])
+
+    def _drenar(self) -> List[Dict[str, Any]]:
+        lote = []
+        fila = self._fila
+        while fila and len(lote) < self.lote_max:
+            try:
+                lote.append(fila.popleft())
+            except IndexError:
+                break
+        return lote
+
+    def _escrever(self):
+        while True:
+            time.sleep(self.intervalo)
+            self.descarregar()
+
+    def descarregar(self, fechar_todas: bool = False):
+        """Fecha as janelas de agregação vencidas e grava em lotes tudo o que estiver na fila"""
+        self._fechar_janelas(time.time(), todas=fechar_todas)
+        lote = self._drenar()
+        while lote:
+            self._gravar_lote(lote)
+            lote = self._drenar()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            descartados = dict(self.descartados)
+        return {
+            'enfileirados': self.enfileirados,
+            'escritos': self.escritos,
+            'descartados': descartados,
+            'na_fila': len(self._fila),
+            'capacidade': self.capacidade,
+            'politica': self.politica,
+            'agregacao': {
+                'janela': self.janela_agregacao,
+                'chaves': len(self._agregados),
+                'max_chaves': self.max_chaves_agregacao,
+                'suprimidos': self.suprimidos,
+                'resumos': self.resumos
+            }
+        }
+
     def _get_client_ip(self) -> str:
-        """Obtém IP do cliente"""
+        """Obtém IP do cliente (X-Forwarded-For já aplicado pelo ProxyFix, ver PROXY_CONFIAVEIS)"""
         try:
-            # Verifica headers de proxy
-            if request.headers.get('X-Forwarded-For'):
-                return request.headers.get('X-Forwarded-For').split(',')[0].strip()
-            elif request.headers.get('X-Real-IP'):
-                return request.headers.get('X-Real-IP')
-            else:
-                return request.remote_addr or 'unknown'
+            return request.environ.get('REMOTE_ADDR') or 'unknown'
         except:
             return 'unknown'
 
 # Instância global
-security_logger = SecurityLogger()
\ No newline at end of file
+security_logger = SecurityLogger()
@@ -0,0 +1,168 @@
+"""
+Spans leves por requisição: header Server-Timing (opt-in) e traces JSONL amostrados
+
+Um trace só é criado quando a requisição vai emitir Server-Timing ou foi
+sorteada para o arquivo JSONL; fora isso, span() e @rastrear custam apenas a
+consulta ao contexto atual.
+"""
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import List, Optional, Tuple
+
+from flask import current_app, g, has_app_context, request
+
+
+class Trace:
+    """Spans (nome, início relativo, duração) de uma requisição"""
+
+    __slots__ = ('trace_id', 'inicio', 'inicio_epoch', 'spans', 'abertos', 'max_spans', 'server_timing', 'amostrado')
+
+    def __init__(self, server_timing: bool, amostrado: bool, max_spans: int):
+        self.trace_id = os.urandom(8).hex()
+        self.inicio = time.perf_counter()
+        self.inicio_epoch = time.time()
+        self.spans: List[Tuple[str, float, float]] = []
+        # Spans em andamento: um span aninhado com o mesmo nome não é contado duas vezes
+        self.abertos = set()
+        self.max_spans = max_spans
+        self.server_timing = server_timing
+        self.amostrado = amostrado
+
+    def registrar(self, nome: str, inicio: float, fim: float):
+        if len(self.spans) < self.max_spans:
+            self.spans.append((nome, inicio - self.inicio, fim - inicio))
+
+    def header_server_timing(self, total: float) -> str:
+        # Spans repetidos (ex.: várias validações) são somados em uma entrada
+        duracoes = {}
+        for nome, _, duracao in self.spans:
+            duracoes[nome] = duracoes.get(nome, 0.0) + duracao
+        duracoes['total'] = total
+        return ', '.join(f'{nome};dur={duracao * 1000:.3f}' for nome, duracao in duracoes.items())
+
+
+def trace_atual() -> Optional[Trace]:
+    if not has_app_context():
+        return None
+    return g.get('trace')
+
+
+@contextmanager
+def span(nome: str):
+    """Mede o bloco como um span do trace da requisição atual, se houver"""
+    trace = trace_atual()
+    if trace is None or nome in trace.abertos:
+        yield
+        return
+    trace.abertos.add(nome)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.abertos.discard(nome)
+        trace.registrar(nome, inicio, time.perf_counter())
+
+
+def rastrear(nome: str):
+    """Decorator que mede a função como um span"""
+
+    def decorator(funcao):
+        @functools.wraps(funcao)
+        def wrapper(*args, **kwargs):
+            trace = trace_atual()
+            if trace is None or nome in trace.abertos:
+                return funcao(*args, **kwargs)
+            trace.abertos.add(nome)
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                trace.abertos.discard(nome)
+                trace.registrar(nome, inicio, time.perf_counter())
+        return wrapper
+
+    return decorator
+
+
+_logger_traces: Optional[logging.Logger] = None
+_logger_lock = threading.Lock()
+
+
+def _obter_logger_traces(config) -> logging.Logger:
+    """Logger dedicado que grava uma linha JSON por trace em arquivo rotativo"""
+    global _logger_traces
+    if _logger_traces is None:
+        with _logger_lock:
+            if _logger_traces is None:
+                caminho = config.get('TRACING_ARQUIVO', '/tmp/traces.jsonl')
+                diretorio = os.path.dirname(caminho)
+                if diretorio:
+                    os.makedirs(diretorio, exist_ok=True)
+                handler = RotatingFileHandler(
+                    caminho,
+                    maxBytes=config.get('TRACING_ARQUIVO_MAX_BYTES', 10 * 1024 * 1024),
+                    backupCount=config.get('TRACING_ARQUIVO_BACKUPS', 3),
+                    encoding='utf-8'
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger = logging.getLogger('tracing')
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+                _logger_traces = logger
+    return _logger_traces
+
+
+def _gravar_trace(trace: Trace, status_code: int, total: float):
+    regra = request.url_rule
+    registro = {
+        'trace_id': trace.trace_id,
+        'inicio': datetime.fromtimestamp(trace.inicio_epoch, timezone.utc).isoformat(),
+        'metodo': request.method,
+        'rota': regra.rule if regra is not None else request.path,
+        'status': status_code,
+        'duracao_ms': round(total * 1000, 3),
+        'spans': [
+            {'nome': nome, 'inicio_ms': round(inicio * 1000, 3), 'duracao_ms': round(duracao * 1000, 3)}
+            for nome, inicio, duracao in trace.spans
+        ]
+    }
+    _obter_logger_traces(current_app.config).info(json.dumps(registro, ensure_ascii=False))
+
+
+def instrumentar_tracing(app):
+    """Cria o trace da requisição quando Server-Timing ou amostragem estiverem ativos"""
+    server_timing = app.config.get('TRACING_SERVER_TIMING', False)
+    taxa = app.config.get('TRACING_TAXA_AMOSTRAGEM', 0.0)
+    max_spans = app.config.get('TRACING_MAX_SPANS', 64)
+    if not server_timing and taxa <= 0:
+        return
+
+    @app.before_request
+    def _iniciar_trace():
+        amostrado = taxa > 0 and random.random() < taxa
+        if server_timing or amostrado:
+            g.trace = Trace(server_timing, amostrado, max_spans)
+
+    @app.after_request
+    def _finalizar_trace(response):
+        trace = g.pop('trace', None)
+        if trace is None:
+            return response
+        total = time.perf_counter() - trace.inicio
+        if trace.server_timing:
+            response.headers['Server-Timing'] = trace.header_server_timing(total)
+        if trace.amostrado:
+            try:
+                _gravar_trace(trace, response.status_code, total)
+            except OSError as e:
+                current_app.logger.warning("Falha ao gravar trace: %s", e)
+        return response
@@ -1,6 +1,27 @@
 import re
 from typing import Tuple, List, Dict, Any
 
+# Tamanho máximo aceito antes de qualquer varredura (email tem no máximo 254,
+# senha no máximo 128; o excedente é descartado sem custo de regex)
+TAMANHO_MAXIMO_ENTRADA = 1024
+
+# Caracteres e comandos perigosos para SQL Injection / XSS
+CARACTERES_PERIGOSOS = ["'", '"', ";", "--", "/*", "*/", "xp_", "sp_", 
+                        "DROP", "DELETE", "INSERT", "UPDATE", "SELECT", 
+                        "UNION", "OR", "AND", "EXEC", "EXECUTE", "SCRIPT",
+                        "<script", "</script", "javascript:", "vbscript:",
+                        "onload=", "onerror=", "onclick="]
+
+# Padrões perigosos em minúsculas, montados uma vez na importação. Os que contêm
+# outro padrão da lista (ex.: "onerror=" contém "or") são redundantes e ficam de fora
+_PADROES_PERIGOSOS = tuple(
+    p for p in dict.fromkeys(c.lower() for c in CARACTERES_PERIGOSOS)
+    if not any(q != p and q in p for q in (c.lower() for c in CARACTERES_PERIGOSOS))
+)
+_PADRAO_CONTROLE = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+_PADRAO_EMAIL = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_PADRAO_SEPARADORES_RA = re.compile(r'[-.\s]')
+
 def validar_email(email: str) -> bool:
     """
     Valida formato de email de forma segura
@@ -9,8 +30,7 @@ def validar_email(email: str) -> bool:
         return False
     
     # Regex rigorosa para email
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(email_pattern, email))
+    return bool(_PADRAO_EMAIL.match(email))
 
 def validar_ra_formato(ra: str) -> bool:
     """
@@ -21,7 +41,7 @@ def validar_ra_formato(ra: str) -> bool:
         return False
     
     # Remove APENAS hífens, pontos e espaços permitidos
-    ra_limpo = re.sub(r'[-.\s]', '', ra)
+    ra_limpo = _PADRAO_SEPARADORES_RA.sub('', ra)
     
     # Deve conter APENAS dígitos após limpeza
     if not ra_limpo.isdigit():
@@ -40,21 +60,16 @@ def sanitizar_entrada(valor: str) -> str:
     if not isinstance(valor, str):
         return ""
     
-    # Remove caracteres perigosos para SQL
-    caracteres_perigosos = ["'", '"', ";", "--", "/*", "*/", "xp_", "sp_", 
-                           "DROP", "DELETE", "INSERT", "UPDATE", "SELECT", 
-                           "UNION", "OR", "AND", "EXEC", "EXECUTE", "SCRIPT",
-                           "<script", "</script", "javascript:", "vbscript:",
-                           "onload=", "onerror=", "onclick="]
+    # Limite rígido antes de qualquer varredura
+    if len(valor) > TAMANHO_MAXIMO_ENTRADA:
+        raise ValueError("Entrada excede o tamanho máximo permitido")
     
     valor_limpo = valor.strip()
     
-    # Converte para minúsculo para verificação
+    # Verifica as palavras perigosas sem diferenciar maiúsculas
     valor_lower = valor_limpo.lower()
-    
-    # Verifica se contém palavras SQL perigosas
-    for palavra in caracteres_perigosos:
-        if palavra.lower() in valor_lower:
+    for palavra in _PADROES_PERIGOSOS:
+        if palavra in valor_lower:
             # Log da tentativa de injeção
             try:
                 from app.utils.security_logger import security_logger
@@ -65,7 +80,7 @@ def sanitizar_entrada(valor: str) -> str:
             raise ValueError(f"Entrada contém caracteres ou comandos não permitidos")
     
     # Remove caracteres de controle
-    valor_limpo = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', valor_limpo)
+    valor_limpo = _PADRAO_CONTROLE.sub('', valor_limpo)
     
     return valor_limpo
 
@@ -165,7 +180,7 @@ def normalizar_ra(ra: str) -> str:
     """
     try:
         ra_sanitizado = sanitizar_entrada(ra)
-        return re.sub(r'[-.\s]', '', ra_sanitizado)
+        return _PADRAO_SEPARADORES_RA.sub('', ra_sanitizado)
     except ValueError:
         return ""  # Retorna vazio se entrada é maliciosa
 
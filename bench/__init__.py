@@ -0,0 +1,5 @@
+"""
+Benchmarks da aplicação, executados a partir da raiz do repositório:
+
+    python -m bench.<modulo> --help
+"""
@@ -0,0 +1,85 @@
+"""
+Requisições por segundo de OPTIONS e /health: Flask completo versus MiddlewareCaminhoRapido
+
+Uso:
+
+    python -m bench.caminho_rapido --iteracoes 20000
+
+Cada requisição é uma chamada WSGI direta, sem servidor nem rede: o tempo é
+só o da aplicação. O modo "flask" chama a pilha que fica atrás do caminho
+rápido (roteamento, before/after request, métricas); o modo "caminho_rapido"
+chama o middleware mais externo, como o servidor faz.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict
+
+from werkzeug.test import create_environ
+
+from app import create_app
+
+REQUISICOES = {
+    'OPTIONS /auth/login': ('OPTIONS', '/auth/login'),
+    'GET /health': ('GET', '/health'),
+}
+
+
+def _medir(aplicacao, metodo: str, caminho: str, iteracoes: int) -> Dict:
+    base = create_environ(caminho, method=metodo, headers={
+        'Origin': 'https://app.uninga.edu.br',
+        'Access-Control-Request-Method': 'POST',
+    })
+    status = []
+
+    def start_response(linha, cabecalhos, exc_info=None):
+        status.append(linha)
+
+    inicio = time.perf_counter()
+    for _ in range(iteracoes):
+        corpo = aplicacao(dict(base), start_response)
+        for _ in corpo:
+            pass
+        if hasattr(corpo, 'close'):
+            corpo.close()
+    duracao = time.perf_counter() - inicio
+    if not status[-1].startswith('200'):
+        raise RuntimeError(f"{metodo} {caminho} respondeu {status[-1]}")
+    return {'status': status[-1], 'requisicoes_por_segundo': round(iteracoes / duracao)}
+
+
+def medir(iteracoes: int) -> Dict:
+    app = create_app()
+    # O limite de taxa de /auth/login também vale para o OPTIONS que chega ao Flask
+    app.config.update(RATE_LIMIT_ATIVO=False)
+    caminho_rapido = app.wsgi_app
+    modos = {'flask': caminho_rapido.app, 'caminho_rapido': caminho_rapido}
+    return {
+        rotulo: {modo: _medir(aplicacao, metodo, caminho, iteracoes) for modo, aplicacao in modos.items()}
+        for rotulo, (metodo, caminho) in REQUISICOES.items()
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iteracoes', type=int, default=20000)
+    parser.add_argument('--json', action='store_true', help='imprime o relatório em JSON')
+    args = parser.parse_args(argv)
+
+    relatorio = medir(max(args.iteracoes, 1))
+    if args.json:
+        print(json.dumps(relatorio, indent=2))
+        return 0
+
+    print(f"{args.iteracoes} requisições por rota (requisições/s)")
+    print(f"{'requisição':<22}{'flask':>12}{'caminho rápido':>17}{'ganho':>8}")
+    for rotulo, resultado in relatorio.items():
+        flask = resultado['flask']['requisicoes_por_segundo']
+        rapido = resultado['caminho_rapido']['requisicoes_por_segundo']
+        print(f"{rotulo:<22}{flask:>12}{rapido:>17}{rapido / flask:>7.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
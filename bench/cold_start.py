@@ -0,0 +1,120 @@
+"""
+Medição do cold start da aplicação (importações, construção do app e primeira requisição)
+
+Cada rodada executa um interpretador novo com `-X importtime`, reproduzindo o
+que a Vercel faz a cada cold start em api/index.py. Uso, inclusive em CI:
+
+    python -m bench.cold_start --rodadas 5 --limite-ms 400
+
+Sai com código 1 se a mediana do cold start ultrapassar --limite-ms.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado no interpretador novo; imprime as fases em JSON no stdout
+_SCRIPT_MEDICAO = """
+import json, time
+inicio = time.perf_counter()
+from app import create_app
+importado = time.perf_counter()
+app = create_app()
+construido = time.perf_counter()
+app.test_client().get('/health')
+primeira = time.perf_counter()
+print(json.dumps({
+    'importacao_ms': (importado - inicio) * 1000,
+    'construcao_app_ms': (construido - importado) * 1000,
+    'primeira_requisicao_ms': (primeira - construido) * 1000,
+}))
+"""
+
+FASES = ('importacao_ms', 'construcao_app_ms', 'primeira_requisicao_ms')
+
+
+def _interpretar_importtime(saida: str) -> Dict[str, float]:
+    """Tempo cumulativo (ms) de cada módulo a partir da saída de -X importtime"""
+    modulos = {}
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:'):
+            continue
+        partes = linha[len('import time:'):].split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue  # cabeçalho
+        modulos[partes[2].strip()] = int(partes[1]) / 1000
+    return modulos
+
+
+def medir_rodada() -> Dict:
+    """Executa um cold start em um processo novo e retorna fases e módulos"""
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ, PYTHONDONTWRITEBYTECODE='1')
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _SCRIPT_MEDICAO],
+        cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True
+    )
+    fases = json.loads(resultado.stdout.strip().splitlines()[-1])
+    fases['total_ms'] = sum(fases[fase] for fase in FASES)
+    return {'fases': fases, 'modulos': _interpretar_importtime(resultado.stderr)}
+
+
+def gerar_relatorio(rodadas: int = 5, top: int = 15) -> Dict:
+    """Mediana das fases e dos módulos mais caros ao longo das rodadas"""
+    medicoes: List[Dict] = [medir_rodada() for _ in range(max(rodadas, 1))]
+
+    fases = {
+        fase: round(statistics.median(m['fases'][fase] for m in medicoes), 3)
+        for fase in FASES + ('total_ms',)
+    }
+    nomes = set().union(*(m['modulos'] for m in medicoes))
+    modulos = {
+        nome: round(statistics.median(m['modulos'].get(nome, 0.0) for m in medicoes), 3)
+        for nome in nomes
+    }
+    mais_caros = sorted(modulos.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'rodadas': len(medicoes),
+        'fases': fases,
+        'modulos_importados': len(modulos),
+        'modulos_mais_caros_ms': dict(mais_caros)
+    }
+
+
+def _imprimir(relatorio: Dict):
+    print(f"Cold start (mediana de {relatorio['rodadas']} rodadas)")
+    for fase, valor in relatorio['fases'].items():
+        print(f"  {fase:<24}{valor:>10.1f}")
+    print(f"\nMódulos importados: {relatorio['modulos_importados']}; mais caros (cumulativo, ms):")
+    for nome, valor in relatorio['modulos_mais_caros_ms'].items():
+        print(f"  {valor:>10.1f}  {nome}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rodadas', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--limite-ms', type=float, default=0.0,
+                        help='falha se a mediana do cold start total passar deste valor (0 desativa)')
+    parser.add_argument('--json', action='store_true', help='imprime o relatório em JSON')
+    args = parser.parse_args(argv)
+
+    relatorio = gerar_relatorio(args.rodadas, args.top)
+    if args.json:
+        print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    else:
+        _imprimir(relatorio)
+
+    total = relatorio['fases']['total_ms']
+    if args.limite_ms and total > args.limite_ms:
+        print(f"\nCold start de {total:.1f} ms acima do limite de {args.limite_ms:.1f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Tokens verificados por segundo: /auth/introspect em lote versus /auth/verify-token um a um
+
+Uso:
+
+    python -m bench.introspeccao --tokens 2000 --lote 100
+
+As requisições passam pelo test client do Flask (roteamento, before/after
+request e serialização JSON, sem rede), com o rate limit e o cache de tokens
+verificados desligados. Uma fração dos tokens é revogada antes da medição.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+
+from app import create_app
+
+SEGREDO_SERVICO = 'bench-introspeccao'
+
+
+def _criar_app():
+    """App novo, com stores de revogação e de perfil vazios"""
+    import app.utils.auth as auth
+    import app.utils.perfil_store as perfil_store
+
+    auth._backend_revogacao = None
+    perfil_store._perfil_store = None
+    app = create_app()
+    app.config.update(
+        JWT_CACHE_TAMANHO=0,
+        RATE_LIMIT_ATIVO=False,
+        INTROSPECCAO_TOKEN=SEGREDO_SERVICO
+    )
+    return app
+
+
+def _emitir(app, quantidade: int, revogados: float) -> List[str]:
+    from app.utils.auth import adicionar_token_blacklist, gerar_token_jwt
+
+    with app.app_context():
+        tokens = [
+            gerar_token_jwt({'identificador': f'usuario{indice}@uninga.edu.br', 'permissoes': ['user']})
+            for indice in range(quantidade)
+        ]
+        for token in tokens[:int(quantidade * revogados)]:
+            adicionar_token_blacklist(token)
+    return tokens
+
+
+def medir_individual(app, tokens: List[str]) -> Dict:
+    cliente = app.test_client()
+    validos = 0
+    inicio = time.perf_counter()
+    for token in tokens:
+        resposta = cliente.post('/auth/verify-token', headers={'Authorization': f'Bearer {token}'})
+        validos += resposta.status_code == 200
+    duracao = time.perf_counter() - inicio
+    return {'requisicoes': len(tokens), 'validos': validos, 'tokens_por_segundo': round(len(tokens) / duracao)}
+
+
+def medir_lote(app, tokens: List[str], lote: int) -> Dict:
+    cliente = app.test_client()
+    cabecalhos = {'Authorization': f'Bearer {SEGREDO_SERVICO}'}
+    validos = requisicoes = 0
+    inicio = time.perf_counter()
+    for posicao in range(0, len(tokens), lote):
+        resposta = cliente.post('/auth/introspect', json={'tokens': tokens[posicao:posicao + lote]}, headers=cabecalhos)
+        if resposta.status_code != 200:
+            raise RuntimeError(f"/auth/introspect respondeu {resposta.status_code}: {resposta.get_data(as_text=True)}")
+        validos += sum(resultado['valid'] for resultado in resposta.get_json()['resultados'])
+        requisicoes += 1
+    duracao = time.perf_counter() - inicio
+    return {'requisicoes': requisicoes, 'validos': validos, 'tokens_por_segundo': round(len(tokens) / duracao)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=2000)
+    parser.add_argument('--lote', type=int, default=100, help='tokens por requisição de introspecção')
+    parser.add_argument('--revogados', type=float, default=0.1, help='fração dos tokens revogada')
+    parser.add_argument('--json', action='store_true', help='imprime o relatório em JSON')
+    args = parser.parse_args(argv)
+
+    app = _criar_app()
+    lote = min(max(args.lote, 1), app.config['INTROSPECCAO_MAX_TOKENS'])
+    tokens = _emitir(app, max(args.tokens, 1), args.revogados)
+    relatorio = {
+        'verify_token': medir_individual(app, tokens),
+        'introspect': medir_lote(app, tokens, lote)
+    }
+    if args.json:
+        print(json.dumps(relatorio, indent=2))
+        return 0
+
+    print(f"{len(tokens)} tokens, {args.revogados:.0%} revogados, lotes de {lote}")
+    print(f"{'rota':<14}{'requisições':>13}{'válidos':>9}{'tokens/s':>11}")
+    for rota, resultado in relatorio.items():
+        print(f"{rota:<14}{resultado['requisicoes']:>13}{resultado['validos']:>9}{resultado['tokens_por_segundo']:>11}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Simulação de um dia de sessões: tamanho do estado de revogação e latência de verificação por modo de token
+
+Uso:
+
+    python -m bench.revogacao --sessoes 5000 --horas 8 --logout 0.6
+
+Modo "legado": um token de JWT_EXPIRATION_DELTA renovado a cada hora; cada
+renovação e cada logout revogam o token anterior até o exp dele (24h), então
+todas as revogações do dia continuam no store no fim do dia.
+Modo "par": access token curto renovado a cada JWT_ACESSO_EXPIRACAO pelo
+refresh token; o único estado é uma família por sessão ainda aberta.
+
+A verificação medida é a de token_required, com o cache de tokens verificados
+desligado e o store já no tamanho do fim do dia.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Dict
+
+from app import create_app
+
+
+def _criar_app(**config):
+    """App novo, com stores de revogação e de refresh vazios"""
+    import app.utils.auth as auth
+    import app.utils.refresh_tokens as refresh_tokens
+
+    auth._backend_revogacao = None
+    refresh_tokens._backend_refresh = None
+    app = create_app()
+    app.config.update(JWT_CACHE_TAMANHO=0, **config)
+    return app
+
+
+def _perfil(indice: int) -> Dict:
+    return {'identificador': f'usuario{indice}@uninga.edu.br', 'permissoes': ['user']}
+
+
+def _medir_verificacao(tokens, iteracoes: int) -> Dict:
+    from app.utils.auth import verificar_token_jwt
+
+    duracoes = []
+    for indice in range(iteracoes):
+        inicio = time.perf_counter()
+        verificar_token_jwt(tokens[indice % len(tokens)])
+        duracoes.append(time.perf_counter() - inicio)
+    duracoes.sort()
+    return {
+        'verificacao_mediana_us': round(statistics.median(duracoes) * 1e6, 2),
+        'verificacao_p99_us': round(duracoes[int(len(duracoes) * 0.99) - 1] * 1e6, 2)
+    }
+
+
+def simular_legado(sessoes: int, horas: int, taxa_logout: float, iteracoes: int) -> Dict:
+    from app.utils.auth import adicionar_token_blacklist, gerar_token_jwt, obter_backend_revogacao
+
+    app = _criar_app(JWT_PAR_TOKENS=False)
+    sorteio = random.Random(42)
+    with app.app_context():
+        ativos = []
+        for indice in range(sessoes):
+            token = gerar_token_jwt(_perfil(indice))
+            for _ in range(horas - 1):
+                adicionar_token_blacklist(token)
+                token = gerar_token_jwt(_perfil(indice))
+            if sorteio.random() < taxa_logout:
+                adicionar_token_blacklist(token)
+            else:
+                ativos.append(token)
+        resultado = {'estado_revogacao': obter_backend_revogacao().estatisticas().get('entradas')}
+        resultado.update(_medir_verificacao(ativos or [token], iteracoes))
+    return resultado
+
+
+def simular_par(sessoes: int, horas: int, taxa_logout: float, iteracoes: int) -> Dict:
+    from app.utils.auth import gerar_token_jwt, obter_backend_revogacao
+    from app.utils.refresh_tokens import (
+        emitir_refresh_token, obter_backend_refresh, revogar_familia, rotacionar_refresh_token
+    )
+
+    app = _criar_app(JWT_PAR_TOKENS=True)
+    renovacoes = int(horas * 3600 / app.config['JWT_ACESSO_EXPIRACAO'].total_seconds())
+    sorteio = random.Random(42)
+    with app.app_context():
+        ativos = []
+        for indice in range(sessoes):
+            familia, token_refresh = emitir_refresh_token(_perfil(indice))
+            for _ in range(renovacoes):
+                token_refresh = rotacionar_refresh_token(token_refresh).refresh_token
+            token = gerar_token_jwt(_perfil(indice), familia)
+            if sorteio.random() < taxa_logout:
+                revogar_familia(familia)
+            else:
+                ativos.append(token)
+        resultado = {
+            'estado_revogacao': obter_backend_revogacao().estatisticas().get('entradas'),
+            'familias_refresh': obter_backend_refresh().estatisticas().get('familias')
+        }
+        resultado.update(_medir_verificacao(ativos or [token], iteracoes))
+    return resultado
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessoes', type=int, default=5000)
+    parser.add_argument('--horas', type=int, default=8, help='duração de cada sessão no dia')
+    parser.add_argument('--logout', type=float, default=0.6, help='fração das sessões encerradas com logout')
+    parser.add_argument('--iteracoes', type=int, default=20000)
+    parser.add_argument('--json', action='store_true', help='imprime o relatório em JSON')
+    args = parser.parse_args(argv)
+
+    sessoes, horas = max(args.sessoes, 1), max(args.horas, 1)
+    relatorio = {
+        'legado': simular_legado(sessoes, horas, args.logout, max(args.iteracoes, 1)),
+        'par': simular_par(sessoes, horas, args.logout, max(args.iteracoes, 1))
+    }
+    if args.json:
+        print(json.dumps(relatorio, indent=2))
+        return 0
+
+    print(f"{sessoes} sessões de {horas}h, {args.logout:.0%} com logout")
+    print(f"{'modo':<8}{'revogações':>12}{'famílias':>10}{'mediana (µs)':>15}{'p99 (µs)':>11}")
+    for modo, resultado in relatorio.items():
+        print(f"{modo:<8}{resultado['estado_revogacao']:>12}{resultado.get('familias_refresh', '-'):>10}"
+              f"{resultado['verificacao_mediana_us']:>15.1f}{resultado['verificacao_p99_us']:>11.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
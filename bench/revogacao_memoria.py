@@ -0,0 +1,121 @@
+"""
+Memória do registro de revogação após N logouts: set de tokens completos versus RevogacaoTokens
+
+Uso:
+
+    python -m bench.revogacao_memoria --logouts 1000000 --validade 2
+
+Modo "legado": o antigo token_blacklist, um set com o token inteiro de cada
+logout, que nunca é podado.
+Modo "identificador": RevogacaoTokens com o jti e o exp de cada token, sem
+nenhuma entrada expirando durante a execução (validade de JWT_EXPIRATION_DELTA).
+Modo "poda": RevogacaoTokens com tokens que expiram --validade segundos após
+o logout; o tamanho para de crescer quando a poda alcança as escritas.
+
+A memória é a alocada pelo registro (tracemalloc), medida a cada décimo dos
+logouts; o rastreamento deixa a execução lenta, então o tempo não é reportado.
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+import uuid
+from typing import Dict, List
+
+from app import create_app
+
+PONTOS = 10
+
+
+def _token_exemplo() -> str:
+    """Token completo emitido pela aplicação, usado como molde do modo legado"""
+    from app.utils.auth import gerar_token_jwt
+
+    app = create_app()
+    app.config.update(JWT_SLIM=False)
+    with app.app_context():
+        return gerar_token_jwt({
+            'identificador': 'teste@uninga.edu.br',
+            'nome': 'TESTE USUÁRIO',
+            'email': 'teste@uninga.edu.br',
+            'tipo': 'email',
+            'tipo_usuario': 'PROFESSOR',
+            'permissoes': ['user', 'professor']
+        })
+
+
+def _medir(logouts: int, revogar) -> List[Dict]:
+    """Executa os logouts e retorna a memória alocada a cada décimo"""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    passo = max(logouts // PONTOS, 1)
+    pontos = []
+    for indice in range(1, logouts + 1):
+        entradas = revogar(indice)
+        if indice % passo == 0 or indice == logouts:
+            pontos.append({
+                'logouts': indice,
+                'entradas': entradas,
+                'memoria_mib': round((tracemalloc.get_traced_memory()[0] - base) / 2 ** 20, 2)
+            })
+    tracemalloc.stop()
+    return pontos
+
+
+def medir_legado(logouts: int, token: str) -> List[Dict]:
+    prefixo = token[:-12]
+    blacklist = set()
+
+    def revogar(indice):
+        blacklist.add(f'{prefixo}{indice:012d}')
+        return len(blacklist)
+
+    return _medir(logouts, revogar)
+
+
+def medir_identificador(logouts: int, validade: float) -> List[Dict]:
+    from app.utils.revogacao import RevogacaoTokens
+
+    registro = RevogacaoTokens()
+
+    def revogar(_indice):
+        registro.revogar(uuid.uuid4().hex, time.time() + validade)
+        return len(registro)
+
+    return _medir(logouts, revogar)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logouts', type=int, default=1000000)
+    parser.add_argument('--validade', type=float, default=2.0,
+                        help='segundos até o exp dos tokens no modo "poda"')
+    parser.add_argument('--json', action='store_true', help='imprime o relatório em JSON')
+    args = parser.parse_args(argv)
+
+    logouts = max(args.logouts, 1)
+    token = _token_exemplo()
+    validade_padrao = create_app().config['JWT_EXPIRATION_DELTA'].total_seconds()
+    relatorio = {
+        'legado': medir_legado(logouts, token),
+        'identificador': medir_identificador(logouts, validade_padrao),
+        'poda': medir_identificador(logouts, max(args.validade, 0.001))
+    }
+    if args.json:
+        print(json.dumps(relatorio, indent=2))
+        return 0
+
+    print(f"{logouts} logouts, token completo de {len(token)} bytes, validade no modo poda de {args.validade}s")
+    print(f"{'modo':<15}{'logouts':>10}{'entradas':>10}{'memória (MiB)':>15}")
+    for modo, pontos in relatorio.items():
+        for ponto in pontos:
+            print(f"{modo:<15}{ponto['logouts']:>10}{ponto['entradas']:>10}"
+                  f"{ponto['memoria_mib']:>15.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
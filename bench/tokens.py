@@ -0,0 +1,88 @@
+"""
+Comparação entre tokens completos e enxutos (JWT_SLIM): tamanho do header e latência de verificação
+
+Uso:
+
+    python -m bench.tokens --iteracoes 20000 --campos-extra 40
+
+A verificação medida é a de /auth/verify-token (assinatura, revogação e, no
+modo enxuto, a leitura do perfil), com o cache de tokens verificados desligado.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Dict
+
+from app import create_app
+
+PERFIL_EXEMPLO = {
+    'identificador': 'teste@uninga.edu.br',
+    'nome': 'TESTE USUÁRIO',
+    'email': 'teste@uninga.edu.br',
+    'tipo': 'email',
+    'tipo_usuario': 'PROFESSOR',
+    'nivel_acesso': '1',
+    'permissoes': ['user', 'professor']
+}
+
+
+def _perfil(campos_extra: int) -> Dict:
+    """Perfil de exemplo com campos adicionais, como as respostas do APEX"""
+    perfil = dict(PERFIL_EXEMPLO)
+    for indice in range(campos_extra):
+        perfil[f'campo_{indice}'] = f'valor do campo {indice} retornado pela API externa'
+    return perfil
+
+
+def medir_modo(enxuto: bool, iteracoes: int, campos_extra: int) -> Dict:
+    """Emite um token no modo informado e mede a verificação com hidratação do perfil"""
+    from app.utils.auth import gerar_token_jwt, hidratar_perfil, verificar_token_jwt
+
+    app = create_app()
+    app.config.update(JWT_SLIM=enxuto, JWT_CACHE_TAMANHO=0)
+    with app.app_context():
+        token = gerar_token_jwt(_perfil(campos_extra))
+        duracoes = []
+        for _ in range(iteracoes):
+            inicio = time.perf_counter()
+            payload, erro = verificar_token_jwt(token)
+            hidratar_perfil(payload)
+            duracoes.append(time.perf_counter() - inicio)
+        if erro:
+            raise RuntimeError(erro)
+
+    duracoes.sort()
+    return {
+        'header_bytes': len(f'Bearer {token}'),
+        'verificacao_mediana_us': round(statistics.median(duracoes) * 1e6, 2),
+        'verificacao_p99_us': round(duracoes[int(len(duracoes) * 0.99) - 1] * 1e6, 2)
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iteracoes', type=int, default=20000)
+    parser.add_argument('--campos-extra', type=int, default=40)
+    parser.add_argument('--json', action='store_true', help='imprime o relatório em JSON')
+    args = parser.parse_args(argv)
+
+    iteracoes = max(args.iteracoes, 1)
+    relatorio = {
+        'completo': medir_modo(False, iteracoes, args.campos_extra),
+        'enxuto': medir_modo(True, iteracoes, args.campos_extra)
+    }
+    if args.json:
+        print(json.dumps(relatorio, indent=2))
+        return 0
+
+    print(f"{'modo':<10}{'header (bytes)':>16}{'mediana (µs)':>16}{'p99 (µs)':>12}")
+    for modo, resultado in relatorio.items():
+        print(f"{modo:<10}{resultado['header_bytes']:>16}"
+              f"{resultado['verificacao_mediana_us']:>16.1f}{resultado['verificacao_p99_us']:>12.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Servidor local do protocolo Redis (RESP2) para os testes dos backends compartilhados
+
+Implementa só os comandos que os backends usam, em memória e em um processo:
+strings com EX, sorted sets, MULTI/EXEC e WATCH.
+"""
+import socketserver
+import threading
+import time
+
+import pytest
+
+
+def _bulk(valor) -> bytes:
+    if valor is None:
+        return b'$-1\r\n'
+    return b'$%d\r\n%s\r\n' % (len(valor), valor)
+
+
+def _array(itens) -> bytes:
+    return b'*%d\r\n' % len(itens) + b''.join(itens)
+
+
+def _limite(texto: bytes):
+    """Limite de score do ZRANGEBYSCORE: (valor, exclusivo)"""
+    texto = texto.decode('ascii')
+    if texto.startswith('('):
+        return float(texto[1:]), True
+    return float(texto), False
+
+
+class DadosRESP:
+    """Chaves do servidor; cada escrita avança a versão da chave (usada pelo WATCH)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.strings = {}
+        self.zsets = {}
+        self.versoes = {}
+
+    def _tocar(self, chave):
+        self.versoes[chave] = self.versoes.get(chave, 0) + 1
+
+    def _valor(self, chave, agora):
+        entrada = self.strings.get(chave)
+        if entrada is not None and entrada[1] is not None and entrada[1] <= agora:
+            del self.strings[chave]
+            self._tocar(chave)
+            entrada = None
+        return None if entrada is None else entrada[0]
+
+    def executar(self, args) -> bytes:
+        comando, args = args[0].upper(), args[1:]
+        agora = time.time()
+        if comando == b'PING':
+            return b'+PONG\r\n'
+        if comando == b'SET':
+            expira_em = agora + int(args[3]) if len(args) > 3 and args[2].upper() == b'EX' else None
+            self.strings[args[0]] = (args[1], expira_em)
+            self._tocar(args[0])
+            return b'+OK\r\n'
+        if comando == b'GET':
+            return _bulk(self._valor(args[0], agora))
+        if comando == b'MGET':
+            return _array([_bulk(self._valor(chave, agora)) for chave in args])
+        if comando == b'EXISTS':
+            return b':%d\r\n' % sum(self._valor(chave, agora) is not None for chave in args)
+        if comando == b'DEL':
+            removidas = 0
+            for chave in args:
+                if self.strings.pop(chave, None) is not None or self.zsets.pop(chave, None) is not None:
+                    removidas += 1
+                    self._tocar(chave)
+            return b':%d\r\n' % removidas
+        if comando == b'INCR':
+            entrada = self.strings.get(args[0]) if self._valor(args[0], agora) is not None else None
+            valor = int(entrada[0]) + 1 if entrada else 1
+            self.strings[args[0]] = (str(valor).encode('ascii'), entrada[1] if entrada else None)
+            self._tocar(args[0])
+            return b':%d\r\n' % valor
+        if comando == b'EXPIRE':
+            if self._valor(args[0], agora) is None:
+                return b':0\r\n'
+            self.strings[args[0]] = (self.strings[args[0]][0], agora + int(args[1]))
+            return b':1\r\n'
+        if comando == b'TTL':
+            if self._valor(args[0], agora) is None:
+                return b':-2\r\n'
+            expira_em = self.strings[args[0]][1]
+            return b':%d\r\n' % (-1 if expira_em is None else round(expira_em - agora))
+        if comando == b'ZADD':
+            zset = self.zsets.setdefault(args[0], {})
+            novos = 0
+            for score, membro in zip(args[1::2], args[2::2]):
+                novos += membro not in zset
+                zset[membro] = float(score)
+            self._tocar(args[0])
+            return b':%d\r\n' % novos
+        if comando == b'ZRANGEBYSCORE':
+            (minimo, min_exclusivo), (maximo, max_exclusivo) = _limite(args[1]), _limite(args[2])
+            opcoes = [opcao.upper() for opcao in args[3:]]
+            itens = sorted(
+                (score, membro) for membro, score in self.zsets.get(args[0], {}).items()
+                if (score > minimo if min_exclusivo else score >= minimo)
+                and (score < maximo if max_exclusivo else score <= maximo)
+            )
+            if b'LIMIT' in opcoes:
+                posicao = opcoes.index(b'LIMIT') + 3
+                inicio, quantidade = int(args[posicao + 1]), int(args[posicao + 2])
+                itens = itens[inicio:inicio + quantidade]
+            resposta = []
+            for score, membro in itens:
+                resposta.append(_bulk(membro))
+                if b'WITHSCORES' in opcoes:
+                    resposta.append(_bulk(repr(score).encode('ascii')))
+            return _array(resposta)
+        if comando == b'ZREMRANGEBYSCORE':
+            (minimo, _), (maximo, _) = _limite(args[1]), _limite(args[2])
+            zset = self.zsets.get(args[0], {})
+            removidos = [membro for membro, score in zset.items() if minimo <= score <= maximo]
+            for membro in removidos:
+                del zset[membro]
+            self._tocar(args[0])
+            return b':%d\r\n' % len(removidos)
+        return b'-ERR comando nao suportado\r\n'
+
+
+class _ConexaoRESP(socketserver.StreamRequestHandler):
+    # Respostas de pipeline saem em escritas pequenas seguidas
+    disable_nagle_algorithm = True
+
+    def _ler_comando(self):
+        linha = self.rfile.readline()
+        if not linha:
+            return None
+        args = []
+        for _ in range(int(linha[1:-2])):
+            tamanho = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(tamanho + 2)[:-2])
+        return args
+
+    def handle(self):
+        dados = self.server.dados
+        transacao = None
+        observadas = {}
+        while True:
+            args = self._ler_comando()
+            if args is None:
+                return
+            comando = args[0].upper()
+            if comando == b'WATCH':
+                with dados.lock:
+                    for chave in args[1:]:
+                        observadas[chave] = dados.versoes.get(chave, 0)
+                resposta = b'+OK\r\n'
+            elif comando == b'UNWATCH':
+                observadas = {}
+                resposta = b'+OK\r\n'
+            elif comando == b'MULTI':
+                transacao = []
+                resposta = b'+OK\r\n'
+            elif comando == b'EXEC':
+                with dados.lock:
+                    if any(dados.versoes.get(chave, 0) != versao for chave, versao in observadas.items()):
+                        resposta = b'*-1\r\n'
+                    else:
+                        resposta = _array([dados.executar(pendente) for pendente in transacao])
+                transacao, observadas = None, {}
+            elif transacao is not None:
+                transacao.append(args)
+                resposta = b'+QUEUED\r\n'
+            else:
+                with dados.lock:
+                    resposta = dados.executar(args)
+            self.wfile.write(resposta)
+
+
+class ServidorRESP(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    # Conexões simultâneas dos testes concorrentes (o padrão é 5)
+    request_queue_size = 64
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _ConexaoRESP)
+        self.dados = DadosRESP()
+        self.url = f'redis://127.0.0.1:{self.server_address[1]}/0'
+
+
+@pytest.fixture
+def servidor_resp():
+    """Servidor RESP local em uma thread; a URL fica em servidor_resp.url"""
+    servidor = ServidorRESP()
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
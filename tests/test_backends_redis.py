@@ -0,0 +1,61 @@
+"""
+Backends compartilhados contra o servidor RESP local (tests/conftest.py)
+"""
+import threading
+import time
+
+from app.utils.refresh_tokens import RefreshRedis
+from app.utils.revogacao import RevogacaoRedis
+
+
+def test_revogacao_redis_consultas(servidor_resp):
+    backend = RevogacaoRedis(servidor_resp.url)
+    exp = time.time() + 60
+    backend.revogar('a', exp)
+    backend.revogar('b', exp)
+    # Token já expirado não é gravado
+    backend.revogar('c', time.time() - 1)
+
+    assert backend.esta_revogado('a')
+    assert not backend.esta_revogado('c')
+    assert backend.revogados(['a', 'b', 'c', 'd']) == {'a', 'b'}
+    assert backend.revogados([]) == set()
+
+
+def test_revogacao_redis_log_paginado(servidor_resp):
+    backend = RevogacaoRedis(servidor_resp.url)
+    exp = time.time() + 60
+    primeiros = [f'jti-{indice}' for indice in range(2500)]
+    for identificador in primeiros:
+        backend.revogar(identificador, exp)
+
+    # Mais de duas páginas de RevogacaoRedis.PAGINA_LOG: nada fica de fora
+    todos, cursor = backend.revogados_desde(None)
+    assert set(todos) == set(primeiros)
+
+    # Leitura incremental a partir do cursor traz as revogações seguintes
+    backend.revogar('depois', exp)
+    novos, proximo = backend.revogados_desde(cursor)
+    assert 'depois' in novos
+    assert proximo >= cursor
+
+
+def test_refresh_redis_rotacao_concorrente_avanca_uma_vez(servidor_resp):
+    backend = RefreshRedis(servidor_resp.url)
+    backend.criar_familia('familia', {'identificador': 'teste'}, time.time() + 60)
+
+    resultados = []
+    barreira = threading.Barrier(8)
+
+    def rotacionar():
+        barreira.wait()
+        resultados.append(backend.avancar('familia', 0, 0)[1])
+
+    threads = [threading.Thread(target=rotacionar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Só uma rotação consome a geração 0; as demais são reuso fora da janela
+    assert sorted(resultados, key=lambda geracao: geracao is None) == [1] + [None] * 7
@@ -0,0 +1,133 @@
+"""
+Renovações sucessivas de token: o tamanho se mantém e o perfil chega intacto
+"""
+import json
+
+import pytest
+
+import app.utils.auth as auth
+import app.utils.chaves as chaves
+import app.utils.perfil_store as perfil_store
+import app.utils.refresh_tokens as refresh_tokens
+from app import create_app
+from app.config import Config
+
+RENOVACOES = 1000
+
+PERFIL = {
+    'identificador': 'teste@uninga.edu.br',
+    'nome': 'TESTE USUÁRIO',
+    'email': 'teste@uninga.edu.br',
+    'tipo': 'email',
+    'tipo_usuario': 'PROFESSOR',
+    'permissoes': ['user', 'professor']
+}
+
+
+def _chaves_es256():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    pem = ec.generate_private_key(ec.SECP256R1()).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode('ascii')
+    return json.dumps([{'kid': 'teste', 'pem': pem}])
+
+
+@pytest.fixture
+def criar_cliente():
+    """Cliente de teste com os stores globais zerados antes e depois"""
+    def zerar():
+        auth._backend_revogacao = None
+        perfil_store._perfil_store = None
+        refresh_tokens._backend_refresh = None
+        chaves._anel_chaves = None
+
+    def criar(**configuracao):
+        zerar()
+        app = create_app(type('ConfigTeste', (Config,), dict(RATE_LIMIT_ATIVO=False, **configuracao)))
+        return app, app.test_client()
+
+    yield criar
+    zerar()
+
+
+def _perfil_verificado(cliente, token):
+    resposta = cliente.post('/auth/verify-token', headers={'Authorization': f'Bearer {token}'})
+    assert resposta.status_code == 200
+    return resposta.get_json()['usuario']['usuario_info']
+
+
+@pytest.mark.parametrize('configuracao', [
+    {},
+    {'JWT_SLIM': True},
+    {'JWT_ALGORITMO': 'ES256', 'JWT_CHAVES': _chaves_es256()},
+], ids=['completo', 'enxuto', 'es256'])
+def test_renovacoes_mantem_tamanho_e_perfil(criar_cliente, configuracao):
+    app, cliente = criar_cliente(**configuracao)
+    with app.app_context():
+        token = auth.gerar_token_jwt(dict(PERFIL))
+
+    tamanho = len(token)
+    for _ in range(RENOVACOES):
+        resposta = cliente.post('/auth/refresh', headers={'Authorization': f'Bearer {token}'})
+        assert resposta.status_code == 200
+        token = resposta.get_json()['token']
+        assert len(token) == tamanho
+
+    assert _perfil_verificado(cliente, token) == PERFIL
+
+
+def test_token_enxuto_sem_perfil_no_store_nao_e_renovado(criar_cliente):
+    app, cliente = criar_cliente(JWT_SLIM=True)
+    with app.app_context():
+        token = auth.gerar_token_jwt(dict(PERFIL))
+
+    # Perfil perdido (LRU, outra instância ou store reiniciado): o token segue válido
+    perfil_store._perfil_store = None
+    resposta = cliente.post('/auth/refresh', headers={'Authorization': f'Bearer {token}'})
+    assert resposta.status_code == 401
+    assert 'token' not in resposta.get_json()
+
+    # Nenhum perfil truncado foi gravado no lugar do original
+    assert perfil_store._perfil_store.estatisticas()['entradas'] == 0
+
+
+def test_rotacao_do_par_mantem_tamanho_e_perfil(criar_cliente):
+    app, cliente = criar_cliente(JWT_PAR_TOKENS=True)
+    with app.app_context():
+        familia, token_refresh = refresh_tokens.emitir_refresh_token(dict(PERFIL))
+        token = auth.gerar_token_jwt(dict(PERFIL), familia)
+
+    tamanho = len(token)
+    for _ in range(RENOVACOES):
+        resposta = cliente.post('/auth/refresh', json={'refresh_token': token_refresh})
+        assert resposta.status_code == 200
+        corpo = resposta.get_json()
+        token, token_refresh = corpo['token'], corpo['refresh_token']
+        assert len(token) == tamanho
+
+    assert _perfil_verificado(cliente, token) == PERFIL
+
+
+def test_reuso_dentro_da_janela_devolve_o_mesmo_sucessor(criar_cliente):
+    app, cliente = criar_cliente(JWT_PAR_TOKENS=True, JWT_REFRESH_JANELA_REUSO=60)
+    with app.app_context():
+        _, token_refresh = refresh_tokens.emitir_refresh_token(dict(PERFIL))
+
+    primeira = cliente.post('/auth/refresh', json={'refresh_token': token_refresh}).get_json()
+    repetida = cliente.post('/auth/refresh', json={'refresh_token': token_refresh}).get_json()
+    assert repetida['refresh_token'] == primeira['refresh_token']
+
+    seguinte = cliente.post('/auth/refresh', json={'refresh_token': primeira['refresh_token']})
+    assert seguinte.status_code == 200
+
+
+def test_reuso_fora_da_janela_encerra_a_familia(criar_cliente):
+    app, cliente = criar_cliente(JWT_PAR_TOKENS=True, JWT_REFRESH_JANELA_REUSO=0)
+    with app.app_context():
+        _, token_refresh = refresh_tokens.emitir_refresh_token(dict(PERFIL))
+
+    sucessor = cliente.post('/auth/refresh', json={'refresh_token': token_refresh}).get_json()['refresh_token']
+    assert cliente.post('/auth/refresh', json={'refresh_token': token_refresh}).status_code == 401
+    assert cliente.post('/auth/refresh', json={'refresh_token': sucessor}).status_code == 401